@@ -0,0 +1 @@
+"""Benchmarks for the dictionarydb importer and lookup queries."""
@@ -0,0 +1,71 @@
+"""
+Compare two result files of the benchmark suite (see `benchmarks.suite`).
+
+For every benchmark in both files, the main measurements are printed side by side,
+with the change from the first file (the baseline) to the second one.
+
+Usage::
+
+  $ python -m benchmarks.compare baseline.json results.json
+"""
+import json
+
+from click import Path, argument, command
+
+#: The measurements to compare (lower is better unless they are rates).
+MEASUREMENTS = (
+    "seconds",
+    "lines_per_second",
+    "entries_per_second",
+    "requests_per_second",
+    "median_ms",
+    "p95_ms",
+    "p99_ms",
+)
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def format_change(baseline, value):
+    if not baseline:
+        return ""
+    return f"{(value - baseline) / baseline * 100:+.1f}%"
+
+
+def describe_input(report):
+    info = report["input"]
+    revision = report.get("revision") or "unknown revision"
+    return f"{revision}: {info['size']} lines (seed {info['seed']})"
+
+
+@command()
+@argument("baseline_file", type=Path(exists=True, dir_okay=False))
+@argument("results_file", type=Path(exists=True, dir_okay=False))
+def main(baseline_file, results_file):
+    """Compare benchmark results with a baseline."""
+    baseline = load_report(baseline_file)
+    results = load_report(results_file)
+    print(f"Baseline: {describe_input(baseline)}")
+    print(f"Results:  {describe_input(results)}")
+    if baseline["input"]["sha256"] != results["input"]["sha256"]:
+        print("Warning: the results are based on different input files.")
+    for name, result in results["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None:
+            continue
+        print(f"{name}:")
+        for measurement in MEASUREMENTS:
+            if measurement not in result or measurement not in baseline_result:
+                continue
+            old_value = baseline_result[measurement]
+            new_value = result[measurement]
+            change = format_change(old_value, new_value)
+            values = f"{old_value:>12,.3f} {new_value:>12,.3f} {change:>8}"
+            print(f"  {measurement + ':':<21} {values}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Deterministic generator for synthetic dictionary files in the Ding format."""
+import random
+import string
+from itertools import islice
+
+SOURCE_ALPHABET = string.ascii_lowercase + "äöüß"
+TARGET_ALPHABET = string.ascii_lowercase
+
+GRAMMAR_ANNOTATIONS = ["{m}", "{f}", "{n}", "{pl}", "{vt}"]
+DOMAIN_ANNOTATIONS = ["[biol.]", "[comp.]", "[ugs.]", "[Am.]", "[Br.]", "[fin.; econ.]"]
+
+
+def generate_word(rng, alphabet):
+    length = rng.randint(3, 12)
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+#: Sizes of the files generated for the benchmark suite, by name.
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+#: The largest vocabulary to draw words from (so that 10M line files fit in memory).
+MAX_VOCABULARY_SIZE = 500_000
+
+# Shares of the words and entry lines which have each feature, roughly as in the real
+# file (de-en.txt of Ding 1.9)
+RELATED_WORDS_WEIGHTS = {1: 65, 2: 20, 3: 10, 4: 5}  # Number of words (split by "|")
+SYNONYM_WEIGHTS = {1: 70, 2: 22, 3: 8}  # Number of synonyms (split by ";")
+GRAMMAR_SHARE = 0.55
+DOMAIN_SHARE = 0.15
+ABBREVIATION_SHARE = 0.02
+COMMENT_SHARE = 0.001
+
+HEADER_LINES = [
+    "# Version :: 1.9 2021-01-01\n",
+    "# Synthetic dictionary file generated by benchmarks.data\n",
+]
+
+
+def choose_count(rng, weights):
+    # Faster than `rng.choices` for the few small counts of the weights
+    value = rng.random() * sum(weights.values())
+    for count, weight in weights.items():
+        value -= weight
+        if value < 0:
+            return count
+    return count
+
+
+def generate_annotated_word(rng, words, shares):
+    """Return a random word with annotations like those in the real file."""
+    grammar_share, domain_share, abbreviation_share = shares
+    word = words[int(rng.random() * len(words))]  # Faster than `rng.choice`
+    if grammar_share and rng.random() < grammar_share:
+        word = f"{word} {rng.choice(GRAMMAR_ANNOTATIONS)}"
+    if domain_share and rng.random() < domain_share:
+        word = f"{word} {rng.choice(DOMAIN_ANNOTATIONS)}"
+    if abbreviation_share and rng.random() < abbreviation_share:
+        word = f"{word} /{word[:3].lower()}./"
+    return word
+
+
+def generate_side(rng, words, num_synonyms, shares):
+    return "; ".join(
+        generate_annotated_word(rng, words, shares) for _ in range(num_synonyms)
+    )
+
+
+def generate_lines(
+    num_lines,
+    seed=0,
+    grammar_share=GRAMMAR_SHARE,
+    domain_share=DOMAIN_SHARE,
+    abbreviation_share=ABBREVIATION_SHARE,
+    comment_share=COMMENT_SHARE,
+):
+    """Yield `num_lines` lines of a file in the Ding format, the same for each seed.
+
+    The lines have the structure of the real file: related words separated by "|",
+    synonyms separated by ";", grammar annotations (like "{f}", on the source side
+    only), domains (like "[biol.]") and abbreviations on both sides, and comment lines.
+    The shares of the words with each kind of annotation (and of the comment lines) can
+    be changed, e.g. set to 0 for plain words.
+    """
+    source_shares = (grammar_share, domain_share, abbreviation_share)
+    target_shares = (0, domain_share, abbreviation_share)
+    rng = random.Random(seed)
+    vocabulary_size = min(max(num_lines // 2, 1), MAX_VOCABULARY_SIZE)
+    source_words = [
+        generate_word(rng, SOURCE_ALPHABET).capitalize() for _ in range(vocabulary_size)
+    ]
+    target_words = [generate_word(rng, TARGET_ALPHABET) for _ in range(vocabulary_size)]
+    lines = iter(HEADER_LINES)
+    for _ in range(num_lines):
+        line = next(lines, None)
+        if line is None and rng.random() < comment_share:
+            line = f"# {rng.choice(target_words)}\n"
+        if line is not None:
+            yield line
+            continue
+        left_sides = []
+        right_sides = []
+        for _ in range(choose_count(rng, RELATED_WORDS_WEIGHTS)):
+            left_sides.append(
+                generate_side(
+                    rng, source_words, choose_count(rng, SYNONYM_WEIGHTS), source_shares
+                )
+            )
+            right_sides.append(
+                generate_side(
+                    rng, target_words, choose_count(rng, SYNONYM_WEIGHTS), target_shares
+                )
+            )
+        yield f"{' | '.join(left_sides)} :: {' | '.join(right_sides)}\n"
+
+
+def write_file(path, num_lines, seed=0):
+    """Write a synthetic dictionary file (see `generate_lines`)."""
+    with open(path, "w", encoding="utf-8") as file:
+        lines = generate_lines(num_lines, seed)
+        while True:
+            batch = list(islice(lines, 10_000))
+            if not batch:
+                break
+            file.writelines(batch)
+    return path
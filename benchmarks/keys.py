@@ -0,0 +1,95 @@
+"""
+Compare the "integer" and "uuid" key types of the database schema.
+
+For each key type, a synthetic dictionary file is imported into a new SQLite database.
+Then the import time, the size of each table and index, and the latency of the lookup
+query are reported.
+
+Usage::
+
+  $ python -m benchmarks.keys --num-lines=100000
+"""
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from click import command, option
+
+from benchmarks.data import generate_lines
+from dictionarydb.importer import import_entries
+from dictionarydb.models import KEY_TYPES, prepare_engine, setup_database
+from dictionarydb.parser import load_entries
+from dictionarydb.query import get_lookup_query, get_lookup_values
+
+SIZE_QUERY = "select name, sum(pgsize) from dbstat group by name order by name"
+
+
+def import_file(database_path, key_type, num_lines):
+    database_url = f"sqlite:///{database_path}"
+    setup_database(database_url, key_type=key_type)
+    engine = prepare_engine(database_url)
+    start = time.perf_counter()
+    import_entries(
+        engine,
+        load_entries(generate_lines(num_lines)),
+        "deu",
+        "eng",
+        chunk_size=10_000,
+        loader="core",
+        key_type=key_type,
+    )
+    return time.perf_counter() - start
+
+
+def time_lookups(connection, search_strings, query=None):
+    query = query or get_lookup_query("sqlite")
+    timings = []
+    for search_string in search_strings:
+        values = get_lookup_values("deu", "eng", search_string, 20)
+        # The original lookup query (see `benchmarks.lookup`) needs the plain string
+        values["search_string"] = search_string
+        start = time.perf_counter()
+        connection.execute(query, values).fetchall()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def get_search_strings(connection, num_lookups, seed=0):
+    words = [row[0] for row in connection.execute("select text from word")]
+    rng = random.Random(seed)
+    return [rng.choice(words)[:3] for _ in range(num_lookups)]
+
+
+def format_size(num_bytes):
+    return f"{num_bytes / 1024 / 1024:.2f} MiB"
+
+
+@command()
+@option("--num-lines", type=int, default=100_000, help="Number of lines to import.")
+@option("--num-lookups", type=int, default=200, help="Number of lookups to run.")
+def main(num_lines, num_lookups):
+    """Benchmark the integer and UUID key types against each other."""
+    with tempfile.TemporaryDirectory() as directory:
+        for key_type in KEY_TYPES:
+            database_path = Path(directory) / f"{key_type}.sqlite"
+            import_time = import_file(database_path, key_type, num_lines)
+            connection = sqlite3.connect(database_path)
+            sizes = connection.execute(SIZE_QUERY).fetchall()
+            search_strings = get_search_strings(connection, num_lookups)
+            timings = time_lookups(connection, search_strings)
+            connection.close()
+
+            print(f"Key type: {key_type}")
+            print(f"  Import time:     {import_time:.2f} s")
+            print(f"  Database size:   {format_size(database_path.stat().st_size)}")
+            for name, size in sizes:
+                print(f"    {name + ':':<38} {format_size(size)}")
+            print(f"  Lookup (median): {statistics.median(timings) * 1000:.2f} ms")
+            print(f"  Lookup (max):    {max(timings) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
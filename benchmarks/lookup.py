@@ -0,0 +1,100 @@
+"""
+Compare the latency of the lookup query before and after adding the lookup entries.
+
+A synthetic dictionary file is imported into a new SQLite database. Then the same
+random prefix searches are run using the original query (which joins the "word" and
+"word_translates_to_word" tables) and using the current query (which reads the
+precomputed "lookup_entry" table).
+
+Usage::
+
+  $ python -m benchmarks.lookup --num-lines=100000
+"""
+import sqlite3
+import statistics
+import tempfile
+from pathlib import Path
+
+from click import command, option
+
+from benchmarks.keys import get_search_strings, import_file, time_lookups
+from dictionarydb.query import get_lookup_query
+
+# The lookup query as it was before the "lookup_entry" table existed
+LEGACY_LOOKUP_QUERY = """
+with words_in_request_language as (
+    select *
+    from word
+    where language_id = (
+        select id from language
+        where code = :source_language
+    )
+), words_matching_search as (
+    select *
+    from words_in_request_language
+    where text like :search_string || '%'
+), words_with_translation_ids as (
+    select words.*, translations.*
+    from words_matching_search as words
+    inner join word_translates_to_word as translations
+    on (words.id in (translations.word1_id, translations.word2_id))
+), words_with_translations as (
+    select distinct words.language_id as language_id,
+                    words.text as word,
+                    translated.language_id as translation_language_id,
+                    translated.text as translation
+    from words_with_translation_ids words
+    inner join word as translated
+    on (translated.id in (words.word1_id, words.word2_id)
+        and words.language_id != translated.language_id
+        and translated.language_id = (select id from language where code = :target_language))
+), results_with_languages as (
+    select words.word,
+           (select code
+           from language
+           where id = words.language_id) as language,
+           words.translation,
+           (select code
+           from language
+           where id = words.translation_language_id) as translation_language
+    from words_with_translations words
+)
+select * from results_with_languages
+limit :max_results
+"""  # noqa
+
+
+def get_percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) * percentile // 100, len(values) - 1)]
+
+
+def print_timings(name, timings):
+    print(f"{name}:")
+    print(f"  Lookup (median): {statistics.median(timings) * 1000:.2f} ms")
+    print(f"  Lookup (p95):    {get_percentile(timings, 95) * 1000:.2f} ms")
+    print(f"  Lookup (max):    {max(timings) * 1000:.2f} ms")
+
+
+@command()
+@option("--num-lines", type=int, default=100_000, help="Number of lines to import.")
+@option("--num-lookups", type=int, default=200, help="Number of lookups to run.")
+@option("--key-type", default="integer", help="Type of primary keys to use.")
+def main(num_lines, num_lookups, key_type):
+    """Benchmark the original and the current lookup query against each other."""
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = Path(directory) / "lookup.sqlite"
+        import_time = import_file(database_path, key_type, num_lines)
+        print(f"Import time: {import_time:.2f} s")
+        connection = sqlite3.connect(database_path)
+        search_strings = get_search_strings(connection, num_lookups)
+        for name, query in (
+            ("Original query", LEGACY_LOOKUP_QUERY),
+            ("Lookup entries", get_lookup_query("sqlite")),
+        ):
+            print_timings(name, time_lookups(connection, search_strings, query))
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
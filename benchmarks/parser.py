@@ -0,0 +1,50 @@
+"""
+Measure the throughput of the parser, with and without parsing the annotations.
+
+The lines of a synthetic dictionary file (with annotations) are parsed into entries.
+Then the words of the entries are reduced to their search keys, which the importer has
+always done, and split into their headword and annotations (see `parse_word`), which
+the importer does as well since the annotations are stored in their own columns.
+
+Usage::
+
+  $ python -m benchmarks.parser --num-lines=100000
+"""
+import time
+
+from click import command, option
+
+from benchmarks.data import generate_lines
+from dictionarydb.parser import parse_lines, parse_word
+from dictionarydb.search import get_search_key
+
+
+def time_function(function, values):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return time.perf_counter() - start
+
+
+def print_throughput(name, num_items, seconds, unit):
+    print(f"{name + ':':<16} {num_items / seconds:>12,.0f} {unit}/s ({seconds:.2f} s)")
+
+
+@command()
+@option("--num-lines", type=int, default=100_000, help="Number of lines to parse.")
+def main(num_lines):
+    """Benchmark parsing lines and annotations."""
+    lines = list(generate_lines(num_lines))
+    start = time.perf_counter()
+    entries = list(parse_lines(lines))
+    print_throughput("Parse lines", len(lines), time.perf_counter() - start, "lines")
+    words = [word for entry in entries for word in entry]
+    for name, function in (
+        ("Search keys", get_search_key),
+        ("Annotations", parse_word),
+    ):
+        print_throughput(name, len(words), time_function(function, words), "words")
+
+
+if __name__ == "__main__":
+    main()
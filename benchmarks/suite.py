@@ -0,0 +1,364 @@
+"""
+Run the benchmark suite and write the results to a JSON file.
+
+A synthetic dictionary file in the Ding format (see `generate_lines`) is generated
+for the given size. The file is always the same for the same size and seed, so the
+results of different runs (e.g. before and after a change) can be compared. Then the
+suite measures:
+
+- parse: parsing the file (without storing anything)
+- import_sqlite: importing the file into a new SQLite database
+- import_postgresql: importing the file into a PostgreSQL database (if a URL is given)
+- lookup_sqlite, lookup_postgresql: prefix lookups sent to the API by concurrent
+  clients (in the same process, without a network in between), with the lookup cache
+  turned off
+
+Usage::
+
+  $ python -m benchmarks.suite --size=100k --output=results.json
+  $ python -m benchmarks.suite --size=1m --postgresql-url=postgresql://localhost/bench
+
+The PostgreSQL database must exist. All tables in it are dropped before the import.
+To compare two result files, use `python -m benchmarks.compare`.
+"""
+import asyncio
+import hashlib
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from urllib.parse import urlencode
+
+from click import Choice, command, option
+
+from benchmarks.data import SIZES, write_file
+from dictionarydb import __version__
+from dictionarydb.api import app
+from dictionarydb.config import settings
+from dictionarydb.importer import import_entries
+from dictionarydb.models import get_schema_metadata, prepare_engine, setup_database
+from dictionarydb.parser import load_entries, parse_lines
+from dictionarydb.search import get_search_key
+from dictionarydb.stats import ImportStats, get_peak_rss
+
+BENCHMARKS = ("parse", "import", "lookup")
+
+#: Number of lines at the start of the file to draw the search strings from.
+SEARCH_STRING_SAMPLE_LINES = 10_000
+
+
+def get_git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_file_info(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return {"bytes": path.stat().st_size, "sha256": digest.hexdigest()}
+
+
+def get_percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) * percentile // 100, len(values) - 1)]
+
+
+def get_latency_summary(timings):
+    """Return the median, p95, p99 and maximum of timings (in milliseconds)."""
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(get_percentile(timings, 95) * 1000, 3),
+        "p99_ms": round(get_percentile(timings, 99) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+    }
+
+
+def benchmark_parse(path, num_lines, repeat):
+    """Time parsing the file `repeat` times and report the fastest run."""
+    runs = []
+    for _ in range(repeat):
+        with open(path, encoding="utf-8") as file:
+            start = time.perf_counter()
+            num_entries = sum(1 for _ in parse_lines(file))
+            runs.append(time.perf_counter() - start)
+    seconds = min(runs)
+    return {
+        "seconds": round(seconds, 6),
+        "runs": [round(run, 6) for run in runs],
+        "entries": num_entries,
+        "lines_per_second": round(num_lines / seconds, 1),
+    }
+
+
+def drop_tables(database_url):
+    engine = prepare_engine(database_url)
+    get_schema_metadata(settings.DATABASE_KEY_TYPE).drop_all(engine)
+    engine.dispose()
+
+
+def benchmark_import(path, database_url, chunk_size, loader, split_synonyms):
+    key_type = settings.DATABASE_KEY_TYPE
+    setup_database(database_url, key_type=key_type)
+    engine = prepare_engine(database_url)
+    stats = ImportStats()
+    with open(path, encoding="utf-8") as file:
+        start = time.perf_counter()
+        num_added, _ = import_entries(
+            engine,
+            load_entries(file, stats=stats),
+            "deu",
+            "eng",
+            chunk_size=chunk_size,
+            loader=loader,
+            key_type=key_type,
+            split_synonyms=split_synonyms,
+            stats=stats,
+        )
+        seconds = time.perf_counter() - start
+    engine.dispose()
+    report = stats.get_report()
+    return {
+        "seconds": round(seconds, 6),
+        "entries": num_added,
+        "rows": report["rows"],
+        "entries_per_second": round(num_added / seconds, 1),
+        "stages": report["stages"],
+    }
+
+
+def get_search_strings(path, num_lookups, seed):
+    """Return prefixes of the words at the start of the file, the same for each seed."""
+    with open(path, encoding="utf-8") as file:
+        entries = parse_lines(islice(file, SEARCH_STRING_SAMPLE_LINES))
+        search_keys = [get_search_key(source_word) for source_word, _ in entries]
+    search_keys = [search_key for search_key in search_keys if len(search_key) >= 3]
+    rng = random.Random(seed)
+    return [rng.choice(search_keys)[:3] for _ in range(num_lookups)]
+
+
+async def send_request(app, path, query_string):
+    """Send a GET request to an ASGI app and return its status code."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response.get("status")
+
+
+async def run_lookups(app, search_strings, concurrency):
+    """Send lookups using `concurrency` clients and return the timings and errors."""
+    pending = iter(search_strings)
+    timings = []
+    errors = []
+
+    async def client():
+        for search_string in pending:
+            query_string = urlencode(
+                {
+                    "source_language": "deu",
+                    "target_language": "eng",
+                    "search_string": search_string,
+                }
+            )
+            start = time.perf_counter()
+            status = await send_request(app, "/lookup", query_string)
+            timings.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return timings, errors
+
+
+async def benchmark_lookup(database_url, search_strings, concurrency, warmup):
+    settings.DATABASE_URL = database_url
+    settings.LOOKUP_BACKEND = "database"
+    settings.API_CACHE_SIZE = 0
+    settings.API_DATABASE_POOL_MAX_SIZE = max(
+        settings.API_DATABASE_POOL_MAX_SIZE, concurrency
+    )
+    await app.router.startup()
+    try:
+        await run_lookups(app, search_strings[:warmup], concurrency)
+        start = time.perf_counter()
+        timings, errors = await run_lookups(app, search_strings, concurrency)
+        seconds = time.perf_counter() - start
+    finally:
+        await app.router.shutdown()
+    return {
+        "seconds": round(seconds, 6),
+        "requests": len(timings),
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "requests_per_second": round(len(timings) / seconds, 1),
+        **get_latency_summary(timings),
+    }
+
+
+def run_lookup_benchmark(*args):
+    return asyncio.run(benchmark_lookup(*args))
+
+
+def run_benchmark(results, name, function, *args):
+    print(f"Running {name}…")
+    results[name] = result = function(*args)
+    print(f"  {result['seconds']:.2f} s")
+    if result.get("errors"):
+        print(f"  {result['errors']} of {result['requests']} requests failed!")
+
+
+@command()
+@option(
+    "--size",
+    type=Choice(SIZES),
+    default="100k",
+    show_default=True,
+    help="Number of lines of the dictionary file.",
+)
+@option("--seed", type=int, default=0, show_default=True, help="Seed of the data.")
+@option(
+    "--only",
+    type=Choice(BENCHMARKS),
+    multiple=True,
+    help="Run only these benchmarks (can be given more than once).",
+)
+@option("--postgresql-url", help="URL of a PostgreSQL database to import into.")
+@option("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE, show_default=True)
+@option("--loader", default=settings.IMPORT_LOADER, show_default=True)
+@option("--split-synonyms/--no-split-synonyms", default=False, show_default=True)
+@option("--repeat", type=int, default=3, show_default=True, help="Parse runs.")
+@option("--num-lookups", type=int, default=2000, show_default=True)
+@option("--concurrency", type=int, default=10, show_default=True)
+@option(
+    "--data-dir",
+    type=Path,
+    help="Directory to keep the generated files in (instead of regenerating them).",
+)
+@option("--output", type=Path, help="File to write the results to (JSON).")
+def main(
+    size,
+    seed,
+    only,
+    postgresql_url,
+    chunk_size,
+    loader,
+    split_synonyms,
+    repeat,
+    num_lookups,
+    concurrency,
+    data_dir,
+    output,
+):
+    """Run the benchmark suite."""
+    benchmarks = only or BENCHMARKS
+    num_lines = SIZES[size]
+    started_at = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(data_dir or directory) / f"ding-{size}-{seed}.txt"
+        if not path.exists():
+            print(f"Generating {path}…")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_file(path, num_lines, seed)
+
+        databases = {"sqlite": f"sqlite:///{Path(directory) / 'benchmark.sqlite'}"}
+        if postgresql_url:
+            drop_tables(postgresql_url)
+            databases["postgresql"] = postgresql_url
+        results = {}
+        if "parse" in benchmarks:
+            run_benchmark(results, "parse", benchmark_parse, path, num_lines, repeat)
+        if "import" in benchmarks or "lookup" in benchmarks:
+            # The lookups need the imported entries
+            for name, database_url in databases.items():
+                run_benchmark(
+                    results,
+                    f"import_{name}",
+                    benchmark_import,
+                    path,
+                    database_url,
+                    chunk_size,
+                    loader,
+                    split_synonyms,
+                )
+        if "lookup" in benchmarks:
+            search_strings = get_search_strings(path, num_lookups, seed)
+            warmup = min(num_lookups, 10 * concurrency)
+            for name, database_url in databases.items():
+                run_benchmark(
+                    results,
+                    f"lookup_{name}",
+                    run_lookup_benchmark,
+                    database_url,
+                    search_strings,
+                    concurrency,
+                    warmup,
+                )
+
+        report = {
+            "version": __version__,
+            "revision": get_git_revision(),
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "input": {
+                "size": size,
+                "lines": num_lines,
+                "seed": seed,
+                **get_file_info(path),
+            },
+            "options": {
+                "chunk_size": chunk_size,
+                "loader": loader,
+                "split_synonyms": split_synonyms,
+                "num_lookups": num_lookups,
+                "concurrency": concurrency,
+            },
+            "peak_rss": get_peak_rss(),
+            "results": results,
+        }
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"Wrote the results to {output}.")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
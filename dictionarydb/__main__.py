@@ -1,17 +1,20 @@
 """Main program."""
-import os
 import errno
 import logging
 import logging.config
+import os
 import sys
 
 import uvicorn
 from click import (
     BadParameter,
-    File,
+    Choice,
     IntRange,
+    Path,
+    UsageError,
     argument,
     confirm,
+    echo,
     group,
     option,
     version_option,
@@ -20,11 +23,31 @@ from contexttimer import Timer
 from humanfriendly import format_timespan
 
 from dictionarydb import __version__
+from dictionarydb.compiled import write_compiled_file
+from dictionarydb.compression import open_input
 from dictionarydb.config import settings
-from dictionarydb.importer import import_entries
+from dictionarydb.explain import PROBES, Probe, explain_lookup
+from dictionarydb.export import (
+    COMPRESSIONS,
+    EXPORT_FORMATS,
+    get_compression,
+    iter_entries,
+    open_output,
+    write_entries,
+)
+from dictionarydb.importer import LOADERS, import_entries
+from dictionarydb.index import build_lookup_index, load_lookup_index
 from dictionarydb.language import get_language
-from dictionarydb.models import prepare_engine, setup_database
+from dictionarydb.manifest import (
+    ROLLBACK_MODES,
+    check_language_pairs,
+    import_manifest,
+    load_manifest,
+)
+from dictionarydb.models import KEY_TYPES, get_key_type, prepare_engine, setup_database
 from dictionarydb.parser import load_entries
+from dictionarydb.query import DEFAULT_NUM_RESULTS, LOOKUP_MODES, MAX_NUM_RESULTS
+from dictionarydb.stats import ImportStats
 
 logging.config.dictConfig(settings.LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
@@ -50,19 +73,34 @@ def dictionarydb():
     default=settings.DATABASE_URL,
     help="URL of the database to initialize.",
 )
+@option(
+    "--key-type",
+    type=Choice(KEY_TYPES),
+    help="Type of the primary keys to create: 32-character UUID strings (uuid) or "
+    "compact integers (integer). Defaults to the key type of an existing schema, or "
+    "else to the DICTIONARYDB_DATABASE_KEY_TYPE setting (uuid). To migrate an "
+    "existing database to another key type, initialize a new database and import "
+    "the entries into it again.",
+)
+@option(
+    "--fulltext/--no-fulltext",
+    default=settings.DATABASE_FULLTEXT_INDEX,
+    help="Whether or not to create a full-text index of the words (SQLite only), "
+    "which every import keeps up to date.",
+)
 @option(
     "--confirm/--no-confirm",
     default=True,
     help="Whether or not to ask for confirmation before proceeding.",
 )
-def init(database_url, confirm):
+def init(database_url, key_type, fulltext, confirm):
     """Create the database schema for the dictionary database."""
     # Ask for confirmation
     if confirm:
         confirm_or_exit("This will modify the chosen database. Continue?")
     logger.info("Initializing database…")
     try:
-        setup_database(database_url)
+        setup_database(database_url, key_type=key_type, fulltext=fulltext)
     except Exception as exc:
         logger.exception(f"Failed to initialize database: {exc!r}")
         sys.exit(errno.EIO)
@@ -76,7 +114,7 @@ def validate_language_code(ctx, param, value):
 
 
 @dictionarydb.command("import")
-@argument("input-file", type=File("r"))
+@argument("input-file", type=Path(exists=True, dir_okay=False, allow_dash=True))
 @option(
     "--source-language",
     "-s",
@@ -105,6 +143,80 @@ def validate_language_code(ctx, param, value):
     help="Maximum number of entries to hold in memory at once during the import before "
     "sending them to the database.",
 )
+@option(
+    "--queue-depth",
+    "-Q",
+    type=IntRange(min=0),
+    default=settings.IMPORT_QUEUE_DEPTH,
+    help="Number of chunks to prepare in the background while another chunk is being "
+    "sent to the database (0 to disable).",
+)
+@option(
+    "--parse-workers",
+    "-P",
+    type=IntRange(min=1),
+    default=settings.IMPORT_PARSE_WORKERS,
+    help="Number of processes to use for parsing the input file.",
+)
+@option(
+    "--read-buffer-size",
+    type=IntRange(min=1),
+    default=settings.IMPORT_READ_BUFFER_SIZE,
+    help="Size (in bytes) of the buffers used for reading the input file.",
+)
+@option(
+    "--loader",
+    type=Choice(sorted(LOADERS)),
+    default=settings.IMPORT_LOADER,
+    help="How to write the entries to the database: as plain rows using the "
+    "database's native bulk loading (core) or as ORM model objects (orm).",
+)
+@option(
+    "--dedupe-index-size",
+    type=IntRange(min=1),
+    default=settings.IMPORT_DEDUPE_INDEX_SIZE,
+    help="Maximum number of words per language to keep in memory in order to store "
+    "every distinct word only once.",
+)
+@option(
+    "--dedupe-spill/--no-dedupe-spill",
+    default=settings.IMPORT_DEDUPE_SPILL,
+    help="Whether or not to move words to a temporary file on disk (instead of "
+    "forgetting them) once the in-memory deduplication index is full.",
+)
+@option(
+    "--split-synonyms/--no-split-synonyms",
+    default=settings.IMPORT_SPLIT_SYNONYMS,
+    help="Whether or not to make each word of a group of synonyms (separated by "
+    "semicolons) a word of its own which can be looked up by itself.",
+)
+@option(
+    "--incremental/--replace",
+    default=False,
+    help="Whether to only add new entries and remove outdated ones (incremental) or "
+    "to remove all existing entries and add all entries again (replace).",
+)
+@option(
+    "--shadow/--in-place",
+    default=False,
+    help="Whether to write all entries to new staging tables and swap them in for the "
+    "live tables at the end (shadow) or to modify the live tables (in-place). Shadow "
+    "imports keep lookups fast while the import is running. Requires the core loader "
+    "and cannot be combined with --incremental.",
+)
+@option(
+    "--progress-interval",
+    type=IntRange(min=0),
+    default=settings.IMPORT_PROGRESS_INTERVAL,
+    help="Number of chunks after which to log the progress of the import (0 to "
+    "disable).",
+)
+@option(
+    "--stats-file",
+    type=Path(dir_okay=False, writable=True),
+    help="Write the time spent in each stage of the import (and other statistics) to "
+    "this file as JSON.",
+)
 @option(
     "--min-entries",
     type=int,
@@ -123,18 +235,38 @@ def import_(
     target_language,
     database_url,
     chunk_size,
+    queue_depth,
+    parse_workers,
+    read_buffer_size,
+    loader,
+    dedupe_index_size,
+    dedupe_spill,
+    split_synonyms,
+    incremental,
+    shadow,
+    progress_interval,
+    stats_file,
     min_entries,
     confirm,
 ):
     """Import new entries into the dictionary database."""
-    filename = input_file.name or "<stdin>"
+    if shadow and incremental:
+        raise UsageError("--shadow cannot be combined with --incremental.")
+    if shadow and loader != "core":
+        raise UsageError("--shadow requires --loader=core.")
+    filename = "<stdin>" if input_file == "-" else input_file
     logger.info(f'Starting dictionary import from file "{filename}"…')
     if confirm:
-        confirm_or_exit("This will remove all existing entries. Continue?")
+        if incremental:
+            confirm_or_exit("This will update the existing entries. Continue?")
+        else:
+            confirm_or_exit("This will remove all existing entries. Continue?")
     engine = prepare_engine(database_url)
+    stats = ImportStats(progress_interval)
     try:
-        with Timer() as timer:
-            entries = load_entries(input_file)
+        with Timer() as timer, open_input(input_file, read_buffer_size) as file:
+            key_type = get_key_type(engine)
+            entries = load_entries(file, num_workers=parse_workers, stats=stats)
             num_added, num_deleted = import_entries(
                 engine,
                 entries,
@@ -142,16 +274,455 @@ def import_(
                 target_language,
                 chunk_size=chunk_size,
                 min_entries=min_entries,
+                loader=loader,
+                key_type=key_type,
+                dedupe_index_size=dedupe_index_size,
+                dedupe_spill=dedupe_spill,
+                queue_depth=queue_depth,
+                incremental=incremental,
+                shadow=shadow,
+                split_synonyms=split_synonyms,
+                stats=stats,
             )
     except Exception as exc:
         logger.exception(f"Failed to import entries: {exc!r}")
         sys.exit(errno.EIO)
+    stats.log_summary()
+    if stats_file:
+        stats.write_report(
+            stats_file,
+            input_file=filename,
+            source_language=source_language,
+            target_language=target_language,
+            database=engine.dialect.name,
+            loader=loader,
+            chunk_size=chunk_size,
+            queue_depth=queue_depth,
+            parse_workers=parse_workers,
+            mode="shadow" if shadow else "incremental" if incremental else "replace",
+        )
     logger.info(
         f"Successfully completed dictionary import ({num_deleted} deleted, "
         f"{num_added} added, {format_timespan(timer.elapsed)} elapsed)."
     )
 
 
+@dictionarydb.command("import-manifest")
+@argument("manifest-file", type=Path(exists=True, dir_okay=False))
+@option(
+    "--database-url",
+    "-u",
+    default=settings.DATABASE_URL,
+    help="URL of the database into which to import.",
+)
+@option(
+    "--rollback",
+    type=Choice(ROLLBACK_MODES),
+    default="all",
+    help="Whether to roll back all language pairs if one of them fails (all) or only "
+    "the language pair that failed (pair). A single writer stores the language pairs "
+    "one after the other, except with --rollback=pair on PostgreSQL, where the pairs "
+    "that share no language are stored concurrently.",
+)
+@option(
+    "--chunk-size",
+    "-C",
+    type=int,
+    default=settings.IMPORT_CHUNK_SIZE,
+    help="Maximum number of entries to hold in memory at once during the import before "
+    "sending them to the database.",
+)
+@option(
+    "--queue-depth",
+    "-Q",
+    type=IntRange(min=0),
+    default=settings.IMPORT_QUEUE_DEPTH,
+    help="Number of chunks to parse and prepare in the background while another chunk "
+    "is being sent to the database (0 to disable).",
+)
+@option(
+    "--parse-workers",
+    "-P",
+    type=IntRange(min=1),
+    default=settings.IMPORT_PARSE_WORKERS,
+    help="Number of processes to use for parsing the input files.",
+)
+@option(
+    "--read-buffer-size",
+    type=IntRange(min=1),
+    default=settings.IMPORT_READ_BUFFER_SIZE,
+    help="Size (in bytes) of the buffers used for reading the input files.",
+)
+@option(
+    "--loader",
+    type=Choice(sorted(LOADERS)),
+    default=settings.IMPORT_LOADER,
+    help="How to write the entries to the database: as plain rows using the "
+    "database's native bulk loading (core) or as ORM model objects (orm).",
+)
+@option(
+    "--split-synonyms/--no-split-synonyms",
+    default=settings.IMPORT_SPLIT_SYNONYMS,
+    help="Whether or not to make each word of a group of synonyms (separated by "
+    "semicolons) a word of its own which can be looked up by itself.",
+)
+@option(
+    "--incremental/--replace",
+    default=False,
+    help="Whether to only add new entries and remove outdated ones (incremental) or "
+    "to remove all existing entries and add all entries again (replace). Language "
+    "pairs which share a language can only be imported incrementally.",
+)
+@option(
+    "--min-entries",
+    type=int,
+    help="Minimum number of valid entries that must be present in each file. If fewer "
+    "entries are found, the import of the language pair will be rolled back.",
+)
+@option(
+    "--confirm/--no-confirm",
+    default=True,
+    help="Whether or not to ask for confirmation before proceeding.",
+)
+def import_manifest_(
+    manifest_file,
+    database_url,
+    rollback,
+    chunk_size,
+    queue_depth,
+    parse_workers,
+    read_buffer_size,
+    loader,
+    split_synonyms,
+    incremental,
+    min_entries,
+    confirm,
+):
+    """Import the language pairs listed in a manifest file."""
+    try:
+        entries = load_manifest(manifest_file)
+        check_language_pairs(entries, incremental)
+    except (OSError, ValueError) as exc:
+        raise UsageError(f"Invalid manifest file: {exc}.")
+    logger.info(
+        f'Starting import of {len(entries)} language pairs from manifest "'
+        f'{manifest_file}"…'
+    )
+    if confirm:
+        if incremental:
+            confirm_or_exit("This will update the existing entries. Continue?")
+        else:
+            confirm_or_exit(
+                "This will remove all existing entries of these languages. Continue?"
+            )
+    engine = prepare_engine(database_url)
+    try:
+        with Timer() as timer:
+            results = import_manifest(
+                engine,
+                entries,
+                rollback=rollback,
+                parse_workers=parse_workers,
+                buffer_size=read_buffer_size,
+                queue_depth=queue_depth,
+                chunk_size=chunk_size,
+                min_entries=min_entries,
+                loader=loader,
+                key_type=get_key_type(engine),
+                incremental=incremental,
+                split_synonyms=split_synonyms,
+            )
+    except Exception as exc:
+        logger.exception(f"Failed to import entries: {exc!r}")
+        sys.exit(errno.EIO)
+    for result in results:
+        pair = f"{result.entry.source_language}-{result.entry.target_language}"
+        if result.error:
+            logger.error(f"Import of {pair} failed and was rolled back.")
+        else:
+            logger.info(
+                f"Imported {pair} ({result.num_deleted} deleted, "
+                f"{result.num_added} added)."
+            )
+    num_failed = sum(1 for result in results if result.error)
+    if num_failed:
+        logger.error(
+            f"Failed to import {num_failed} of {len(results)} language pairs "
+            f"({format_timespan(timer.elapsed)} elapsed)."
+        )
+        sys.exit(errno.EIO)
+    logger.info(
+        f"Successfully imported {len(results)} language pairs "
+        f"({format_timespan(timer.elapsed)} elapsed)."
+    )
+
+
+@dictionarydb.command("export")
+@argument("output-file", type=Path(dir_okay=False, writable=True, allow_dash=True))
+@option(
+    "--source-language",
+    "-s",
+    required=True,
+    callback=validate_language_code,
+    help="Source language of the entries to export.",
+)
+@option(
+    "--target-language",
+    "-t",
+    required=True,
+    callback=validate_language_code,
+    help="Target language of the entries to export.",
+)
+@option(
+    "--database-url",
+    "-u",
+    default=settings.DATABASE_URL,
+    help="URL of the database from which to export.",
+)
+@option(
+    "--format",
+    "export_format",
+    type=Choice(EXPORT_FORMATS),
+    default="ding",
+    help="Format of the output file: the Ding dictionary format which the import "
+    "command reads (ding), tab-separated values (tsv) or JSON lines (jsonl).",
+)
+@option(
+    "--compression",
+    type=Choice(sorted(COMPRESSIONS) + ["none"]),
+    help="How to compress the output file. By default, the compression is chosen by "
+    "the file name extension (.gz, .bz2 or .xz).",
+)
+@option(
+    "--fetch-size",
+    type=IntRange(min=1),
+    default=settings.EXPORT_FETCH_SIZE,
+    help="Number of rows to fetch from the database at once.",
+)
+def export(
+    output_file,
+    source_language,
+    target_language,
+    database_url,
+    export_format,
+    compression,
+    fetch_size,
+):
+    """Export the entries of a language pair from the dictionary database."""
+    if compression is None:
+        compression = get_compression(output_file)
+    elif compression == "none":
+        compression = None
+    filename = "<stdout>" if output_file == "-" else output_file
+    logger.info(f'Exporting dictionary entries to "{filename}"…')
+    engine = prepare_engine(database_url)
+    try:
+        with Timer() as timer:
+            entries = iter_entries(engine, source_language, target_language, fetch_size)
+            with open_output(output_file, compression) as file:
+                num_exported = write_entries(
+                    file, entries, source_language, target_language, export_format
+                )
+    except Exception as exc:
+        logger.exception(f"Failed to export entries: {exc!r}")
+        sys.exit(errno.EIO)
+    logger.info(
+        f"Successfully exported dictionary ({num_exported} entries, "
+        f"{format_timespan(timer.elapsed)} elapsed)."
+    )
+
+
+@dictionarydb.command("compile")
+@argument(
+    "output-file",
+    type=Path(dir_okay=False, writable=True),
+    default=settings.LOOKUP_FILE,
+)
+@option(
+    "--database-url",
+    "-u",
+    default=settings.DATABASE_URL,
+    help="URL of the database to compile.",
+)
+@option(
+    "--input-file",
+    "-i",
+    type=Path(exists=True, dir_okay=False, allow_dash=True),
+    help="Compile the entries of a dictionary file instead of the database.",
+)
+@option(
+    "--source-language",
+    "-s",
+    callback=validate_language_code,
+    help="Source language of the entries in the input file.",
+)
+@option(
+    "--target-language",
+    "-t",
+    callback=validate_language_code,
+    help="Target language of the entries in the input file.",
+)
+@option(
+    "--parse-workers",
+    "-P",
+    type=IntRange(min=1),
+    default=settings.IMPORT_PARSE_WORKERS,
+    help="Number of processes to use for parsing the input file.",
+)
+@option(
+    "--split-synonyms/--no-split-synonyms",
+    default=settings.IMPORT_SPLIT_SYNONYMS,
+    help="Whether or not to look up each word of a group of synonyms in the input "
+    "file by itself.",
+)
+def compile_(
+    output_file,
+    database_url,
+    input_file,
+    source_language,
+    target_language,
+    parse_workers,
+    split_synonyms,
+):
+    """Compile the dictionary into a file for the API to serve."""
+    if input_file and not (source_language and target_language):
+        raise UsageError(
+            "--input-file requires --source-language and --target-language."
+        )
+    try:
+        with Timer() as timer:
+            if input_file:
+                filename = "<stdin>" if input_file == "-" else input_file
+                logger.info(f'Reading dictionary entries from file "{filename}"…')
+                with open_input(input_file, settings.IMPORT_READ_BUFFER_SIZE) as file:
+                    entries = load_entries(file, num_workers=parse_workers)
+                    lookup_index = build_lookup_index(
+                        entries,
+                        source_language,
+                        target_language,
+                        split_synonyms=split_synonyms,
+                    )
+            else:
+                logger.info("Reading lookup entries from the database…")
+                lookup_index = load_lookup_index(prepare_engine(database_url))
+            logger.info(f'Writing compiled dictionary to "{output_file}"…')
+            write_compiled_file(lookup_index, output_file)
+    except Exception as exc:
+        logger.exception(f"Failed to compile dictionary: {exc!r}")
+        sys.exit(errno.EIO)
+    logger.info(
+        f"Successfully compiled dictionary ({len(lookup_index)} lookup entries, "
+        f"{format_timespan(timer.elapsed)} elapsed)."
+    )
+
+
+def print_query_plan(plan):
+    for line in plan.lines:
+        echo(f"  {line}")
+    for table_name in plan.full_scans:
+        indexes = ", ".join(plan.unused_indexes[table_name]) or "none"
+        logger.warning(
+            f'Full scan of table "{table_name}" (unused indexes on it: {indexes}).'
+        )
+    for note in plan.notes:
+        logger.info(f"The query {note}.")
+
+
+@dictionarydb.command("explain")
+@argument("search-string", required=False)
+@option(
+    "--source-language",
+    "-s",
+    required=True,
+    callback=validate_language_code,
+    help="Language of the search string.",
+)
+@option(
+    "--target-language",
+    "-t",
+    required=True,
+    callback=validate_language_code,
+    help="Language of the translations to look up.",
+)
+@option(
+    "--mode",
+    type=Choice(LOOKUP_MODES),
+    default="prefix",
+    help="How to match the search string (like the mode parameter of /lookup).",
+)
+@option("--domain", help="Only look up the words annotated with this domain.")
+@option(
+    "--max-results",
+    type=IntRange(1, MAX_NUM_RESULTS),
+    default=DEFAULT_NUM_RESULTS,
+    help="Maximum number of results to look up.",
+)
+@option(
+    "--database-url",
+    "-u",
+    default=settings.DATABASE_URL,
+    help="URL of the database to explain the lookups on.",
+)
+@option(
+    "--probes",
+    is_flag=True,
+    help="Explain a fixed set of probe lookups (one for each shape of the lookup "
+    "query) instead of a single lookup.",
+)
+def explain(
+    search_string,
+    source_language,
+    target_language,
+    mode,
+    domain,
+    max_results,
+    database_url,
+    probes,
+):
+    """Show the query plan of a lookup and check it for full scans."""
+    if probes:
+        lookups = PROBES
+    elif search_string:
+        lookups = [Probe(mode, search_string, domain)]
+    else:
+        raise UsageError("Pass a search string or --probes.")
+    engine = prepare_engine(database_url)
+    num_problems = 0
+    try:
+        with engine.connect() as connection:
+            for lookup in lookups:
+                description = f'{lookup.mode} lookup of "{lookup.search_string}"'
+                if lookup.domain:
+                    description += f' in domain "{lookup.domain}"'
+                try:
+                    plan = explain_lookup(
+                        connection,
+                        source_language,
+                        target_language,
+                        lookup.search_string,
+                        max_results,
+                        mode=lookup.mode,
+                        domain=lookup.domain,
+                    )
+                except ValueError as exc:
+                    if not probes:
+                        raise UsageError(f"Cannot explain the lookup: {exc}.")
+                    logger.info(f"Skipping {description}: {exc}.")
+                    continue
+                echo(f"Query plan of the {description}:")
+                print_query_plan(plan)
+                num_problems += len(plan.full_scans)
+    except UsageError:
+        raise
+    except Exception as exc:
+        logger.exception(f"Failed to explain the lookup: {exc!r}")
+        sys.exit(errno.EIO)
+    if num_problems:
+        logger.warning(f"Found {num_problems} full scans in the query plans.")
+        sys.exit(1)
+    logger.info("No full scans found in the query plans.")
+
+
 @dictionarydb.command()
 @option(
     "--host",
@@ -1,26 +1,136 @@
+import asyncio
+import logging
+import time
+from typing import List
+
 from databases import Database
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+from humanfriendly import format_size
+from pydantic import BaseModel, conlist, constr
 
+from dictionarydb.cache import LookupCache
+from dictionarydb.compiled import CompiledFile
 from dictionarydb.config import settings
+from dictionarydb.index import load_lookup_index
+from dictionarydb.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    RENDER_DURATION,
+    MetricsMiddleware,
+)
+from dictionarydb.models import (
+    GENERATION_COUNTER,
+    HAS_FULLTEXT_TABLE_QUERY,
+    prepare_engine,
+)
+from dictionarydb.query import (
+    DEFAULT_NUM_RESULTS,
+    LOOKUP_MODES,
+    MAX_NUM_RESULTS,
+    get_batch_lookup_query,
+    get_batch_lookup_values,
+    get_lookup_query,
+    get_lookup_values,
+)
+from dictionarydb.replicas import ReplicaRouter
+from dictionarydb.search import get_search_key
+
+logger = logging.getLogger(__name__)
+
+#: The available sources of lookup results (see `settings.LOOKUP_BACKEND`).
+LOOKUP_BACKENDS = ("database", "memory", "file")
+
 
-app = FastAPI()
+class MeasuredJSONResponse(JSONResponse):
+    """A JSON response which records the time spent serializing its content."""
+
+    def render(self, content):
+        start_time = time.perf_counter()
+        body = super().render(content)
+        RENDER_DURATION.observe(time.perf_counter() - start_time)
+        return body
+
+
+app = FastAPI(default_response_class=MeasuredJSONResponse)
+app.add_middleware(MetricsMiddleware)
 database = None
+cache = None
+lookup_index = None
+compiled_file = None
+# Whether the database has a full-text index (None until the first full-text lookup),
+# and the generation in which that was checked
+fulltext_enabled = None
+fulltext_generation = None
+
+
+def new_database(database_url):
+    """Create a `Database` with the configured connection pool settings."""
+    if database_url.startswith("postgres"):
+        # The SQLite backend has no pool (and would pass the options to sqlite3)
+        return Database(
+            database_url,
+            min_size=settings.API_DATABASE_POOL_MIN_SIZE,
+            max_size=settings.API_DATABASE_POOL_MAX_SIZE,
+            # The threshold of the similarity operator (%) for fuzzy lookups
+            server_settings={
+                "pg_trgm.similarity_threshold": str(settings.API_FUZZY_THRESHOLD)
+            },
+        )
+    return Database(database_url)
 
 
 @app.on_event("startup")
 async def on_startup():
-    global database
+    global database, cache, lookup_index, compiled_file
 
-    database = Database(settings.DATABASE_URL)
+    backend = settings.LOOKUP_BACKEND
+    if backend not in LOOKUP_BACKENDS:
+        raise ValueError(f'unknown lookup backend "{backend}"')
+    cache = LookupCache(settings.API_CACHE_SIZE, settings.API_CACHE_TTL)
+    if backend == "memory":
+        lookup_index = load_lookup_index(prepare_engine(settings.DATABASE_URL))
+        logger.info(
+            f"Loaded {len(lookup_index)} lookup entries into memory "
+            f"({format_size(lookup_index.nbytes, binary=True)})."
+        )
+        return
+    if backend == "file":
+        compiled_file = CompiledFile(settings.LOOKUP_FILE)
+        lookup_index = compiled_file.index
+        size = format_size(compiled_file.size, binary=True)
+        logger.info(
+            f"Mapped {len(lookup_index)} lookup entries from file "
+            f'"{settings.LOOKUP_FILE}" ({size}).'
+        )
+        return
+    database = ReplicaRouter(
+        new_database(settings.DATABASE_URL),
+        [new_database(url) for url in settings.API_DATABASE_REPLICA_URLS],
+        acquire_timeout=settings.API_DATABASE_ACQUIRE_TIMEOUT or None,
+        retry_interval=settings.API_DATABASE_REPLICA_RETRY_INTERVAL,
+    )
     await database.connect()
 
 
 @app.on_event("shutdown")
 async def on_shutdown():
-    global database
+    global database, lookup_index, compiled_file, fulltext_enabled, fulltext_generation
 
     if database:
         await database.disconnect()
+    database = None
+    lookup_index = None
+    if compiled_file:
+        compiled_file.close()
+    compiled_file = None
+    fulltext_enabled = None
+    fulltext_generation = None
+
+
+@app.exception_handler(asyncio.TimeoutError)
+async def handle_timeout(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "database timeout"})
 
 
 @app.get("/health")
@@ -28,105 +138,108 @@ def healthcheck():
     return {"ok": True}
 
 
-LOOKUP_QUERY = """
-with words_in_request_language as (
-    select *
-    from word
-    where language_id = (
-        select id from language
-        where code = :source_language
-    )
-), words_matching_search as (
-    select *
-    from words_in_request_language
-    where text like :search_string || '%'
-), words_with_translation_ids as (
-    select words.*, translations.*
-    from words_matching_search as words
-    inner join word_translates_to_word as translations
-    on (words.id in (translations.word1_id, translations.word2_id))
-), words_with_translations as (
-    select distinct words.language_id as language_id,
-                    words.text as word,
-                    translated.language_id as translation_language_id,
-                    translated.text as translation
-    from words_with_translation_ids words
-    inner join word as translated
-    on (translated.id in (words.word1_id, words.word2_id)
-        and words.language_id != translated.language_id
-        and translated.language_id = (select id from language where code = :target_language))
-), results_with_languages as (
-    select words.word,
-           (select code
-           from language
-           where id = words.language_id) as language,
-           words.translation,
-           (select code
-           from language
-           where id = words.translation_language_id) as translation_language
-    from words_with_translations words
-)
-select * from results_with_languages
-limit :max_results
-"""  # noqa
-
-LOOKUP_QUERY_POSTGRESQL = """
-with words_in_request_language as (
-    select *
-    from word
-    where language_id = (
-        select id from language
-        where code = :source_language
+def get_result_dicts(rows, exclude=()):
+    """Turn the rows of a lookup query into dictionaries (as they are cached)."""
+    return [{key: row[key] for key in row.keys() if key not in exclude} for row in rows]
+
+
+GENERATION_QUERY = "select value from key_counter where name = :name"
+
+
+async def refresh_cache_generation():
+    if cache.should_check_generation():
+        generation = await database.fetch_val(
+            query=GENERATION_QUERY, values={"name": GENERATION_COUNTER}
+        )
+        cache.set_generation(generation)
+
+
+async def check_fulltext_index():
+    """Return whether the database has a full-text index.
+
+    The answer is checked again once the generation has changed (creating the index
+    increments it, see `create_fulltext_index`).
+    """
+    global fulltext_enabled, fulltext_generation
+
+    await refresh_cache_generation()
+    if fulltext_enabled is None or fulltext_generation != cache.generation:
+        fulltext_enabled = bool(await database.fetch_val(HAS_FULLTEXT_TABLE_QUERY))
+        fulltext_generation = cache.generation
+    return fulltext_enabled
+
+
+def get_cache_key(values, mode="prefix"):
+    return (
+        mode,
+        values["source_language"],
+        values["target_language"],
+        values["search_key"],
+        values["max_results"],
+        values.get("domain"),
     )
-), words_matching_search as (
-    select *
-    from words_in_request_language
-    where text like :search_string || '%'
-), words_with_translation_ids as (
-    select words.*, translations.*
-    from words_matching_search as words
-    inner join word_translates_to_word as translations
-    on (words.id in (translations.word1_id, translations.word2_id))
-), words_with_translations as (
-    select distinct on (translated.id) words.language_id as language_id,
-                                       words.text as word,
-                                       translated.language_id as translation_language_id,
-                                       translated.text as translation
-    from words_with_translation_ids words
-    inner join word as translated
-    on (translated.id in (words.word1_id, words.word2_id)
-        and words.language_id != translated.language_id
-        and translated.language_id = (select id from language where code = :target_language))
-), results_with_languages as (
-    select words.word,
-           (select code
-           from language
-           where id = words.language_id) as language,
-           words.translation,
-           (select code
-           from language
-           where id = words.translation_language_id) as translation_language
-    from words_with_translations words
-), results_by_relevance as (
-    select results.*,
-           (similarity(results.word, :search_string)) as relevance
-    from results_with_languages results
-    order by relevance desc
-)
-select * from results_by_relevance
-limit :max_results
-"""  # noqa
 
 
-def get_lookup_query(database_name=""):
-    if database_name.startswith("postgres"):
-        return LOOKUP_QUERY_POSTGRESQL
-    else:
-        return LOOKUP_QUERY
+async def fetch_lookup_results(values, mode="prefix"):
+    domain = values.get("domain")
+    if lookup_index is not None and mode == "prefix" and not domain:
+        return lookup_index.lookup(**values)
+    if database is None:
+        if domain:
+            raise ValueError("domain filters require a database")
+        raise ValueError(f"{mode} lookups require a database")
+    query = get_lookup_query(
+        database_name=database.url.scheme, mode=mode, domain=bool(domain)
+    )
+    if mode == "fulltext" and not await check_fulltext_index():
+        raise ValueError("fulltext lookups require the full-text index")
+    if not cache.enabled:
+        return get_result_dicts(await database.fetch_all(query=query, values=values))
+    await refresh_cache_generation()
+    cache_key = get_cache_key(values, mode)
+    results = cache.get(cache_key)
+    if results is None:
+        rows = await database.fetch_all(query=query, values=values)
+        results = get_result_dicts(rows)
+        cache.put(cache_key, results)
+    return results
+
 
+async def fetch_batch_lookup_results(values_list):
+    """Return the results for a list of lookups (of one language pair) by search key.
 
-DEFAULT_NUM_RESULTS = 20
-MAX_NUM_RESULTS = 50
+    All lookups which cannot be answered from the cache are sent to the database in
+    a single query.
+    """
+    if lookup_index is not None:
+        return {
+            values["search_key"]: lookup_index.lookup(**values)
+            for values in values_list
+        }
+    results_by_key = {}
+    if cache.enabled:
+        await refresh_cache_generation()
+        for values in values_list:
+            results = cache.get(get_cache_key(values))
+            if results is not None:
+                results_by_key[values["search_key"]] = results
+    missing_values = [
+        values for values in values_list if values["search_key"] not in results_by_key
+    ]
+    if not missing_values:
+        return results_by_key
+    rows = await database.fetch_all(
+        query=get_batch_lookup_query(database.url.scheme),
+        values=get_batch_lookup_values(missing_values),
+    )
+    new_results = [[] for _ in missing_values]
+    for row, result in zip(rows, get_result_dicts(rows, exclude=("position",))):
+        new_results[row["position"]].append(result)
+    for values, results in zip(missing_values, new_results):
+        results_by_key[values["search_key"]] = results
+        if cache.enabled:
+            cache.put(get_cache_key(values), results)
+    return results_by_key
 
 
 @app.get("/lookup")
@@ -135,13 +248,165 @@ async def lookup(
     target_language: str = Query(..., min_length=3, max_length=3),
     search_string: str = Query(..., min_length=2, max_length=100),
     max_results: int = DEFAULT_NUM_RESULTS,
+    mode: str = Query("prefix", regex=f"^({'|'.join(LOOKUP_MODES)})$"),
+    domain: str = Query(None, min_length=1, max_length=50),
 ):
-    query = get_lookup_query(database_name=database.url.scheme)
-    values = {
-        "source_language": source_language,
-        "target_language": target_language,
-        "search_string": search_string.strip(),
-        "max_results": min(max_results, MAX_NUM_RESULTS),
-    }
-    results = await database.fetch_all(query=query, values=values)
+    if not get_search_key(search_string):
+        # Nothing left to search for (e.g. the search string was only an annotation)
+        return {"results": []}
+    values = get_lookup_values(
+        source_language,
+        target_language,
+        search_string,
+        min(max_results, MAX_NUM_RESULTS),
+        mode=mode,
+        domain=domain,
+    )
+    try:
+        results = await fetch_lookup_results(values, mode)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     return {"results": results}
+
+
+@app.get("/stats")
+def stats():
+    stats = {"cache": cache.get_stats()}
+    if database:
+        stats["database"] = database.get_stats()
+    return stats
+
+
+def collect_metrics():
+    """Return the metrics read from the cache and the database when scraped."""
+    if cache is not None:
+        cache_stats = cache.get_stats()
+        num_lookups = cache_stats["hits"] + cache_stats["misses"]
+        yield from [
+            (
+                "dictionarydb_cache_hits_total",
+                "counter",
+                "Cache hits.",
+                cache_stats["hits"],
+            ),
+            (
+                "dictionarydb_cache_misses_total",
+                "counter",
+                "Cache misses.",
+                cache_stats["misses"],
+            ),
+            (
+                "dictionarydb_cache_evictions_total",
+                "counter",
+                "Entries evicted from the cache.",
+                cache_stats["evictions"],
+            ),
+            (
+                "dictionarydb_cache_invalidations_total",
+                "counter",
+                "Times the cache was cleared after an import.",
+                cache_stats["invalidations"],
+            ),
+            (
+                "dictionarydb_cache_entries",
+                "gauge",
+                "Entries in the cache.",
+                cache_stats["size"],
+            ),
+            (
+                "dictionarydb_cache_hit_ratio",
+                "gauge",
+                "Share of lookups answered from the cache.",
+                cache_stats["hits"] / num_lookups if num_lookups else 0.0,
+            ),
+        ]
+    if database is not None:
+        database_stats = database.get_stats()
+        yield from [
+            (
+                "dictionarydb_database_pool_max_size",
+                "gauge",
+                "Maximum number of connections in the pool of each database.",
+                settings.API_DATABASE_POOL_MAX_SIZE,
+            ),
+            (
+                "dictionarydb_database_healthy_replicas",
+                "gauge",
+                "Read replicas which are in the rotation.",
+                database_stats["healthy_replicas"],
+            ),
+            (
+                "dictionarydb_database_replica_fallbacks_total",
+                "counter",
+                "Queries sent to the primary database because no replica could "
+                "answer them.",
+                database_stats["fallbacks"],
+            ),
+        ]
+
+
+REGISTRY.add_collector(collect_metrics)
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+class BatchLookupRequest(BaseModel):
+    source_language: constr(min_length=3, max_length=3)
+    target_language: constr(min_length=3, max_length=3)
+    search_strings: conlist(
+        constr(min_length=2, max_length=100),
+        min_items=1,
+        max_items=settings.API_BATCH_MAX_SIZE,
+    )
+    max_results: int = DEFAULT_NUM_RESULTS
+
+
+class BatchLookupResults(BaseModel):
+    search_string: str
+    results: List[dict]
+
+
+class BatchLookupResponse(BaseModel):
+    results: List[BatchLookupResults]
+    truncated: bool
+
+
+@app.post("/lookup/batch", response_model=BatchLookupResponse)
+async def batch_lookup(request: BatchLookupRequest):
+    """Look up several search strings of one language pair at once.
+
+    The results are returned per search string, in the order of the search strings.
+    Once the total number of results reaches the limit, no more results are added to
+    the response and it is marked as truncated.
+    """
+    max_results = min(
+        request.max_results, MAX_NUM_RESULTS, settings.API_BATCH_MAX_RESULTS
+    )
+    values_by_key = {}
+    for search_string in request.search_strings:
+        values = get_lookup_values(
+            request.source_language,
+            request.target_language,
+            search_string,
+            max_results,
+        )
+        if values["search_key"]:
+            values_by_key[values["search_key"]] = values
+    results_by_key = {}
+    if values_by_key:
+        results_by_key = await fetch_batch_lookup_results(list(values_by_key.values()))
+
+    response_results = []
+    num_results_left = settings.API_BATCH_MAX_RESULTS
+    truncated = False
+    for search_string in request.search_strings:
+        results = results_by_key.get(get_search_key(search_string), [])
+        if len(results) > num_results_left:
+            results = results[:num_results_left]
+            truncated = True
+        num_results_left -= len(results)
+        response_results.append({"search_string": search_string, "results": results})
+    return {"results": response_results, "truncated": truncated}
@@ -0,0 +1,100 @@
+"""
+Core-level bulk writing of plain row tuples, bypassing the ORM.
+
+Rows are sent through the DBAPI connection of an existing SQLAlchemy connection, so
+they become part of the transaction that is already in progress on it.
+
+On PostgreSQL, the rows are streamed to the server using ``COPY … FROM STDIN``. On all
+other databases (e.g. SQLite), a prepared ``INSERT`` statement is executed once for
+all rows using ``executemany``.
+"""
+#: Characters that need escaping in PostgreSQL's COPY text format.
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+COPY_NULL = "\\N"
+COPY_READ_SIZE = 64 * 1024
+
+
+def format_copy_value(value):
+    if value is None:
+        return COPY_NULL
+    return str(value).translate(COPY_ESCAPES)
+
+
+def format_copy_row(row):
+    return "\t".join(format_copy_value(value) for value in row) + "\n"
+
+
+class CopyStream(object):
+    """A read-only file-like object that yields rows in COPY text format on demand.
+
+    The rows are formatted lazily as the database driver reads from the stream, so
+    no more than roughly one read buffer worth of data is held in memory at once.
+    """
+
+    def __init__(self, rows):
+        self.lines = (format_copy_row(row) for row in rows)
+        self.pending = ""
+
+    def read(self, size=-1):
+        parts = [self.pending]
+        length = len(self.pending)
+        # Only format more rows while the leftover data is shorter than requested
+        while size < 0 or length < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        data = "".join(parts)
+        if size < 0:
+            self.pending = ""
+            return data
+        self.pending = data[size:]
+        return data[:size]
+
+
+def get_placeholder(paramstyle, position):
+    if paramstyle == "qmark":
+        return "?"
+    if paramstyle in ("format", "pyformat"):
+        return "%s"
+    if paramstyle == "numeric":
+        return f":{position + 1}"
+    raise ValueError(f'unsupported DBAPI parameter style "{paramstyle}"')
+
+
+def get_insert_statement(table_name, columns, paramstyle):
+    placeholders = ", ".join(
+        get_placeholder(paramstyle, position) for position in range(len(columns))
+    )
+    return f"insert into {table_name} ({', '.join(columns)}) values ({placeholders})"
+
+
+def get_copy_statement(table_name, columns):
+    return f"copy {table_name} ({', '.join(columns)}) from stdin"
+
+
+def copy_rows(cursor, table_name, columns, rows):
+    stream = CopyStream(rows)
+    cursor.copy_expert(get_copy_statement(table_name, columns), stream, COPY_READ_SIZE)
+
+
+def executemany_rows(cursor, table_name, columns, rows, paramstyle):
+    cursor.executemany(get_insert_statement(table_name, columns, paramstyle), rows)
+
+
+def insert_rows(connection, table_name, columns, rows):
+    """Insert an iterable of row tuples into a table using the fastest native path.
+
+    The ``connection`` must be a SQLAlchemy connection; its current transaction is
+    used for the insert.
+    """
+    dialect = connection.dialect
+    cursor = connection.connection.cursor()
+    try:
+        if dialect.name.startswith("postgres"):
+            copy_rows(cursor, table_name, columns, rows)
+        else:
+            executemany_rows(cursor, table_name, columns, rows, dialect.paramstyle)
+    finally:
+        cursor.close()
@@ -0,0 +1,87 @@
+"""
+An in-memory cache for the results of API lookups.
+
+Cached results belong to a *generation* of the dictionary, a counter which every
+import increments when it commits (see `bump_generation`). Once the cache is told
+about a new generation, it forgets all of its results.
+"""
+import time
+from collections import OrderedDict
+
+#: How often (in seconds) to ask the database for the current generation.
+GENERATION_CHECK_INTERVAL = 1.0
+
+
+class LookupCache(object):
+    """A bounded LRU cache whose entries expire after a time to live (in seconds)."""
+
+    def __init__(
+        self,
+        max_size,
+        ttl,
+        generation_check_interval=GENERATION_CHECK_INTERVAL,
+        clock=time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation_check_interval = generation_check_interval
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.generation = None
+        self.generation_checked_at = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def should_check_generation(self):
+        if self.generation_checked_at is None:
+            return True
+        return (
+            self.clock() >= self.generation_checked_at + self.generation_check_interval
+        )
+
+    def set_generation(self, generation):
+        """Record the current generation, dropping all entries if it has changed."""
+        self.generation_checked_at = self.clock()
+        if generation == self.generation:
+            return
+        if self.entries:
+            self.entries.clear()
+            self.invalidations += 1
+        self.generation = generation
+
+    def get(self, key):
+        """Return the value cached for a key, or None if it is missing or expired."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if self.clock() < expires_at:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_stats(self):
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
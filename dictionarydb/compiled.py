@@ -0,0 +1,158 @@
+"""
+A read-only, memory-mappable file format for a compiled `LookupIndex`.
+
+The file contains the arrays and the string pool of the index exactly as they are used
+for lookups, so it can be memory-mapped and used without parsing or copying it. All
+processes which map the same file share a single copy of it in the page cache.
+
+Layout (all integers are unsigned and little-endian)::
+
+  header        magic, version, number of pairs, strings and entries, pool size
+  pairs         source code, target code, first entry, end of entries (per pair)
+  offsets       64-bit start offset of every string in the pool (plus the end)
+  key ids       32-bit string number of every entry's search key
+  word ids      32-bit string number of every entry's word
+  translations  32-bit string number of every entry's translation
+  pool          the UTF-8 encoded strings
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from dictionarydb.index import OFFSET_TYPECODE, STRING_ID_TYPECODE, LookupIndex
+
+MAGIC = b"DICTIONARYDB"
+VERSION = 1
+
+HEADER = struct.Struct("<12sIQQQQ")
+PAIR = struct.Struct("<3s3s2xQQ")
+
+NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def to_little_endian(values):
+    if NATIVE_LITTLE_ENDIAN:
+        return values
+    values = array(values.typecode, values)
+    values.byteswap()
+    return values
+
+
+def write_compiled_file(lookup_index, path):
+    """Write a lookup index to a compiled file.
+
+    The file is written under a temporary name first and then renamed, so processes
+    which have mapped an earlier version of the file can keep using it.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".dictionarydb-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    len(lookup_index.pairs),
+                    len(lookup_index.offsets) - 1,
+                    len(lookup_index),
+                    len(lookup_index.pool),
+                )
+            )
+            for (source_code, target_code), (start, end) in sorted(
+                lookup_index.pairs.items()
+            ):
+                file.write(
+                    PAIR.pack(
+                        source_code.encode("ascii"),
+                        target_code.encode("ascii"),
+                        start,
+                        end,
+                    )
+                )
+            for values in (
+                lookup_index.offsets,
+                lookup_index.key_ids,
+                lookup_index.word_ids,
+                lookup_index.translation_ids,
+            ):
+                file.write(to_little_endian(values).tobytes())
+            file.write(lookup_index.pool)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class CompiledFile(object):
+    """A compiled file, memory-mapped to serve lookups from it (see `index`)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.views = []
+        self.index = self.read_index()
+
+    @property
+    def size(self):
+        return len(self.mmap)
+
+    def get_view(self, start, length, typecode=None):
+        end = start + length
+        view = memoryview(self.mmap)[start:end]
+        self.views.append(view)
+        if typecode is None:
+            return view
+        if NATIVE_LITTLE_ENDIAN:
+            view = view.cast(typecode)
+            self.views.append(view)
+            return view
+        # Big-endian machines get a (byte-swapped) copy of the arrays instead
+        values = array(typecode, view.tobytes())
+        values.byteswap()
+        return values
+
+    def read_index(self):
+        if self.size < HEADER.size:
+            raise ValueError(f'"{self.path}" is not a compiled dictionary file')
+        header = HEADER.unpack_from(self.mmap)
+        magic, version, num_pairs, num_strings, num_entries, pool_size = header
+        if magic != MAGIC:
+            raise ValueError(f'"{self.path}" is not a compiled dictionary file')
+        if version != VERSION:
+            raise ValueError(f'unsupported compiled file version "{version}"')
+
+        position = HEADER.size
+        pairs = {}
+        for _ in range(num_pairs):
+            source_code, target_code, start, end = PAIR.unpack_from(self.mmap, position)
+            pair = (source_code.decode("ascii"), target_code.decode("ascii"))
+            pairs[pair] = (start, end)
+            position += PAIR.size
+
+        offset_size = array(OFFSET_TYPECODE).itemsize
+        offsets = self.get_view(
+            position, (num_strings + 1) * offset_size, OFFSET_TYPECODE
+        )
+        position += (num_strings + 1) * offset_size
+        id_arrays = []
+        id_size = array(STRING_ID_TYPECODE).itemsize
+        for _ in range(3):
+            id_arrays.append(
+                self.get_view(position, num_entries * id_size, STRING_ID_TYPECODE)
+            )
+            position += num_entries * id_size
+        pool = self.get_view(position, pool_size)
+        if position + pool_size != self.size:
+            raise ValueError(f'"{self.path}" is truncated or corrupt')
+        return LookupIndex(pool, offsets, *id_arrays, pairs)
+
+    def close(self):
+        # The views have to be released before the memory map can be closed
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.mmap.close()
@@ -0,0 +1,160 @@
+"""
+Reading of (possibly compressed) input files, such as the dictionary file to import.
+
+The compression of a file is detected from its first bytes (its "magic number"), not
+from its name, so compressed data can also be read from standard input. The data is
+decompressed while it is read, so no decompressed copy of the file is written to disk
+and the memory used does not grow with the size of the file.
+
+Files compressed with gzip, bzip2 and xz can always be read; files compressed with
+Zstandard require the "zstandard" package (``pip install dictionarydb[zstd]``).
+"""
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import sys
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+#: The magic numbers at the start of compressed files (by compression).
+MAGIC_NUMBERS = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+MAGIC_NUMBER_SIZE = max(len(magic_number) for magic_number in MAGIC_NUMBERS.values())
+
+#: Default size (in bytes) of the buffers used for reading (and decompressing) input.
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def detect_compression(header):
+    """Return the compression of data starting with `header` (None if uncompressed)."""
+    for compression, magic_number in MAGIC_NUMBERS.items():
+        if header.startswith(magic_number):
+            return compression
+    return None
+
+
+def detect_file_compression(path):
+    with open(path, "rb") as file:
+        return detect_compression(file.read(MAGIC_NUMBER_SIZE))
+
+
+def read_exactly(binary_file, size):
+    """Read `size` bytes from a file (fewer only at its end), even from a pipe."""
+    data = b""
+    while len(data) < size:
+        chunk = binary_file.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class PrefixedReader(io.RawIOBase):
+    """A stream which returns some bytes read ahead before the rest of a file.
+
+    Closing the stream does not close the file.
+    """
+
+    def __init__(self, prefix, file):
+        self.prefix = prefix
+        self.file = file
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.prefix:
+            size = min(len(buffer), len(self.prefix))
+            buffer[:size] = self.prefix[:size]
+            self.prefix = self.prefix[size:]
+            return size
+        data = self.file.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def read_header(binary_file, buffer_size=READ_BUFFER_SIZE):
+    """Return the magic number of a file, and a file which still returns all its data.
+
+    The magic number is peeked at if the file is buffered. A pipe may have less data
+    in the buffer, though, so then it is read (and returned again by the new file).
+    """
+    if hasattr(binary_file, "peek"):
+        header = binary_file.peek(MAGIC_NUMBER_SIZE)[:MAGIC_NUMBER_SIZE]
+        if len(header) == MAGIC_NUMBER_SIZE:
+            return header, binary_file
+    header = read_exactly(binary_file, MAGIC_NUMBER_SIZE)
+    return header, io.BufferedReader(PrefixedReader(header, binary_file), buffer_size)
+
+
+def open_zstd(file, buffer_size):
+    if zstandard is None:
+        raise ValueError(
+            'reading Zstandard-compressed input requires the "zstandard" package'
+        )
+    # Files written by parallel compressors consist of several frames
+    return zstandard.ZstdDecompressor().stream_reader(
+        file, read_size=buffer_size, read_across_frames=True, closefd=False
+    )
+
+
+DECOMPRESSORS = {
+    "gzip": lambda file, buffer_size: gzip.GzipFile(fileobj=file, mode="rb"),
+    "bz2": lambda file, buffer_size: bz2.BZ2File(file, mode="rb"),
+    "xz": lambda file, buffer_size: lzma.LZMAFile(file, mode="rb"),
+    "zstd": open_zstd,
+}
+
+
+def decompress(binary_file, buffer_size=READ_BUFFER_SIZE):
+    """Return a binary file which decompresses the data of another one if needed.
+
+    The compression is detected without losing any data, so the file may be a pipe. The
+    returned file may be `binary_file` itself; if not, closing it does not close
+    `binary_file`.
+    """
+    header, binary_file = read_header(binary_file, buffer_size)
+    compression = detect_compression(header)
+    if compression is None:
+        return binary_file, None
+    logger.info(f"Decompressing {compression} input…")
+    decompressed_file = DECOMPRESSORS[compression](binary_file, buffer_size)
+    # Decompress large blocks at once rather than a few kilobytes for every read
+    return io.BufferedReader(decompressed_file, buffer_size), compression
+
+
+@contextmanager
+def open_input(path, buffer_size=READ_BUFFER_SIZE, encoding="utf-8"):
+    """Open a file (or standard input for "-") for reading text, maybe compressed."""
+    if path == "-":
+        binary_file = sys.stdin.buffer
+    else:
+        binary_file = open(path, "rb", buffering=buffer_size)
+    try:
+        decompressed_file, _ = decompress(binary_file, buffer_size)
+        file = io.TextIOWrapper(decompressed_file, encoding)
+        try:
+            yield file
+        finally:
+            if decompressed_file is binary_file:
+                # Leave standard input open
+                file.detach()
+            else:
+                # Closes the decompressor, which does not close the file it reads from
+                file.close()
+    finally:
+        if path != "-":
+            binary_file.close()
@@ -22,7 +22,7 @@ LOG_LEVEL = config("DICTIONARYDB_LOG_LEVEL", default="INFO")
 #:
 #:   $ export DICTIONARYDB_LOG_COLORS='false'
 #:
-LOG_COLORS = config("DICTIONARYDB_LOG_COLORS", type=bool, default=True)
+LOG_COLORS = config("DICTIONARYDB_LOG_COLORS", cast=config.boolean, default="true")
 
 LOGGING_CONFIG = {
     "version": 1,
@@ -68,6 +68,37 @@ DEFAULT_DATABASE_URL = (
 #:
 DATABASE_URL = config("DICTIONARYDB_DATABASE_URL", default=DEFAULT_DATABASE_URL)
 
+#: The type of primary keys to use when creating the database schema.
+#:
+#: "uuid" creates 32-character UUID strings (the format used by all existing
+#: databases). "integer" creates compact 64-bit integer keys, which are allocated in
+#: blocks during the import. This only applies to newly initialized databases; the
+#: "init" and "import" commands detect the key type of an existing schema.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_DATABASE_KEY_TYPE="integer"
+#:
+DATABASE_KEY_TYPE = config("DICTIONARYDB_DATABASE_KEY_TYPE", default="uuid")
+
+#: Whether to create a full-text index of all words when initializing the database.
+#:
+#: It makes full-text lookups possible, which find words containing the search string
+#: anywhere (not only at the start), and is kept up to date by every import. This is
+#: only supported on SQLite (using FTS5).
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_DATABASE_FULLTEXT_INDEX="true"
+#:
+DATABASE_FULLTEXT_INDEX = config(
+    "DICTIONARYDB_DATABASE_FULLTEXT_INDEX", cast=config.boolean, default="false"
+)
+
 #: Maximum number of entries to hold in memory at once during the import.
 #:
 #: Data will be sent to the database (and freed from memory) once N entries
@@ -81,7 +112,132 @@ DATABASE_URL = config("DICTIONARYDB_DATABASE_URL", default=DEFAULT_DATABASE_URL)
 #:
 #:   $ export DICTIONARYDB_IMPORT_CHUNK_SIZE="50000"
 #:
-IMPORT_CHUNK_SIZE = config("DICTIONARYDB_IMPORT_CHUNK_SIZE", type=int, default=10_000)
+IMPORT_CHUNK_SIZE = config("DICTIONARYDB_IMPORT_CHUNK_SIZE", cast=int, default="10000")
+
+#: Number of chunks of entries to prepare ahead of time during the import.
+#:
+#: While one chunk is being written to the database, the next chunks are parsed and
+#: turned into database rows in a background thread. At most this many prepared chunks
+#: are held in memory (in addition to the chunk being written). Set this to 0 to
+#: prepare and write the chunks strictly one after another.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_QUEUE_DEPTH="4"
+#:
+IMPORT_QUEUE_DEPTH = config("DICTIONARYDB_IMPORT_QUEUE_DEPTH", cast=int, default="2")
+
+#: Number of processes to use for parsing the input file during the import.
+#:
+#: With more than one process, the file is split into parts which are parsed in
+#: parallel. Set this to the number of spare CPU cores for the fastest imports.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_PARSE_WORKERS="4"
+#:
+IMPORT_PARSE_WORKERS = config(
+    "DICTIONARYDB_IMPORT_PARSE_WORKERS", cast=int, default="1"
+)
+
+#: Size (in bytes) of the buffers used for reading (and decompressing) the input file.
+#:
+#: Input files compressed with gzip, bzip2, xz or Zstandard are decompressed while they
+#: are read; larger buffers mean fewer (and larger) reads from the disk or pipe.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_READ_BUFFER_SIZE="4194304"
+#:
+IMPORT_READ_BUFFER_SIZE = config(
+    "DICTIONARYDB_IMPORT_READ_BUFFER_SIZE", cast=int, default="1048576"
+)
+
+#: Maximum number of entries to keep in memory in each index that is used to store
+#: every distinct word only once during the import.
+#:
+#: There is one index per language (mapping words to their keys) and one for the
+#: translations. When an index is full, it forgets (or spills to disk, see below) the
+#: least recently used entries; forgotten words will be stored again if they reappear.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_DEDUPE_INDEX_SIZE="5000000"
+#:
+IMPORT_DEDUPE_INDEX_SIZE = config(
+    "DICTIONARYDB_IMPORT_DEDUPE_INDEX_SIZE", cast=int, default="1000000"
+)
+
+#: Whether or not to move entries to a temporary file on disk when a deduplication
+#: index is full (instead of forgetting them). Useful for very large input files.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_DEDUPE_SPILL="true"
+#:
+IMPORT_DEDUPE_SPILL = config(
+    "DICTIONARYDB_IMPORT_DEDUPE_SPILL", cast=config.boolean, default="false"
+)
+
+#: Number of chunks after which the importer logs its progress (0 to disable).
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_PROGRESS_INTERVAL="100"
+#:
+IMPORT_PROGRESS_INTERVAL = config(
+    "DICTIONARYDB_IMPORT_PROGRESS_INTERVAL", cast=int, default="10"
+)
+
+#: Whether or not to store each word of a group of synonyms (like "Etage {f}; Stock
+#: {m}") as a word of its own, so that it can be looked up by itself. The translations
+#: are still stored once for the whole group.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_SPLIT_SYNONYMS="true"
+#:
+IMPORT_SPLIT_SYNONYMS = config(
+    "DICTIONARYDB_IMPORT_SPLIT_SYNONYMS", cast=config.boolean, default="false"
+)
+
+#: The strategy to use for writing the imported entries to the database.
+#:
+#: "core" sends plain rows to the database, bypassing the ORM: prepared inserts
+#: (`executemany`) on SQLite and a streamed `COPY … FROM STDIN` on PostgreSQL.
+#: "orm" creates and saves a model object for every row, which is much slower.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_IMPORT_LOADER="orm"
+#:
+IMPORT_LOADER = config("DICTIONARYDB_IMPORT_LOADER", default="core")
+
+#: Number of rows to fetch from the database at once during an export.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_EXPORT_FETCH_SIZE="10000"
+#:
+EXPORT_FETCH_SIZE = config("DICTIONARYDB_EXPORT_FETCH_SIZE", cast=int, default="1000")
 
 #: Network address on which the API server should listen.
 #:
@@ -126,5 +282,166 @@ API_PORT = config("DICTIONARYDB_API_PORT", cast=int, default="8080")
 #:
 API_TRUST_PROXY_IPS = config("DICTIONARYDB_API_TRUST_PROXY_IPS", default="127.0.0.1")
 
+#: Maximum number of lookup results to keep in the API's in-memory cache.
+#:
+#: Repeated lookups (e.g. the same prefixes typed into an autocomplete field) are then
+#: answered from memory. Once the cache is full, the least recently used results are
+#: evicted. The cache is cleared as soon as the API notices that an import has been
+#: committed. Set it to 0 to disable the cache.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_CACHE_SIZE="50000"
+#:
+API_CACHE_SIZE = config("DICTIONARYDB_API_CACHE_SIZE", cast=int, default="10000")
+
+#: Maximum number of seconds for which cached lookup results are used.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_CACHE_TTL="60"
+#:
+API_CACHE_TTL = config("DICTIONARYDB_API_CACHE_TTL", cast=float, default="300")
+
+#: Maximum number of search strings which can be looked up in one batch request.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_BATCH_MAX_SIZE="500"
+#:
+API_BATCH_MAX_SIZE = config("DICTIONARYDB_API_BATCH_MAX_SIZE", cast=int, default="100")
+
+#: Maximum total number of results returned for one batch request.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_BATCH_MAX_RESULTS="5000"
+#:
+API_BATCH_MAX_RESULTS = config(
+    "DICTIONARYDB_API_BATCH_MAX_RESULTS", cast=int, default="1000"
+)
+
+#: Minimum number of connections which the API keeps open to each PostgreSQL database.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_DATABASE_POOL_MIN_SIZE="20"
+#:
+API_DATABASE_POOL_MIN_SIZE = config(
+    "DICTIONARYDB_API_DATABASE_POOL_MIN_SIZE", cast=int, default="10"
+)
+
+#: Maximum number of connections which the API opens to each PostgreSQL database.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_DATABASE_POOL_MAX_SIZE="50"
+#:
+API_DATABASE_POOL_MAX_SIZE = config(
+    "DICTIONARYDB_API_DATABASE_POOL_MAX_SIZE", cast=int, default="10"
+)
+
+#: Maximum number of seconds an API query may wait for a free connection from the pool
+#: (the query itself is not limited). Set it to 0 to wait as long as it takes.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_DATABASE_ACQUIRE_TIMEOUT="2.5"
+#:
+API_DATABASE_ACQUIRE_TIMEOUT = config(
+    "DICTIONARYDB_API_DATABASE_ACQUIRE_TIMEOUT", cast=float, default="10"
+)
+
+#: Connection URLs of read replicas of the database, separated by commas.
+#:
+#: The API sends its queries to the replicas in turn. A replica which fails is left out
+#: for `API_DATABASE_REPLICA_RETRY_INTERVAL` seconds, and the primary database (see
+#: `DATABASE_URL`) answers in its place.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_DATABASE_REPLICA_URLS="postgresql://replica1/dictionary"
+#:
+API_DATABASE_REPLICA_URLS = config(
+    "DICTIONARYDB_API_DATABASE_REPLICA_URLS", cast=config.list, default=""
+)
+
+#: Number of seconds after which the API tries a failed read replica again.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_DATABASE_REPLICA_RETRY_INTERVAL="60"
+#:
+API_DATABASE_REPLICA_RETRY_INTERVAL = config(
+    "DICTIONARYDB_API_DATABASE_REPLICA_RETRY_INTERVAL", cast=float, default="30"
+)
+
+#: Minimum similarity (between 0 and 1) of the words found by fuzzy lookups.
+#:
+#: The similarity is the share of trigrams (groups of three consecutive characters)
+#: that the search string and a word have in common. It only applies to PostgreSQL,
+#: the only database which supports fuzzy lookups.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_API_FUZZY_THRESHOLD="0.5"
+#:
+API_FUZZY_THRESHOLD = config(
+    "DICTIONARYDB_API_FUZZY_THRESHOLD", cast=float, default="0.3"
+)
+
+#: Where the API looks up the translations.
+#:
+#: - "database": query the database for every lookup (the default).
+#: - "memory": load all lookup entries from the database into a compact in-memory
+#:   index when the API server starts, and answer lookups from it without any SQL.
+#:   Entries imported later are only picked up after a restart.
+#: - "file": memory-map a compiled dictionary file (see `dictionarydb compile` and
+#:   `LOOKUP_FILE`) and answer lookups from it without any SQL. All API processes
+#:   on a host share the same copy of the file in memory.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_LOOKUP_BACKEND="memory"
+#:
+LOOKUP_BACKEND = config("DICTIONARYDB_LOOKUP_BACKEND", default="database")
+
+DEFAULT_LOOKUP_FILE = (
+    Path(__file__).resolve().parent / ".." / "data" / "dictionary.lookup"
+)
+
+#: The path of the compiled dictionary file to serve lookups from when using the
+#: "file" lookup backend, and the default output path of `dictionarydb compile`.
+#:
+#: Example configuration:
+#:
+#: .. code-block:: shell
+#:
+#:   $ export DICTIONARYDB_LOOKUP_FILE="/srv/dictionarydb/dictionary.lookup"
+#:
+LOOKUP_FILE = config("DICTIONARYDB_LOOKUP_FILE", default=str(DEFAULT_LOOKUP_FILE))
+
 # Make the local variables in this module available as settings.<NAME>
 settings = sys.modules[__name__]
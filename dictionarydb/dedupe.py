@@ -0,0 +1,85 @@
+"""
+Memory-bounded indexes to recognize values that were already stored during an import.
+
+An index holds at most a fixed number of entries in memory. When it grows beyond that,
+its least recently used entries are either moved to a temporary SQLite database file
+on disk ("spilled") or forgotten. An index which has forgotten entries is no longer
+*complete*: a value that is not found in it may still have been stored before.
+"""
+import os
+import sqlite3
+import tempfile
+from collections import OrderedDict
+
+
+class SpillFile(object):
+    """A simple key/value store in a temporary SQLite database file."""
+
+    def __init__(self, directory=None):
+        fd, self.path = tempfile.mkstemp(
+            prefix="dictionarydb-", suffix=".sqlite", dir=directory
+        )
+        os.close(fd)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        # The file is thrown away afterwards, so it does not need to be crash-safe
+        self.connection.execute("pragma journal_mode=off")
+        self.connection.execute("pragma synchronous=off")
+        self.connection.execute(
+            "create table entry (key text primary key, value) without rowid"
+        )
+
+    def get(self, key):
+        row = self.connection.execute(
+            "select value from entry where key = ?", (str(key),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items):
+        self.connection.executemany(
+            "insert or replace into entry (key, value) values (?, ?)",
+            ((str(key), value) for key, value in items),
+        )
+
+    def close(self):
+        self.connection.close()
+        os.remove(self.path)
+
+
+class BoundedIndex(object):
+    """A mapping which keeps at most `max_size` entries in memory."""
+
+    def __init__(self, max_size, spill=False, spill_directory=None):
+        self.max_size = max(max_size, 1)
+        self.entries = OrderedDict()
+        self.spill_file = SpillFile(spill_directory) if spill else None
+        self.num_spilled = 0
+        self.complete = True
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        elif self.num_spilled:
+            value = self.spill_file.get(key)
+        return value
+
+    def add(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.evict()
+
+    def evict(self):
+        # Evict a batch of entries at once to make the writes to disk more efficient
+        num_evicted = max(self.max_size // 10, 1)
+        evicted = [self.entries.popitem(last=False) for _ in range(num_evicted)]
+        if self.spill_file:
+            self.spill_file.put_many(evicted)
+            self.num_spilled += num_evicted
+        else:
+            self.complete = False
+
+    def close(self):
+        self.entries.clear()
+        if self.spill_file:
+            self.spill_file.close()
+            self.spill_file = None
@@ -0,0 +1,164 @@
+"""
+Inspection of the query plans of the lookup queries (see `LOOKUP_QUERY`).
+
+The lookup query is explained using ``EXPLAIN QUERY PLAN`` on SQLite and ``EXPLAIN
+(ANALYZE, BUFFERS)`` on PostgreSQL (which runs the query). The plan is then checked
+for full scans of tables, which make lookups slower the more entries are stored. For
+each table which is scanned in full, the indexes which exist on it (but are not used)
+are listed. Sorts which do not use an index are noted as well; they are expected when
+the results are ranked by relevance.
+
+A fixed set of probe lookups (see `PROBES`) covers the shapes of lookup queries, so
+that regressions can be found after changing the schema or the queries.
+"""
+import re
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from dictionarydb.config import settings
+from dictionarydb.models import has_fulltext_index
+from dictionarydb.query import get_lookup_query, get_lookup_values
+
+#: The plan of a lookup query, and the problems found in it.
+QueryPlan = namedtuple("QueryPlan", ["lines", "full_scans", "unused_indexes", "notes"])
+
+#: A lookup to explain: the search mode, the search string and the domain filter.
+Probe = namedtuple("Probe", ["mode", "search_string", "domain"])
+
+#: Lookups which cover the different shapes of the lookup query.
+PROBES = [
+    Probe("prefix", "ha", None),  # Short prefix, matches many search keys
+    Probe("prefix", "Haus {n}", None),  # Annotations are removed from the search key
+    Probe("prefix", "haus", "biol."),  # Domain filter
+    Probe("fuzzy", "hause", None),  # PostgreSQL only
+    Probe("fulltext", "haus", None),  # SQLite only (with the full-text index)
+]
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "explain query plan ",
+    "postgresql": "explain (analyze, buffers) ",
+}
+
+INDEX_QUERIES = {
+    "sqlite": "select name from pragma_index_list(:table_name)",
+    "postgresql": "select indexname from pg_indexes where tablename = :table_name",
+}
+
+TABLE_QUERIES = {
+    "sqlite": "select name from sqlite_master where type = 'table'",
+    "postgresql": "select tablename from pg_tables where schemaname = current_schema()",
+}
+
+# SQLite: "SCAN word" or "SCAN word USING COVERING INDEX ..." (but not the scans of
+# virtual tables, like the full-text index, which use their own index)
+SQLITE_FULL_SCAN_PATTERN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*VIRTUAL TABLE)")
+SQLITE_SORT_PATTERN = re.compile(r"USE TEMP B-TREE FOR (.+)")
+# PostgreSQL: "Seq Scan on word" (or "Seq Scan on word word1" with an alias)
+POSTGRESQL_FULL_SCAN_PATTERN = re.compile(r"Seq Scan on (\w+)")
+POSTGRESQL_SORT_PATTERN = re.compile(r"Sort Method: external (\w+)")
+
+
+def get_dialect_name(connection):
+    name = connection.dialect.name
+    return "postgresql" if name.startswith("postgres") else name
+
+
+def get_plan_lines(connection, query, values):
+    """Return the lines of the query plan of a query."""
+    dialect_name = get_dialect_name(connection)
+    rows = connection.execute(text(EXPLAIN_PREFIXES[dialect_name] + query), values)
+    if dialect_name == "sqlite":
+        # The rows are (id, parent id, unused, detail); indent each row by its depth
+        depths = {0: -1}
+        lines = []
+        for node_id, parent_id, _, detail in rows:
+            depths[node_id] = depths.get(parent_id, -1) + 1
+            lines.append("  " * depths[node_id] + detail)
+        return lines
+    return [row[0] for row in rows]
+
+
+def resolve_table_name(query, name):
+    """Return the name of the table which is aliased as `name` in a query."""
+    match = re.search(rf"\b(\w+)\s+as\s+{name}\b", query, re.IGNORECASE)
+    return match.group(1) if match else name
+
+
+def find_problems(dialect_name, lines):
+    """Return the names scanned in full and notes about sorts in a query plan."""
+    full_scans = []
+    notes = []
+    for line in lines:
+        line = line.strip()
+        if dialect_name == "sqlite":
+            full_scan_match = SQLITE_FULL_SCAN_PATTERN.match(line)
+            sort_match = SQLITE_SORT_PATTERN.search(line)
+            if sort_match:
+                notes.append(f"sorts in a temporary b-tree ({sort_match.group(1)})")
+        else:
+            full_scan_match = POSTGRESQL_FULL_SCAN_PATTERN.search(line)
+            sort_match = POSTGRESQL_SORT_PATTERN.search(line)
+            if sort_match:
+                notes.append(f"sort spills to disk (external {sort_match.group(1)})")
+        if full_scan_match and full_scan_match.group(1) not in full_scans:
+            full_scans.append(full_scan_match.group(1))
+    return full_scans, notes
+
+
+def analyze_plan(connection, query, lines):
+    """Find the tables which are scanned in full, and their unused indexes."""
+    dialect_name = get_dialect_name(connection)
+    names, notes = find_problems(dialect_name, lines)
+    table_names = {
+        row[0] for row in connection.execute(text(TABLE_QUERIES[dialect_name]))
+    }
+    full_scans = []
+    unused_indexes = {}
+    for name in names:
+        table_name = resolve_table_name(query, name)
+        if table_name not in table_names:
+            continue  # E.g. a common table expression
+        full_scans.append(table_name)
+        unused_indexes[table_name] = [
+            row[0]
+            for row in connection.execute(
+                text(INDEX_QUERIES[dialect_name]), {"table_name": table_name}
+            )
+        ]
+    return full_scans, unused_indexes, notes
+
+
+def explain_lookup(
+    connection,
+    source_language,
+    target_language,
+    search_string,
+    max_results,
+    mode="prefix",
+    domain=None,
+):
+    """Return the `QueryPlan` of a lookup (with the same parameters as `/lookup`).
+
+    A `ValueError` is raised if the lookup is not supported by the database.
+    """
+    dialect_name = get_dialect_name(connection)
+    query = get_lookup_query(dialect_name, mode=mode, domain=bool(domain))
+    if mode == "fulltext" and not has_fulltext_index(connection):
+        raise ValueError("fulltext lookups require the full-text index")
+    values = get_lookup_values(
+        source_language,
+        target_language,
+        search_string,
+        max_results,
+        mode=mode,
+        domain=domain,
+    )
+    if mode == "fuzzy":
+        # Set up the connection like the API does (see `new_database`)
+        connection.execute(
+            text("select set_config('pg_trgm.similarity_threshold', :value, false)"),
+            {"value": str(settings.API_FUZZY_THRESHOLD)},
+        )
+    lines = get_plan_lines(connection, query, values)
+    return QueryPlan(lines, *analyze_plan(connection, query, lines))
@@ -0,0 +1,187 @@
+"""
+Code for exporting the entries of the dictionary database to a file.
+
+The entries of a language pair are streamed from the database in batches (using a
+server-side cursor where the database driver supports it), so an export needs the same
+small amount of memory no matter how many entries there are.
+
+Three output formats are supported:
+
+* ``ding``: the file format of the Ding dictionary lookup program (see
+  `dictionarydb.parser`), one entry per line, so it can be imported again.
+* ``tsv``: the word and its translation, separated by a tab character.
+* ``jsonl``: one JSON object per line, including the language codes.
+
+Each of them can be compressed with gzip, bzip2 or xz.
+"""
+import bz2
+import gzip
+import io
+import json
+import logging
+import lzma
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import and_, select
+
+from dictionarydb.models import Language, Translation, Word
+from dictionarydb.parser import TRANSLATION_SEPARATOR, WORD_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ding", "tsv", "jsonl")
+
+#: Functions to open a compressed file (or file object) for writing, by name.
+COMPRESSIONS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+#: File name extensions which select a compression if none is given explicitly.
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+}
+
+
+def get_compression(path):
+    """Return the compression matching the extension of a file name (if any)."""
+    for extension, compression in COMPRESSION_EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+@contextmanager
+def open_output(path, compression=None):
+    """Open a file (or standard output for "-") for writing text, maybe compressed."""
+    if path != "-":
+        open_file = COMPRESSIONS.get(compression, open)
+        with open_file(path, "wt", encoding="utf-8") as file:
+            yield file
+        return
+    binary_file = sys.stdout.buffer
+    if compression:
+        # The compressed file does not close the standard output it wraps
+        binary_file = COMPRESSIONS[compression](binary_file, "wb")
+    file = io.TextIOWrapper(binary_file, encoding="utf-8")
+    try:
+        yield file
+    finally:
+        file.flush()
+        file.detach()
+        if compression:
+            binary_file.close()
+
+
+def get_language_id(connection, language_code):
+    table = Language.__table__
+    query = select([table.c.id]).where(table.c.code == language_code)
+    language_id = connection.execute(query).scalar()
+    if language_id is None:
+        raise ValueError(f'language "{language_code}" is not in the database')
+    return language_id
+
+
+def select_entries(source_language_id, target_language_id):
+    """Select the words of a language and their translations into another one.
+
+    A translation may have been stored in either direction, so there is one query for
+    each direction. Each query returns its rows in the order of the primary key of the
+    translations, so the rows can be streamed without sorting (or deduplicating) all
+    of them first, and every export of the same entries is the same.
+    """
+    word_table = Word.__table__
+    translation_table = Translation.__table__
+    word1 = word_table.alias("word1")
+    word2 = word_table.alias("word2")
+    words = translation_table.join(
+        word1, word1.c.id == translation_table.c.word1_id
+    ).join(word2, word2.c.id == translation_table.c.word2_id)
+    return [
+        select([word.c.text, translation.c.text])
+        .select_from(words)
+        .where(
+            and_(
+                word.c.language_id == source_language_id,
+                translation.c.language_id == target_language_id,
+            )
+        )
+        .order_by(translation_table.c.word1_id, translation_table.c.word2_id)
+        for word, translation in ((word1, word2), (word2, word1))
+    ]
+
+
+def iter_entries(engine, source_language_code, target_language_code, fetch_size):
+    """Yield the entries of a language pair, fetching `fetch_size` rows at a time."""
+    with engine.connect() as connection:
+        source_language_id = get_language_id(connection, source_language_code)
+        target_language_id = get_language_id(connection, target_language_code)
+        for query in select_entries(source_language_id, target_language_id):
+            yield from iter_rows(connection, query, fetch_size)
+
+
+def iter_rows(connection, query, fetch_size):
+    # A server-side cursor on PostgreSQL; SQLite steps through the rows anyway
+    result = connection.execution_options(stream_results=True).execute(query)
+    try:
+        while True:
+            rows = result.fetchmany(fetch_size)
+            if not rows:
+                break
+            for source_text, target_text in rows:
+                yield source_text, target_text
+    finally:
+        result.close()
+
+
+def format_ding_entry(source_text, target_text, source_code, target_code):
+    for text in (source_text, target_text):
+        if TRANSLATION_SEPARATOR in text or WORD_SEPARATOR in text or "\n" in text:
+            raise ValueError(f'"{text}" cannot be written in the Ding format')
+    return f"{source_text} {TRANSLATION_SEPARATOR} {target_text}\n"
+
+
+def escape_tsv_value(text):
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def format_tsv_entry(source_text, target_text, source_code, target_code):
+    return f"{escape_tsv_value(source_text)}\t{escape_tsv_value(target_text)}\n"
+
+
+def format_jsonl_entry(source_text, target_text, source_code, target_code):
+    entry = {
+        "word": source_text,
+        "language": source_code,
+        "translation": target_text,
+        "translation_language": target_code,
+    }
+    return json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+FORMATTERS = {
+    "ding": format_ding_entry,
+    "tsv": format_tsv_entry,
+    "jsonl": format_jsonl_entry,
+}
+
+
+def write_entries(file, entries, source_code, target_code, export_format="ding"):
+    """Write entries to a file in one of the export formats and return their number."""
+    format_entry = FORMATTERS[export_format]
+    if export_format == "ding":
+        file.write(f"# {source_code} {TRANSLATION_SEPARATOR} {target_code}\n")
+    num_written = 0
+    for source_text, target_text in entries:
+        try:
+            line = format_entry(source_text, target_text, source_code, target_code)
+        except ValueError as exc:
+            logger.warning(f"Ignoring entry: {exc}")
+            continue
+        file.write(line)
+        num_written += 1
+    return num_written
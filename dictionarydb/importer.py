@@ -1,59 +1,351 @@
 """Code for importing dictionary entries into the database."""
 import logging
+from collections import namedtuple
+from functools import partial
+from hashlib import blake2b
+from itertools import count
 
 from more_itertools import chunked
+from sqlalchemy import String, and_, func, literal, or_, select, union
 
+from dictionarydb.bulk import insert_rows
+from dictionarydb.config import settings
+from dictionarydb.dedupe import BoundedIndex
 from dictionarydb.models import (
     Language,
+    LookupEntry,
     Translation,
     Word,
+    WordDomain,
+    WordSynonym,
+    bump_generation,
+    check_key_type,
+    get_schema_metadata,
+    has_fulltext_index,
     managed_session,
     new_object_id,
+    rebuild_fulltext_index,
+    reserve_keys,
+    validate_word_text,
 )
+from dictionarydb.parser import parse_word, split_synonyms
+from dictionarydb.pipeline import iter_in_background
+from dictionarydb.search import get_search_key
+from dictionarydb.shadow import StagingTables
+from dictionarydb.stats import ImportStats
 
 logger = logging.getLogger(__name__)
 
+WORD_COLUMNS = (
+    "id",
+    "language_id",
+    "text",
+    "search_key",
+    "headword",
+    "grammar",
+    "abbreviation",
+)
+DOMAIN_COLUMNS = ("word_id", "domain")
+SYNONYM_COLUMNS = ("set_id", "word_id")
+TRANSLATION_COLUMNS = ("word1_id", "word2_id", "fingerprint")
+LOOKUP_ENTRY_COLUMNS = (
+    "word_id",
+    "source_code",
+    "target_code",
+    "search_key",
+    "word",
+    "translation",
+)
+
+#: Number of integer keys to reserve from the database at once.
+KEY_BLOCK_SIZE = 10_000
+
+
+class KeyAllocator(object):
+    """Hand out new integer keys, reserving them from the database block by block."""
+
+    def __init__(self, reserve, block_size=KEY_BLOCK_SIZE):
+        self.reserve = reserve
+        self.block_size = block_size
+        self.next_key = self.end_key = 0
+
+    def __call__(self):
+        if self.next_key == self.end_key:
+            self.next_key = self.reserve(self.block_size)
+            self.end_key = self.next_key + self.block_size
+        key = self.next_key
+        self.next_key += 1
+        return key
+
 
-def new_word(text, language):
-    return Word(id=new_object_id(), language_id=language.id, text=text)
+def get_key_allocator(session, model_cls, key_type):
+    """Return a function which returns a new unique key for each row of a model."""
+    if key_type == "uuid":
+        return new_object_id
+    engine = session.get_bind()
+    if engine.dialect.name.startswith("postgres"):
+        return KeyAllocator(partial(reserve_keys, engine, model_cls.__tablename__))
+    # Writes are serialized on SQLite and the import transaction is already holding
+    # the write lock, so every key above the current maximum is ours to hand out.
+    max_key = session.query(func.max(model_cls.id)).scalar() or 0
+    return count(max_key + 1).__next__
 
 
-def new_translation(word1, word2):
-    return Translation(word1_id=word1.id, word2_id=word2.id)
+def get_fingerprint(source_word_text, target_word_text, split_synonyms=False):
+    """Return a 64-bit hash of the contents of an entry (i.e. a pair of words).
 
+    Entries whose synonyms are split are stored differently, so their fingerprints
+    differ as well.
+    """
+    data = f"{source_word_text}\0{target_word_text}"
+    if split_synonyms:
+        data += "\0split_synonyms"
+    digest = blake2b(data.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
 
-def get_model_objects(entries, source_language, target_language):
-    for source_word_text, target_word_text in entries:
-        try:
-            source_word = new_word(source_word_text, source_language)
-            target_word = new_word(target_word_text, target_language)
-            translation = new_translation(source_word, target_word)
-        except Exception as exc:
-            logger.warning(f"Ignoring invalid entry: {exc!r}")
-        else:
-            yield source_word, target_word, translation
 
+class EntryDiff(object):
+    """Tell apart new entries and entries which are already stored (by fingerprint).
 
-def insert_entries(session, entries, source_language, target_language):
-    """Create model objects from each entry and store them."""
-    # Create the necessary model objects (database rows) for each entry
-    model_objects = get_model_objects(entries, source_language, target_language)
-    new_words = []
-    new_translations = []
-    for source_word, target_word, translation in model_objects:
-        new_words.extend([source_word, target_word])
-        new_translations.append(translation)
+    A `ValueError` is raised if the stored entries were imported with the other
+    `split_synonyms` setting, since they would not be stored again.
+    """
+
+    def __init__(self, stored_fingerprints, split_synonyms=False):
+        self.stored_fingerprints = stored_fingerprints
+        self.unchanged_fingerprints = set()
+        self.split_synonyms = split_synonyms
+
+    def check_new_entry(self, entry):
+        if get_fingerprint(*entry, not self.split_synonyms) in self.stored_fingerprints:
+            setting = "without" if self.split_synonyms else "with"
+            raise ValueError(
+                f"the stored entries were imported {setting} split synonyms; import "
+                "them again without --incremental to change the setting"
+            )
+
+    def get_new_entries(self, entries):
+        for entry in entries:
+            fingerprint = get_fingerprint(*entry, self.split_synonyms)
+            if fingerprint in self.stored_fingerprints:
+                self.unchanged_fingerprints.add(fingerprint)
+            else:
+                self.check_new_entry(entry)
+                yield entry
+
+    def get_removed_fingerprints(self):
+        return self.stored_fingerprints - self.unchanged_fingerprints
+
+
+#: The new rows of each table to store for a chunk of entries.
+EntryRows = namedtuple(
+    "EntryRows", ["word_rows", "translation_rows", "domain_rows", "synonym_rows"]
+)
 
+
+class EntryRowBuilder(object):
+    """Create the database rows for entries, storing every distinct word only once.
+
+    Words that were created before are looked up in a memory-bounded index per
+    language (see `BoundedIndex`), so that translations can reference them instead of
+    a new copy. If an index is full and not allowed to spill to disk, words it has
+    forgotten are simply stored again.
+
+    With `split_synonyms`, each word of a group of synonyms (like "Etage {f}; Stock
+    {m}") is stored as a word of its own as well, linked to the group (see
+    `WordSynonym`). The translations are only stored for the group as a whole.
+    """
+
+    def __init__(
+        self,
+        source_language,
+        target_language,
+        new_key=new_object_id,
+        index_size=settings.IMPORT_DEDUPE_INDEX_SIZE,
+        spill=False,
+        split_synonyms=False,
+    ):
+        self.source_language = source_language
+        self.target_language = target_language
+        self.new_key = new_key
+        self.split_synonyms = split_synonyms
+        self.word_indexes = {
+            language.id: BoundedIndex(index_size, spill)
+            for language in (source_language, target_language)
+        }
+        self.translation_index = BoundedIndex(index_size, spill)
+        self.num_word_occurrences = 0
+        self.num_words = 0
+
+    @property
+    def dedupe_ratio(self):
+        return self.num_word_occurrences / self.num_words if self.num_words else 1.0
+
+    def new_word(self, text, language, rows):
+        key = self.new_key()
+        parsed_word = parse_word(text)
+        rows.word_rows.append(
+            (
+                key,
+                language.id,
+                text,
+                get_search_key(text),
+                parsed_word.headword,
+                parsed_word.grammar,
+                parsed_word.abbreviation,
+            )
+        )
+        rows.domain_rows.extend((key, domain) for domain in parsed_word.domains)
+        self.num_words += 1
+        if self.split_synonyms:
+            self.add_synonyms(key, text, language, rows)
+        return key
+
+    def add_synonyms(self, key, text, language, rows):
+        synonyms = split_synonyms(text)
+        if len(synonyms) < 2:
+            return
+        synonym_keys = []
+        for synonym in synonyms:
+            synonym_key, _ = self.get_word(synonym, language, rows)
+            if synonym_key not in synonym_keys:
+                synonym_keys.append(synonym_key)
+        rows.synonym_rows.extend((key, synonym_key) for synonym_key in synonym_keys)
+
+    def add_words(self, language, words):
+        """Add existing words (pairs of text and key) to the index of a language."""
+        index = self.word_indexes[language.id]
+        for text, key in words:
+            index.add(text, key)
+
+    def get_word(self, text, language, rows):
+        """Return the key of a word and whether a new row was created for it."""
+        self.num_word_occurrences += 1
+        index = self.word_indexes[language.id]
+        key = index.get(text)
+        if key is not None:
+            return key, False
+        key = self.new_word(text, language, rows)
+        index.add(text, key)
+        return key, True
+
+    def build_rows(self, entries):
+        """Return the new rows to store for the entries (see `EntryRows`)."""
+        rows = EntryRows([], [], [], [])
+        for source_word_text, target_word_text in entries:
+            try:
+                validate_word_text(source_word_text)
+                validate_word_text(target_word_text)
+            except Exception as exc:
+                logger.warning(f"Ignoring invalid entry: {exc!r}")
+                continue
+            source_key, is_new_source = self.get_word(
+                source_word_text, self.source_language, rows
+            )
+            target_key, is_new_target = self.get_word(
+                target_word_text, self.target_language, rows
+            )
+            if not (is_new_source or is_new_target):
+                if self.translation_index.get((source_key, target_key)):
+                    logger.debug(
+                        f'Ignoring duplicate entry "{source_word_text}" :: '
+                        f'"{target_word_text}".'
+                    )
+                    continue
+                if not self.translation_index.complete:
+                    # The translation may have been stored and forgotten; use a new
+                    # copy of the source word to rule out storing it a second time.
+                    source_key = self.new_word(
+                        source_word_text, self.source_language, rows
+                    )
+            self.translation_index.add((source_key, target_key), True)
+            fingerprint = get_fingerprint(
+                source_word_text, target_word_text, self.split_synonyms
+            )
+            rows.translation_rows.append((source_key, target_key, fingerprint))
+        return rows
+
+    def close(self):
+        for index in self.word_indexes.values():
+            index.close()
+        self.translation_index.close()
+
+
+def build_rows(row_builder, entries, stats):
+    with stats.stage("build"):
+        return row_builder.build_rows(entries)
+
+
+def get_model_objects(model_cls, columns, rows):
+    return [model_cls(**dict(zip(columns, row))) for row in rows]
+
+
+def save_rows_orm(
+    session, word_rows, translation_rows, domain_rows, synonym_rows, stats=None
+):
+    """Store rows by creating model objects and saving them through the session."""
+    stats = stats or ImportStats()
+    with stats.stage("model_objects"):
+        objects = [
+            get_model_objects(model_cls, columns, rows)
+            for model_cls, columns, rows in (
+                (Word, WORD_COLUMNS, word_rows),
+                (Translation, TRANSLATION_COLUMNS, translation_rows),
+                (WordDomain, DOMAIN_COLUMNS, domain_rows),
+                (WordSynonym, SYNONYM_COLUMNS, synonym_rows),
+            )
+        ]
+    for model_objects in objects:
+        session.bulk_save_objects(model_objects)
+
+
+def save_rows_core(
+    session,
+    word_rows,
+    translation_rows,
+    domain_rows,
+    synonym_rows,
+    word_table_name=Word.__tablename__,
+    translation_table_name=Translation.__tablename__,
+    domain_table_name=WordDomain.__tablename__,
+    synonym_table_name=WordSynonym.__tablename__,
+    stats=None,
+):
+    """Store rows by sending the plain tuples directly through the connection."""
+    connection = session.connection()
+    insert_rows(connection, word_table_name, WORD_COLUMNS, word_rows)
+    insert_rows(
+        connection, translation_table_name, TRANSLATION_COLUMNS, translation_rows
+    )
+    insert_rows(connection, domain_table_name, DOMAIN_COLUMNS, domain_rows)
+    insert_rows(connection, synonym_table_name, SYNONYM_COLUMNS, synonym_rows)
+
+
+#: Available strategies for storing the rows of the imported entries.
+#:
+#: - "core": send plain row tuples to the database, bypassing the ORM (fast).
+#: - "orm": create a model object for each row and save it through the ORM session.
+#:
+#: Both take the rows of a chunk (see `EntryRows`) and the `ImportStats` of the import.
+LOADERS = {
+    "core": save_rows_core,
+    "orm": save_rows_orm,
+}
+
+
+def insert_entries(session, entry_rows, loader="orm", stats=None, **table_names):
+    """Store the database rows created for a chunk of entries."""
     # Send the data to the database (bulk insert)
-    session.bulk_save_objects(new_words)
-    session.bulk_save_objects(new_translations)
+    save_rows = LOADERS[loader]
+    save_rows(session, *entry_rows, stats=stats, **table_names)
 
     # Return the number of entries processed
-    return int(len(new_words) / 2)
+    return len(entry_rows.translation_rows)
 
 
-def get_words_in_languages(session, language_ids):
-    return session.query(Word).filter(Word.language_id.in_(language_ids))
+def get_translations_in_languages(session, language_ids):
+    word_ids = session.query(Word.id).filter(Word.language_id.in_(language_ids))
+    return session.query(Translation).filter(Translation.word1_id.in_(word_ids))
 
 
 def delete_entries(session, source_language_code, target_language_code):
@@ -61,27 +353,258 @@ def delete_entries(session, source_language_code, target_language_code):
     language_codes = [source_language_code, target_language_code]
     language_ids = session.query(Language.id).filter(Language.code.in_(language_codes))
 
-    # Determine the number of words stored in those languages
-    num_words = get_words_in_languages(session, language_ids).count()
+    # Determine the number of translations stored in those languages
+    num_translations = get_translations_in_languages(session, language_ids).count()
 
     # Delete the languages (it will also delete all related words and translations)
     languages = session.query(Language).filter(Language.id.in_(language_ids))
     languages.delete(synchronize_session=False)
 
+    # Delete the lookup entries derived from those words and translations
+    lookup_entries = session.query(LookupEntry).filter(
+        or_(
+            LookupEntry.source_code.in_(language_codes),
+            LookupEntry.target_code.in_(language_codes),
+        )
+    )
+    lookup_entries.delete(synchronize_session=False)
+
     # Return the number of entries deleted
-    return int(num_words / 2)
+    return num_translations
 
 
-def create_languages(session, *language_codes):
+def create_languages(session, *language_codes, new_key=new_object_id):
     new_languages = []
     for language_code in language_codes:
-        language = Language(id=new_object_id(), code=language_code)
+        language = Language(id=new_key(), code=language_code)
         new_languages.append(language)
 
     session.bulk_save_objects(new_languages)
     return new_languages
 
 
+def get_languages(session, *language_codes, new_key=new_object_id):
+    """Return the languages with the given codes, creating the missing ones."""
+    languages = session.query(Language).filter(Language.code.in_(language_codes))
+    languages_by_code = {language.code: language for language in languages}
+    missing_codes = [code for code in language_codes if code not in languages_by_code]
+    new_languages = create_languages(session, *missing_codes, new_key=new_key)
+    languages_by_code.update(zip(missing_codes, new_languages))
+    return [languages_by_code[code] for code in language_codes]
+
+
+def get_translations_between(session, source_language, target_language):
+    source_word_ids = session.query(Word.id).filter(
+        Word.language_id == source_language.id
+    )
+    target_word_ids = session.query(Word.id).filter(
+        Word.language_id == target_language.id
+    )
+    return session.query(Translation).filter(
+        Translation.word1_id.in_(source_word_ids),
+        Translation.word2_id.in_(target_word_ids),
+    )
+
+
+def get_stored_fingerprints(session, source_language, target_language):
+    translations = get_translations_between(session, source_language, target_language)
+    fingerprints = translations.with_entities(Translation.fingerprint)
+    return {fingerprint for (fingerprint,) in fingerprints}
+
+
+def get_words(session, language):
+    return session.query(Word.text, Word.id).filter(Word.language_id == language.id)
+
+
+#: Maximum number of fingerprints to pass in one delete statement.
+DELETE_CHUNK_SIZE = 500
+
+
+def delete_translations(session, source_language, target_language, fingerprints):
+    """Delete the translations with the given fingerprints and return their number."""
+    num_deleted = 0
+    for fingerprints_chunk in chunked(fingerprints, DELETE_CHUNK_SIZE):
+        translations = get_translations_between(
+            session, source_language, target_language
+        ).filter(Translation.fingerprint.in_(fingerprints_chunk))
+        num_deleted += translations.delete(synchronize_session=False)
+    return num_deleted
+
+
+def delete_orphaned_words(session, *languages):
+    """Delete the words which are no longer part of any translation (or synonyms)."""
+    as_word1 = session.query(Translation).filter(Translation.word1_id == Word.id)
+    as_word2 = session.query(Translation).filter(Translation.word2_id == Word.id)
+    as_synonym = session.query(WordSynonym).filter(WordSynonym.word_id == Word.id)
+    words = session.query(Word).filter(
+        Word.language_id.in_([language.id for language in languages]),
+        ~as_word1.exists(),
+        ~as_word2.exists(),
+        ~as_synonym.exists(),
+    )
+    num_deleted = words.delete(synchronize_session=False)
+    if num_deleted:
+        # The synonyms of the deleted words may not be part of anything else either
+        num_deleted += words.delete(synchronize_session=False)
+    return num_deleted
+
+
+def select_lookup_entry(language, other_language, word, translation):
+    return select(
+        [
+            word.c.id,
+            literal(language.code, String),
+            literal(other_language.code, String),
+            word.c.search_key,
+            word.c.text,
+            translation.c.text,
+        ]
+    )
+
+
+def select_lookup_entries(
+    word_table,
+    translation_table,
+    language,
+    other_language,
+    synonym_table=WordSynonym.__table__,
+):
+    """Select the lookup entries for looking up words of a language in another one.
+
+    A group of synonyms which was split up (see `WordSynonym`) is looked up by each of
+    its words instead of by the group as a whole.
+    """
+    word1 = word_table.alias("word1")
+    word2 = word_table.alias("word2")
+    words = translation_table.join(
+        word1, word1.c.id == translation_table.c.word1_id
+    ).join(word2, word2.c.id == translation_table.c.word2_id)
+    synonym = word_table.alias("synonym")
+    selects = []
+    # A translation may have been stored in either direction
+    for word, translation in ((word1, word2), (word2, word1)):
+        condition = and_(
+            word.c.language_id == language.id,
+            translation.c.language_id == other_language.id,
+        )
+        has_synonyms = (
+            select([synonym_table.c.set_id])
+            .where(synonym_table.c.set_id == word.c.id)
+            .exists()
+        )
+        selects.append(
+            select_lookup_entry(language, other_language, word, translation)
+            .select_from(words)
+            .where(and_(condition, ~has_synonyms))
+        )
+        selects.append(
+            select_lookup_entry(language, other_language, synonym, translation)
+            .select_from(
+                words.join(synonym_table, synonym_table.c.set_id == word.c.id).join(
+                    synonym, synonym.c.id == synonym_table.c.word_id
+                )
+            )
+            .where(condition)
+        )
+    return union(*selects)
+
+
+def store_lookup_entries(
+    session,
+    source_language,
+    target_language,
+    word_table=Word.__table__,
+    translation_table=Translation.__table__,
+    lookup_entry_table=LookupEntry.__table__,
+    synonym_table=WordSynonym.__table__,
+):
+    """Store the lookup entries for a language pair (in both directions)."""
+    num_stored = 0
+    for language, other_language in (
+        (source_language, target_language),
+        (target_language, source_language),
+    ):
+        lookup_entries = select_lookup_entries(
+            word_table, translation_table, language, other_language, synonym_table
+        )
+        result = session.execute(
+            lookup_entry_table.insert().from_select(
+                LOOKUP_ENTRY_COLUMNS, lookup_entries
+            )
+        )
+        num_stored += result.rowcount
+    return num_stored
+
+
+def delete_lookup_entries_between(session, source_language, target_language):
+    """Delete the lookup entries of a language pair (in both directions)."""
+    language_codes = [source_language.code, target_language.code]
+    lookup_entries = session.query(LookupEntry).filter(
+        LookupEntry.source_code.in_(language_codes),
+        LookupEntry.target_code.in_(language_codes),
+    )
+    return lookup_entries.delete(synchronize_session=False)
+
+
+#: The tables which are rebuilt from scratch and swapped in by a shadow import.
+SHADOW_TABLE_NAMES = (
+    Word.__tablename__,
+    Translation.__tablename__,
+    WordDomain.__tablename__,
+    WordSynonym.__tablename__,
+    LookupEntry.__tablename__,
+)
+
+
+def copy_other_entries(session, staging_tables, *languages):
+    """Copy the words and translations in all other languages into staging tables."""
+    connection = session.connection()
+    language_ids = [language.id for language in languages]
+    word_table = staging_tables.tables[Word.__tablename__]
+    translation_table = staging_tables.tables[Translation.__tablename__]
+
+    words = select([Word.__table__.c[name] for name in WORD_COLUMNS]).where(
+        Word.language_id.notin_(language_ids)
+    )
+    connection.execute(word_table.insert().from_select(WORD_COLUMNS, words))
+
+    # Only keep the translations of which both words were copied
+    copied_word_ids = select([word_table.c.id])
+    translations = select(
+        [Translation.__table__.c[name] for name in TRANSLATION_COLUMNS]
+    ).where(
+        Translation.word1_id.in_(copied_word_ids)
+        & Translation.word2_id.in_(copied_word_ids)
+    )
+    connection.execute(
+        translation_table.insert().from_select(TRANSLATION_COLUMNS, translations)
+    )
+
+    domain_table = staging_tables.tables[WordDomain.__tablename__]
+    domains = select([WordDomain.__table__.c[name] for name in DOMAIN_COLUMNS]).where(
+        WordDomain.word_id.in_(copied_word_ids)
+    )
+    connection.execute(domain_table.insert().from_select(DOMAIN_COLUMNS, domains))
+
+    synonym_table = staging_tables.tables[WordSynonym.__tablename__]
+    synonyms = select(
+        [WordSynonym.__table__.c[name] for name in SYNONYM_COLUMNS]
+    ).where(WordSynonym.set_id.in_(copied_word_ids))
+    connection.execute(synonym_table.insert().from_select(SYNONYM_COLUMNS, synonyms))
+
+    language_codes = [language.code for language in languages]
+    lookup_entry_table = staging_tables.tables[LookupEntry.__tablename__]
+    lookup_entries = select(
+        [LookupEntry.__table__.c[name] for name in LOOKUP_ENTRY_COLUMNS]
+    ).where(
+        LookupEntry.source_code.notin_(language_codes)
+        & LookupEntry.target_code.notin_(language_codes)
+    )
+    connection.execute(
+        lookup_entry_table.insert().from_select(LOOKUP_ENTRY_COLUMNS, lookup_entries)
+    )
+
+
 def import_entries(
     engine,
     entries,
@@ -89,28 +612,242 @@ def import_entries(
     target_language_code,
     chunk_size=1,
     min_entries=None,
+    loader="orm",
+    key_type=None,
+    dedupe_index_size=settings.IMPORT_DEDUPE_INDEX_SIZE,
+    dedupe_spill=False,
+    queue_depth=0,
+    incremental=False,
+    shadow=False,
+    split_synonyms=False,
+    stats=None,
 ):
+    """Import entries for a language pair, replacing the entries stored before.
+
+    In `incremental` mode, the stored entries are not removed up front. Instead, only
+    the entries which are new are stored, and the stored entries which are no longer
+    present are removed (entries are compared by fingerprint).
+
+    In `shadow` mode, the live tables are left alone while the import is running. All
+    entries (including those of the other languages) are written to staging tables,
+    which replace the live tables at the end of the transaction (see `StagingTables`).
+
+    The `key_type` must match the database schema; by default, it is determined from
+    the schema.
+
+    With `split_synonyms`, every word of a group of synonyms can be looked up on its
+    own (see `EntryRowBuilder`).
+
+    The time spent in each stage of the import is recorded in `stats` (see
+    `ImportStats`), if given.
+    """
+    stats = stats or ImportStats()
     with managed_session(engine) as session:
-        logger.info("Removing existing dictionary entries…")
-        num_deleted = delete_entries(
-            session, source_language_code, target_language_code
+        num_added, num_deleted = store_entries(
+            session,
+            entries,
+            source_language_code,
+            target_language_code,
+            chunk_size=chunk_size,
+            min_entries=min_entries,
+            loader=loader,
+            key_type=key_type,
+            dedupe_index_size=dedupe_index_size,
+            dedupe_spill=dedupe_spill,
+            queue_depth=queue_depth,
+            incremental=incremental,
+            shadow=shadow,
+            split_synonyms=split_synonyms,
+            stats=stats,
+        )
+        finish_import(session, stats)
+        return num_added, num_deleted
+
+
+def store_entries(
+    session,
+    entries,
+    source_language_code,
+    target_language_code,
+    chunk_size=1,
+    min_entries=None,
+    loader="orm",
+    key_type=None,
+    dedupe_index_size=settings.IMPORT_DEDUPE_INDEX_SIZE,
+    dedupe_spill=False,
+    queue_depth=0,
+    incremental=False,
+    shadow=False,
+    split_synonyms=False,
+    stats=None,
+):
+    """Store the entries of a language pair in a session, without committing them.
+
+    See `import_entries` for the arguments; several language pairs can be stored in
+    the same transaction before calling `finish_import`.
+    """
+    if loader not in LOADERS:
+        raise ValueError(f'unknown loader "{loader}"')
+    if shadow and incremental:
+        raise ValueError("shadow imports cannot be incremental")
+    if shadow and loader != "core":
+        raise ValueError('shadow imports require the "core" loader')
+    # Fail before anything is written if the keys would not fit the schema
+    key_type = check_key_type(session.connection(), key_type)
+    stats = stats or ImportStats()
+    tables = {}
+    table_names = {}
+    if incremental:
+        logger.info("Loading existing dictionary entries…")
+        new_language_key = get_key_allocator(session, Language, key_type)
+        source_language, target_language = get_languages(
+            session,
+            source_language_code,
+            target_language_code,
+            new_key=new_language_key,
+        )
+        with stats.stage("prepare"):
+            diff = EntryDiff(
+                get_stored_fingerprints(session, source_language, target_language),
+                split_synonyms=split_synonyms,
+            )
+        entries = diff.get_new_entries(entries)
+    elif shadow:
+        logger.info("Copying the entries of other languages into staging tables…")
+        new_language_key = get_key_allocator(session, Language, key_type)
+        source_language, target_language = get_languages(
+            session,
+            source_language_code,
+            target_language_code,
+            new_key=new_language_key,
+        )
+        language_ids = [source_language.id, target_language.id]
+        num_deleted = get_translations_in_languages(session, language_ids).count()
+        staging_tables = StagingTables(
+            get_schema_metadata(key_type), SHADOW_TABLE_NAMES
         )
+        with stats.stage("prepare"):
+            staging_tables.create(session.connection())
+            copy_other_entries(
+                session, staging_tables, source_language, target_language
+            )
+        tables = {
+            "word_table": staging_tables.tables[Word.__tablename__],
+            "translation_table": staging_tables.tables[Translation.__tablename__],
+            "lookup_entry_table": staging_tables.tables[LookupEntry.__tablename__],
+            "synonym_table": staging_tables.tables[WordSynonym.__tablename__],
+        }
+        table_names = {
+            "word_table_name": tables["word_table"].name,
+            "translation_table_name": tables["translation_table"].name,
+            "domain_table_name": staging_tables.tables[WordDomain.__tablename__].name,
+            "synonym_table_name": tables["synonym_table"].name,
+        }
+    else:
+        logger.info("Removing existing dictionary entries…")
+        with stats.stage("prepare"):
+            num_deleted = delete_entries(
+                session, source_language_code, target_language_code
+            )
         logger.info("Creating languages…")
+        new_language_key = get_key_allocator(session, Language, key_type)
         source_language, target_language = create_languages(
-            session, source_language_code, target_language_code
+            session,
+            source_language_code,
+            target_language_code,
+            new_key=new_language_key,
         )
-        logger.info("Storing new dictionary entries…")
-        num_added = 0
-        for entries_chunk in chunked(entries, chunk_size):
-            num_added += insert_entries(
-                session, entries_chunk, source_language, target_language
+    logger.info("Storing new dictionary entries…")
+    row_builder = EntryRowBuilder(
+        source_language,
+        target_language,
+        new_key=get_key_allocator(session, Word, key_type),
+        index_size=dedupe_index_size,
+        spill=dedupe_spill,
+        split_synonyms=split_synonyms,
+    )
+    if incremental:
+        for language in (source_language, target_language):
+            row_builder.add_words(language, get_words(session, language))
+    # Create the necessary database rows for each chunk of entries; if enabled,
+    # the next chunks are prepared in the background while one is being stored.
+    chunks = chunked(entries, chunk_size)
+    chunks_rows = (build_rows(row_builder, chunk, stats) for chunk in chunks)
+    if queue_depth:
+        chunks_rows = iter_in_background(chunks_rows, queue_depth)
+    num_added = 0
+    try:
+        for entry_rows in chunks_rows:
+            start_time = stats.clock()
+            with stats.stage("write"):
+                num_entries = insert_entries(
+                    session, entry_rows, loader, stats=stats, **table_names
+                )
+            stats.add_chunk(
+                num_entries,
+                sum(len(rows) for rows in entry_rows),
+                stats.clock() - start_time,
             )
-        # If too few entries were imported, fail the import by throwing an error.
-        # It will make the managed session automatically roll back the transaction.
-        if min_entries and num_added < min_entries:
-            raise EOFError(
-                "Not enough entries found in data source (expected at least "
-                f"{min_entries}, got only {num_added})"
+            num_added += num_entries
+    finally:
+        chunks_rows.close()
+        row_builder.close()
+    logger.info(
+        f"Stored {row_builder.num_words} distinct words for "
+        f"{row_builder.num_word_occurrences} word occurrences (dedupe ratio "
+        f"{row_builder.dedupe_ratio:.2f})."
+    )
+    num_found = num_added
+    if incremental:
+        logger.info("Removing outdated dictionary entries…")
+        with stats.stage("cleanup"):
+            num_deleted = delete_translations(
+                session,
+                source_language,
+                target_language,
+                diff.get_removed_fingerprints(),
             )
-        logger.info("Committing transaction…")
-        return num_added, num_deleted
+            if num_deleted:
+                delete_orphaned_words(session, source_language, target_language)
+        num_unchanged = len(diff.unchanged_fingerprints)
+        num_found += num_unchanged
+        logger.info(
+            f"Added {num_added}, removed {num_deleted} and left {num_unchanged} "
+            "entries unchanged."
+        )
+    # If too few entries were imported, fail the import by throwing an error.
+    # It will make the managed session automatically roll back the transaction.
+    if min_entries and num_found < min_entries:
+        raise EOFError(
+            "Not enough entries found in data source (expected at least "
+            f"{min_entries}, got only {num_found})"
+        )
+    logger.info("Storing lookup entries…")
+    with stats.stage("lookup_entries"):
+        if incremental:
+            delete_lookup_entries_between(session, source_language, target_language)
+        num_lookup_entries = store_lookup_entries(
+            session, source_language, target_language, **tables
+        )
+    logger.info(f"Stored {num_lookup_entries} lookup entries.")
+    if shadow:
+        logger.info("Creating indexes on staging tables…")
+        with stats.stage("indexes"):
+            staging_tables.create_indexes(session.connection())
+        logger.info("Swapping staging tables for live tables…")
+        with stats.stage("swap"):
+            staging_tables.swap(session.connection())
+    return num_added, num_deleted
+
+
+def finish_import(session, stats=None):
+    """Update the full-text index and the generation, and commit the import."""
+    stats = stats or ImportStats()
+    if has_fulltext_index(session.connection()):
+        logger.info("Rebuilding full-text index…")
+        with stats.stage("fulltext"):
+            rebuild_fulltext_index(session.connection())
+    bump_generation(session)
+    logger.info("Committing transaction…")
+    with stats.stage("commit"):
+        session.commit()
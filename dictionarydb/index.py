@@ -0,0 +1,216 @@
+"""
+A compact, read-only index of the lookup entries which answers lookups without SQL.
+
+All strings (search keys, words and translations) are stored once, UTF-8 encoded, in a
+single string pool; an array of offsets marks where each of them starts. The entries
+are three parallel arrays of string numbers (search key, word, translation), sorted by
+language pair and search key, so that a prefix lookup is a binary search over them.
+
+UTF-8 encoded strings sort in the same order as their code points, which is also the
+order in which the database compares search keys (see `dictionarydb.search`). Entries
+with the same search key keep the order in which they were added, so the results come
+in the same order as from the prefix query on SQLite (which reads the search key index
+of the lookup entries). On PostgreSQL, the prefix query ranks the results by their
+similarity to the search string instead, so the order (and, if more entries match
+than are requested, the results) can differ from those of the index.
+"""
+import logging
+from array import array
+
+from sqlalchemy import select
+
+from dictionarydb.models import LookupEntry, validate_word_text
+from dictionarydb.parser import split_synonyms
+from dictionarydb.search import get_search_key
+
+logger = logging.getLogger(__name__)
+
+#: Array type codes for string offsets (64-bit) and string numbers (32-bit).
+OFFSET_TYPECODE = "Q"
+STRING_ID_TYPECODE = "I"
+
+
+class LookupIndex(object):
+    """Sorted lookup entries of all language pairs, sharing one string pool.
+
+    The pool is a `memoryview` (e.g. of a memory-mapped file), from which the strings
+    are decoded without copying them. The arrays may be any objects that support
+    indexing like `array` does.
+    """
+
+    def __init__(self, pool, offsets, key_ids, word_ids, translation_ids, pairs):
+        self.pool = pool
+        self.offsets = offsets
+        self.key_ids = key_ids
+        self.word_ids = word_ids
+        self.translation_ids = translation_ids
+        # Maps (source code, target code) to the range of the pair's entries
+        self.pairs = pairs
+
+    def __len__(self):
+        return len(self.key_ids)
+
+    @property
+    def nbytes(self):
+        """Return the number of bytes taken up by the pool and the arrays."""
+        arrays = (self.offsets, self.key_ids, self.word_ids, self.translation_ids)
+        return len(self.pool) + sum(len(a) * a.itemsize for a in arrays)
+
+    def get_string(self, string_id):
+        start = self.offsets[string_id]
+        end = self.offsets[string_id + 1]
+        return str(self.pool[start:end], "utf-8")
+
+    def find(self, key, start, end):
+        """Return the position of the first entry in a range with a key >= `key`."""
+        while start < end:
+            middle = (start + end) // 2
+            if self.get_string(self.key_ids[middle]) < key:
+                start = middle + 1
+            else:
+                end = middle
+        return start
+
+    def lookup(
+        self,
+        source_language,
+        target_language,
+        search_key,
+        search_key_upper_bound,
+        max_results,
+    ):
+        """Return the entries of a language pair with a search key in a range.
+
+        The results have the same shape as those of the database lookup query, and
+        they are ordered by search key (see above).
+        """
+        pair_range = self.pairs.get((source_language, target_language))
+        if not pair_range:
+            return []
+        start = self.find(search_key, *pair_range)
+        end = self.find(search_key_upper_bound, start, pair_range[1])
+        return [
+            {
+                "word": self.get_string(self.word_ids[position]),
+                "language": source_language,
+                "translation": self.get_string(self.translation_ids[position]),
+                "translation_language": target_language,
+            }
+            for position in range(start, min(end, start + max_results))
+        ]
+
+
+class LookupIndexBuilder(object):
+    """Collect lookup entries (in any order) to create a `LookupIndex` from them."""
+
+    def __init__(self):
+        self.string_ids = {}
+        self.strings = []
+        # Like in the database, every distinct entry is stored only once (the keys of
+        # the dictionary keep the order in which the entries were added)
+        self.entries = {}
+
+    def add_string(self, string):
+        string_id = self.string_ids.get(string)
+        if string_id is None:
+            string_id = self.string_ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def add(self, source_code, target_code, search_key, word, translation):
+        entry = (
+            source_code,
+            target_code,
+            self.add_string(search_key),
+            self.add_string(word),
+            self.add_string(translation),
+        )
+        self.entries.setdefault(entry)
+
+    def add_translation(
+        self, source_code, target_code, source_text, target_text, split=False
+    ):
+        """Add the lookup entries for a translation (one for each direction).
+
+        With `split`, groups of synonyms are looked up by each of their words, like
+        the database does for groups that were split up by the importer.
+        """
+        for code, other_code, text, other_text in (
+            (source_code, target_code, source_text, target_text),
+            (target_code, source_code, target_text, source_text),
+        ):
+            for word in get_lookup_words(text, split):
+                self.add(code, other_code, get_search_key(word), word, other_text)
+
+    def get_sort_key(self, entry):
+        source_code, target_code, key_id, _, _ = entry
+        return (source_code, target_code, self.strings[key_id])
+
+    def build(self):
+        # The sort is stable: entries with the same search key keep their order
+        entries = sorted(self.entries, key=self.get_sort_key)
+        pool = bytearray()
+        offsets = array(OFFSET_TYPECODE, [0])
+        for string in self.strings:
+            pool += string.encode("utf-8")
+            offsets.append(len(pool))
+        key_ids, word_ids, translation_ids = (
+            array(STRING_ID_TYPECODE) for _ in range(3)
+        )
+        pairs = {}
+        for position, entry in enumerate(entries):
+            source_code, target_code, key_id, word_id, translation_id = entry
+            start, _ = pairs.get((source_code, target_code), (position, None))
+            pairs[source_code, target_code] = (start, position + 1)
+            key_ids.append(key_id)
+            word_ids.append(word_id)
+            translation_ids.append(translation_id)
+        return LookupIndex(
+            memoryview(bytes(pool)), offsets, key_ids, word_ids, translation_ids, pairs
+        )
+
+
+def get_lookup_words(text, split=False):
+    words = split_synonyms(text) if split else []
+    return words if len(words) > 1 else [text]
+
+
+def load_lookup_index(engine):
+    """Create a `LookupIndex` from the lookup entries stored in a database."""
+    builder = LookupIndexBuilder()
+    table = LookupEntry.__table__
+    query = select(
+        [
+            table.c.source_code,
+            table.c.target_code,
+            table.c.search_key,
+            table.c.word,
+            table.c.translation,
+        ]
+    ).order_by(table.c.id)
+    with engine.connect() as connection:
+        for row in connection.execute(query):
+            builder.add(*row)
+    return builder.build()
+
+
+def build_lookup_index(
+    entries, source_language_code, target_language_code, split_synonyms=False
+):
+    """Create a `LookupIndex` from parsed entries (e.g. from `load_entries`)."""
+    builder = LookupIndexBuilder()
+    for source_text, target_text in entries:
+        try:
+            validate_word_text(source_text)
+            validate_word_text(target_text)
+        except Exception as exc:
+            logger.warning(f"Ignoring invalid entry: {exc!r}")
+            continue
+        builder.add_translation(
+            source_language_code,
+            target_language_code,
+            source_text,
+            target_text,
+            split=split_synonyms,
+        )
+    return builder.build()
@@ -0,0 +1,273 @@
+"""
+Import of several language pairs at once, as listed in a manifest file.
+
+A manifest lists the files to import and the language pair of each file::
+
+  [[imports]]
+  file = "de-en.txt.xz"
+  source_language = "deu"
+  target_language = "eng"
+
+  [[imports]]
+  file = "sv-en.txt.gz"
+  source_language = "swe"
+  target_language = "eng"
+
+Manifests are written in TOML (which requires Python 3.11 or the "tomli" package, see
+the "toml" extra) or in JSON with the same structure (if the file name ends with
+".json"). The paths of the files are relative to the manifest.
+
+Each file is parsed while it is read (see `load_entries`). By default, a background
+thread parses the next chunks of a file while the writer stores one (see the
+`queue_depth` of `import_entries`). With several parse workers, one pool of worker
+processes is created up front and shared by all files.
+
+How a failure is rolled back depends on the rollback mode:
+
+- "all": all language pairs are stored in a single transaction, so either all of them
+  are imported or none is. Since a transaction is bound to one connection, a single
+  writer stores the pairs one after the other.
+- "pair": every language pair is stored in a transaction of its own, and the pairs
+  which fail are rolled back without affecting the others. On PostgreSQL, the pairs
+  are stored concurrently, using one worker (and connection) per group of pairs which
+  share a language. On SQLite, which serializes all writes, a single writer stores the
+  pairs one after the other.
+
+Language pairs which share a language (like "deu-eng" and "deu-swe") always write the
+same words, so they are never stored at the same time. Replacing the entries of one of
+them would remove the entries of the others (see `delete_entries`), so they can only
+be imported incrementally.
+"""
+import json
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from dictionarydb.compression import READ_BUFFER_SIZE, open_input
+from dictionarydb.config import settings
+from dictionarydb.importer import finish_import, import_entries, store_entries
+from dictionarydb.language import get_language
+from dictionarydb.models import managed_session
+from dictionarydb.parser import create_worker_pool, load_entries
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+logger = logging.getLogger(__name__)
+
+#: How to roll back a failed import (see above).
+ROLLBACK_MODES = ("all", "pair")
+
+#: A file to import, and its language pair.
+ManifestEntry = namedtuple(
+    "ManifestEntry", ["path", "source_language", "target_language"]
+)
+
+#: The outcome of importing a language pair (`error` is None if it was imported).
+PairResult = namedtuple("PairResult", ["entry", "num_added", "num_deleted", "error"])
+
+
+def describe_entry(entry):
+    return f'{entry.source_language}-{entry.target_language} ("{entry.path}")'
+
+
+def read_manifest_data(path):
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    if tomllib is None:
+        raise ValueError(
+            'reading TOML manifests requires Python 3.11 or the "tomli" package '
+            "(pip install dictionarydb[toml]); use a JSON manifest instead"
+        )
+    with open(path, "rb") as file:
+        return tomllib.load(file)
+
+
+def load_manifest(path):
+    """Return the `ManifestEntry` of each import listed in a manifest file."""
+    data = read_manifest_data(path)
+    imports = data.get("imports") if isinstance(data, dict) else None
+    if not imports:
+        raise ValueError("the manifest lists no imports")
+    directory = os.path.dirname(path)
+    entries = []
+    for position, item in enumerate(imports, start=1):
+        try:
+            entry = ManifestEntry(
+                os.path.join(directory, item["file"]),
+                item["source_language"],
+                item["target_language"],
+            )
+        except (KeyError, TypeError) as exc:
+            raise ValueError(f"import #{position} of the manifest lacks {exc}")
+        for code in (entry.source_language, entry.target_language):
+            if not get_language(code):
+                raise ValueError(
+                    f'"{code}" (import #{position}) is not a valid ISO-639-3 code'
+                )
+        entries.append(entry)
+    return entries
+
+
+def check_language_pairs(entries, incremental=False):
+    """Raise a `ValueError` if the language pairs would overwrite each other."""
+    pairs = set()
+    languages = set()
+    for entry in entries:
+        pair = frozenset([entry.source_language, entry.target_language])
+        if pair in pairs:
+            raise ValueError(f"{describe_entry(entry)} is listed more than once")
+        pairs.add(pair)
+        if incremental:
+            continue
+        for code in pair:
+            if code in languages:
+                raise ValueError(
+                    f'language "{code}" is part of more than one language pair, so '
+                    "replacing the entries of one pair would remove those of the "
+                    "others (import incrementally instead)"
+                )
+            languages.add(code)
+
+
+def group_by_language(entries):
+    """Group the entries whose language pairs share a language (even indirectly)."""
+    groups = []
+    for entry in entries:
+        languages = {entry.source_language, entry.target_language}
+        members = [entry]
+        for group_languages, group_members in list(groups):
+            if group_languages & languages:
+                groups.remove((group_languages, group_members))
+                languages |= group_languages
+                members = group_members + members
+        groups.append((languages, members))
+    # Keep the groups (and the entries of each group) in the order of the manifest
+    groups = [sorted(members, key=entries.index) for _, members in groups]
+    return sorted(groups, key=lambda group: entries.index(group[0]))
+
+
+@contextmanager
+def open_entries(entry, parse_workers, buffer_size, executor=None):
+    """Open the file of a manifest entry, yielding its entries as they are parsed."""
+    with open_input(entry.path, buffer_size) as file:
+        yield load_entries(file, num_workers=parse_workers, executor=executor)
+
+
+def import_serially(
+    engine, entries, rollback, parse_workers, buffer_size, executor, options
+):
+    """Store the language pairs one after the other."""
+    if rollback == "all":
+        return store_in_one_transaction(
+            engine, entries, parse_workers, buffer_size, executor, options
+        )
+    return import_group(engine, entries, parse_workers, buffer_size, executor, options)
+
+
+def store_in_one_transaction(
+    engine, entries, parse_workers, buffer_size, executor, options
+):
+    results = []
+    with managed_session(engine) as session:
+        for entry in entries:
+            logger.info(f"Importing {describe_entry(entry)}…")
+            with open_entries(entry, parse_workers, buffer_size, executor) as parsed:
+                num_added, num_deleted = store_entries(
+                    session,
+                    parsed,
+                    entry.source_language,
+                    entry.target_language,
+                    **options,
+                )
+            results.append(PairResult(entry, num_added, num_deleted, None))
+        finish_import(session)
+    return results
+
+
+def import_group(engine, group, parse_workers, buffer_size, executor, options):
+    """Import the language pairs of a group one after the other."""
+    results = []
+    for entry in group:
+        logger.info(f"Importing {describe_entry(entry)}…")
+        try:
+            with open_entries(entry, parse_workers, buffer_size, executor) as parsed:
+                num_added, num_deleted = import_entries(
+                    engine,
+                    parsed,
+                    entry.source_language,
+                    entry.target_language,
+                    **options,
+                )
+        except Exception as exc:
+            logger.exception(f"Failed to import {describe_entry(entry)}: {exc!r}")
+            results.append(PairResult(entry, None, None, exc))
+            continue
+        results.append(PairResult(entry, num_added, num_deleted, None))
+    return results
+
+
+def import_concurrently(engine, entries, parse_workers, buffer_size, executor, options):
+    """Import the groups of language pairs which share no language concurrently.
+
+    The groups share the pool of parse workers (`executor`).
+    """
+    groups = group_by_language(entries)
+    with ThreadPoolExecutor(len(groups)) as thread_executor:
+        futures = [
+            thread_executor.submit(
+                import_group,
+                engine,
+                group,
+                parse_workers,
+                buffer_size,
+                executor,
+                options,
+            )
+            for group in groups
+        ]
+        results = [result for future in futures for result in future.result()]
+    return sorted(results, key=lambda result: entries.index(result.entry))
+
+
+def import_manifest(
+    engine,
+    entries,
+    rollback="all",
+    parse_workers=1,
+    buffer_size=READ_BUFFER_SIZE,
+    queue_depth=settings.IMPORT_QUEUE_DEPTH,
+    **options,
+):
+    """Import the language pairs of a manifest and return a `PairResult` for each.
+
+    The `options` are passed on to `import_entries` (e.g. `chunk_size`), along with
+    the `queue_depth`. With the "all" rollback mode, the first failure is raised and
+    nothing is imported.
+    """
+    if rollback not in ROLLBACK_MODES:
+        raise ValueError(f'unknown rollback mode "{rollback}"')
+    if options.get("shadow"):
+        raise ValueError("manifest imports cannot be shadow imports")
+    check_language_pairs(entries, options.get("incremental", False))
+    options["queue_depth"] = queue_depth
+    with ExitStack() as stack:
+        executor = None
+        if parse_workers > 1:
+            # Created here (on the calling thread) and shared by all files
+            executor = stack.enter_context(create_worker_pool(parse_workers))
+        if rollback == "pair" and engine.dialect.name != "sqlite":
+            return import_concurrently(
+                engine, entries, parse_workers, buffer_size, executor, options
+            )
+        return import_serially(
+            engine, entries, rollback, parse_workers, buffer_size, executor, options
+        )
@@ -0,0 +1,259 @@
+"""
+Metrics of the API in the Prometheus text format (served at ``/metrics``).
+
+Only what the API needs is implemented: counters, gauges and histograms with labels,
+and collectors which read values (like the cache statistics) when the metrics are
+scraped. Recording a value is a dictionary lookup and an addition (plus a binary
+search over the buckets of a histogram), so the metrics can stay on in production.
+
+Text format: https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+import time
+from bisect import bisect_left
+
+from starlette.routing import Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+#: Upper bounds (in seconds) of the buckets of a latency histogram.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+#: Upper bounds of the buckets of a histogram of the number of rows.
+ROW_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000, 5000)
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(label_names, label_values):
+    if not label_names:
+        return ""
+    labels = ",".join(
+        f'{name}="{escape_label_value(value)}"'
+        for name, value in zip(label_names, label_values)
+    )
+    return "{" + labels + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Registry(object):
+    """The metrics (and collectors) to include when the metrics are scraped."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Add a function which returns (name, type, documentation, value) tuples."""
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, metric_type, documentation, value in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.append(f"{name} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, label_names=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        # Maps the label values to the value (or values) of the metric
+        self.values = {}
+        if registry is not None:
+            registry.register(self)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for label_values, value in sorted(self.values.items()):
+            labels = format_labels(self.label_names, label_values)
+            yield f"{self.name}{labels} {format_value(value)}"
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        label_names=(),
+        buckets=LATENCY_BUCKETS,
+        registry=REGISTRY,
+    ):
+        super().__init__(name, documentation, label_names, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        values = self.values.get(label_values)
+        if values is None:
+            # The count of each bucket (plus "+Inf"), and the sum of all values
+            values = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        label_names = self.label_names + ("le",)
+        for label_values, values in sorted(self.values.items()):
+            count = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), values):
+                count += bucket_count
+                labels = format_labels(
+                    label_names, label_values + (format_value(bound),)
+                )
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = format_labels(self.label_names, label_values)
+            yield f"{self.name}_sum{labels} {format_value(values[-1])}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "dictionarydb_http_requests_in_flight", "Number of requests being handled."
+)
+REQUEST_DURATION = Histogram(
+    "dictionarydb_http_request_duration_seconds",
+    "Time spent handling requests, by route and status code.",
+    ["method", "route", "status"],
+)
+RENDER_DURATION = Histogram(
+    "dictionarydb_http_response_render_seconds",
+    "Time spent serializing response bodies to JSON.",
+)
+DATABASE_POOL_WAIT = Histogram(
+    "dictionarydb_database_pool_wait_seconds",
+    "Time spent waiting for a connection from the database pool.",
+)
+DATABASE_QUERY_DURATION = Histogram(
+    "dictionarydb_database_query_duration_seconds",
+    "Time spent running database queries (after getting a connection).",
+    ["method"],
+)
+DATABASE_QUERIES_IN_FLIGHT = Gauge(
+    "dictionarydb_database_queries_in_flight",
+    "Number of database queries waiting for a connection or running.",
+)
+DATABASE_CONNECTIONS_IN_USE = Gauge(
+    "dictionarydb_database_connections_in_use",
+    "Number of connections taken from the pool of each database.",
+    ["database"],
+)
+DATABASE_ROWS = Histogram(
+    "dictionarydb_database_rows_returned",
+    "Number of rows returned by database queries.",
+    buckets=ROW_BUCKETS,
+)
+
+
+class MetricsMiddleware(object):
+    """ASGI middleware which records the number and latency of HTTP requests.
+
+    Requests are labeled by the path template of their route (like "/lookup", not the
+    requested path), so that the number of distinct labels stays bounded.
+    """
+
+    def __init__(self, app, clock=time.perf_counter):
+        self.app = app
+        self.clock = clock
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start_time = self.clock()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_DURATION.observe(
+                self.clock() - start_time,
+                scope["method"],
+                get_route_path(scope),
+                status,
+            )
+
+
+def get_route_path(scope):
+    """Return the path template of the route which handled a request.
+
+    Starlette does not record the route in the scope, so the routes of the application
+    are matched against the request again (as the router did).
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
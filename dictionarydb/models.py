@@ -3,12 +3,13 @@ import logging
 from contextlib import contextmanager
 from uuid import uuid4
 
-from sqlalchemy import Column, create_engine, event
+from sqlalchemy import Column, MetaData, create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, scoped_session, sessionmaker, validates
-from sqlalchemy.schema import ForeignKey, PrimaryKeyConstraint, UniqueConstraint
-from sqlalchemy.types import String, UnicodeText
+from sqlalchemy.schema import ForeignKey, Index, PrimaryKeyConstraint, UniqueConstraint
+from sqlalchemy.types import BigInteger, Integer, String, UnicodeText
 
+from dictionarydb.config import settings
 from dictionarydb.language import get_language
 
 logger = logging.getLogger(__name__)
@@ -73,24 +74,272 @@ def setup_postgres_engine(engine):
     engine.execute(CREATE_PG_TRIGRAM_EXTENSION_QUERY)
 
 
-def setup_database(database_url):
-    """Initialize the database schema."""
-    engine = prepare_engine(database_url)
-    Model.metadata.create_all(engine)
+#: Columns with a GIN trigram index on PostgreSQL, for fuzzy lookups (by table name).
+#:
+#: The indexes are not part of the schema metadata because only PostgreSQL (with the
+#: "pg_trgm" extension) can create them.
+TRIGRAM_INDEXED_COLUMNS = {"lookup_entry": ("search_key",)}
+
+HAS_TRIGRAM_INDEX_QUERY = """
+select count(*) from pg_indexes where tablename = :table_name and indexdef like :pattern
+"""
+
+
+def get_trigram_index_name(table_name, column_name):
+    return f"ix_{table_name}_{column_name}_trgm"
+
+
+def create_trigram_index(connection, table_name, column_name, index_name):
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(
+        f"create index {quote(index_name)} on {quote(table_name)} "
+        f"using gin ({quote(column_name)} gin_trgm_ops)"
+    )
+
+
+def create_trigram_indexes(connection):
+    """Create the trigram indexes which do not exist yet (PostgreSQL only)."""
+    for table_name, column_names in TRIGRAM_INDEXED_COLUMNS.items():
+        for column_name in column_names:
+            # After a shadow import, the index has a different name (see `shadow`)
+            num_indexes = connection.execute(
+                text(HAS_TRIGRAM_INDEX_QUERY),
+                table_name=table_name,
+                pattern=f"%({column_name} gin_trgm_ops)%",
+            ).scalar()
+            if not num_indexes:
+                index_name = get_trigram_index_name(table_name, column_name)
+                create_trigram_index(connection, table_name, column_name, index_name)
+
+
+#: The FTS5 table which indexes the tokens of all headwords (SQLite only).
+#:
+#: It is an external content table: it reads the headwords (the texts without their
+#: annotations) from the "word" table (by rowid) instead of keeping its own copy of
+#: them. Since it is not updated along with the words, the importer rebuilds it at the
+#: end of every import.
+FULLTEXT_TABLE_NAME = "word_fts"
+
+CREATE_FULLTEXT_TABLE_QUERY = f"""
+create virtual table {FULLTEXT_TABLE_NAME}
+using fts5(headword, content='word', content_rowid='rowid')
+"""
+
+DROP_FULLTEXT_TABLE_QUERY = f"drop table if exists {FULLTEXT_TABLE_NAME}"
+
+REBUILD_FULLTEXT_INDEX_QUERY = (
+    f"insert into {FULLTEXT_TABLE_NAME}({FULLTEXT_TABLE_NAME}) values ('rebuild')"
+)
+
+HAS_FULLTEXT_TABLE_QUERY = f"""
+select count(*) from sqlite_master
+where type = 'table' and name = '{FULLTEXT_TABLE_NAME}'
+"""
+
+
+def has_fulltext_index(connection):
+    if connection.dialect.name != "sqlite":
+        return False
+    return bool(connection.execute(text(HAS_FULLTEXT_TABLE_QUERY)).scalar())
+
+
+def rebuild_fulltext_index(connection):
+    """Index the texts of all words again (e.g. after an import)."""
+    connection.execute(text(REBUILD_FULLTEXT_INDEX_QUERY))
+
 
-    if engine.dialect.name.startswith("postgres"):
+def create_fulltext_index(connection):
+    """Create the full-text index of the words, replacing any existing one.
+
+    The generation is incremented, so that a running API notices the new index.
+    """
+    # Full-text indexes created by older versions indexed the whole texts
+    connection.execute(text(DROP_FULLTEXT_TABLE_QUERY))
+    connection.execute(text(CREATE_FULLTEXT_TABLE_QUERY))
+    rebuild_fulltext_index(connection)
+    bump_generation(connection)
+
+
+#: The types of primary keys the database schema can be created with.
+#:
+#: - "uuid": 32-character hexadecimal UUID strings.
+#: - "integer": 64-bit integers, which make rows and indexes considerably smaller.
+KEY_TYPES = ("integer", "uuid")
+
+
+def new_integer_key_type():
+    # SQLite only uses the (compact) rowid as the primary key if the type is INTEGER
+    return BigInteger().with_variant(Integer(), "sqlite")
+
+
+def new_search_key_type():
+    # Search keys are compared by code point (see `dictionarydb.search`); SQLite does
+    # that by default, PostgreSQL only using the "C" collation.
+    return UnicodeText().with_variant(UnicodeText(collation="C"), "postgresql")
+
+
+def copy_table(table, metadata):
+    to_metadata = getattr(table, "to_metadata", None) or table.tometadata
+    return to_metadata(metadata)
+
+
+def get_integer_key_metadata():
+    """Return a copy of the schema in which all key columns are integers."""
+    metadata = MetaData()
+    for table in Model.metadata.sorted_tables:
+        table = copy_table(table, metadata)
+        for column in table.columns:
+            if column.info.get("key"):
+                column.type = new_integer_key_type()
+                column.autoincrement = False
+                column.default = None
+    return metadata
+
+
+def get_schema_metadata(key_type):
+    """Return the metadata describing the database schema for a type of keys."""
+    return Model.metadata if key_type == "uuid" else get_integer_key_metadata()
+
+
+def get_key_type(connectable):
+    """Determine the type of primary keys used by an existing database schema."""
+    columns = inspect(connectable).get_columns(Word.__tablename__)
+    id_column = next(column for column in columns if column["name"] == "id")
+    return "integer" if isinstance(id_column["type"], Integer) else "uuid"
+
+
+def has_schema(engine):
+    return Word.__tablename__ in inspect(engine).get_table_names()
+
+
+def check_key_type(connectable, key_type=None):
+    """Return the type of keys of a database schema, which must match `key_type`.
+
+    A `ValueError` is raised if the schema was created with the other type of keys.
+    """
+    schema_key_type = get_key_type(connectable)
+    if key_type and key_type != schema_key_type:
+        raise ValueError(
+            f'the database was created with "{schema_key_type}" keys, not '
+            f'"{key_type}" keys (see the "--key-type" option of the "init" command)'
+        )
+    return schema_key_type
+
+
+#: Tables whose rows are derived from the others, so that they can be created again.
+#:
+#: The importer stores the lookup entries of a language pair whenever it is imported.
+DERIVED_TABLE_NAMES = ("lookup_entry",)
+
+
+def get_outdated_tables(engine, metadata):
+    """Return the existing tables whose columns differ from the ones of the schema."""
+    inspector = inspect(engine)
+    table_names = set(inspector.get_table_names())
+    outdated_tables = []
+    for table in metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        if columns != set(table.columns.keys()):
+            outdated_tables.append(table)
+    return outdated_tables
+
+
+def drop_outdated_tables(engine, metadata):
+    """Drop the tables which were created by an older version, if they are derived.
+
+    Any other outdated table holds imported data which cannot be restored, so a
+    `ValueError` is raised (before anything is dropped) instead: the entries have to
+    be imported into a new database.
+    """
+    outdated_tables = get_outdated_tables(engine, metadata)
+    table_names = [
+        table.name for table in outdated_tables if table.name not in DERIVED_TABLE_NAMES
+    ]
+    if table_names:
+        raise ValueError(
+            f"the database was created by an older version of dictionarydb (outdated "
+            f"tables: {', '.join(table_names)}); initialize a new database and import "
+            f"the entries into it again"
+        )
+    for table in reversed(outdated_tables):
+        logger.warning(
+            f'Dropping the outdated table "{table.name}"; import the language pairs '
+            f"again to look them up."
+        )
+        table.drop(engine)
+
+
+def create_missing_indexes(engine, metadata):
+    """Create the indexes of the schema which the existing tables do not have yet.
+
+    The indexes are recognized by their columns, since shadow imports rename them.
+    """
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        existing_columns = {
+            tuple(index["column_names"]) for index in inspector.get_indexes(table.name)
+        }
+        for index in table.indexes:
+            if tuple(column.name for column in index.columns) not in existing_columns:
+                logger.info(f'Creating the missing index "{index.name}"…')
+                index.create(engine)
+
+
+def setup_database(database_url, key_type=None, fulltext=False):
+    """Initialize the database schema.
+
+    If the schema already exists, it must have been created with the given `key_type`,
+    which defaults to the existing one. New schemas default to the configured type of
+    keys (see `DATABASE_KEY_TYPE`). An existing schema gets the tables and indexes it
+    lacks; its outdated tables are dropped first if possible (see
+    `drop_outdated_tables`).
+
+    With `fulltext`, the full-text index of the words is created as well (SQLite only).
+    """
+    if key_type and key_type not in KEY_TYPES:
+        raise ValueError(f'unknown key type "{key_type}"')
+    engine = prepare_engine(database_url)
+    if fulltext and engine.dialect.name != "sqlite":
+        raise ValueError("the full-text index requires a SQLite database")
+    schema_exists = has_schema(engine)
+    if schema_exists:
+        key_type = check_key_type(engine, key_type)
+    metadata = get_schema_metadata(key_type or settings.DATABASE_KEY_TYPE)
+    if schema_exists:
+        drop_outdated_tables(engine, metadata)
+    is_postgres = engine.dialect.name.startswith("postgres")
+    if is_postgres:
+        # The extension has to exist before the trigram indexes can be created
         setup_postgres_engine(engine)
+    metadata.create_all(engine)
+    if schema_exists:
+        create_missing_indexes(engine, metadata)
+
+    if is_postgres:
+        with engine.begin() as connection:
+            create_trigram_indexes(connection)
+    if fulltext:
+        with engine.begin() as connection:
+            create_fulltext_index(connection)
 
 
 def new_object_id():
     return uuid4().hex
 
 
+def validate_word_text(value):
+    if len(value) < 1:
+        raise ValueError("must be at least 1 character")
+    return value
+
+
 Model = declarative_base()
 
 
 class Language(Model):
-    id = Column(String(32), primary_key=True, default=new_object_id)
+    id = Column(String(32), primary_key=True, default=new_object_id, info={"key": True})
     code = Column(String(3), nullable=False, unique=True)  # ISO-639-3
     words = relationship("Word")
 
@@ -106,10 +355,18 @@ class Language(Model):
 
 
 class Word(Model):
-    id = Column(String(32), primary_key=True, default=new_object_id)
-    text = Column(UnicodeText, nullable=False, index=True)
+    id = Column(String(32), primary_key=True, default=new_object_id, info={"key": True})
+    text = Column(UnicodeText, nullable=False)
+    search_key = Column(new_search_key_type(), nullable=False, index=True)
+    # The text without its annotations, and the annotations (see `parse_word`)
+    headword = Column(UnicodeText, nullable=False)
+    grammar = Column(UnicodeText)
+    abbreviation = Column(UnicodeText)
     language_id = Column(
-        String(32), ForeignKey("language.id", ondelete="CASCADE"), nullable=False
+        String(32),
+        ForeignKey("language.id", ondelete="CASCADE"),
+        nullable=False,
+        info={"key": True},
     )
     language = relationship("Language")
 
@@ -117,9 +374,7 @@ class Word(Model):
 
     @validates("text")
     def validate_text(self, key, value):
-        if len(value) < 1:
-            raise ValueError("must be at least 1 character")
-        return value
+        return validate_word_text(value)
 
 
 class Translation(Model):
@@ -128,16 +383,143 @@ class Translation(Model):
         ForeignKey("word.id", ondelete="CASCADE"),
         nullable=False,
         index=True,
+        info={"key": True},
     )
     word2_id = Column(
         String(32),
         ForeignKey("word.id", ondelete="CASCADE"),
         nullable=False,
         index=True,
+        info={"key": True},
     )
+    # A hash of the texts of both words, to recognize entries in incremental imports
+    fingerprint = Column(BigInteger, nullable=False, index=True)
 
     __tablename__ = "word_translates_to_word"
     __table_args__ = (
         PrimaryKeyConstraint("word1_id", "word2_id"),
         UniqueConstraint("word1_id", "word2_id"),
     )
+
+
+class WordDomain(Model):
+    """A domain (like "biol.") or other label which a word is annotated with."""
+
+    word_id = Column(
+        String(32),
+        ForeignKey("word.id", ondelete="CASCADE"),
+        nullable=False,
+        info={"key": True},
+    )
+    domain = Column(UnicodeText, nullable=False)
+
+    __tablename__ = "word_domain"
+    __table_args__ = (
+        PrimaryKeyConstraint("word_id", "domain"),
+        # Finds the words of a domain without reading the others
+        Index("ix_word_domain_domain_word_id", "domain", "word_id"),
+    )
+
+
+class WordSynonym(Model):
+    """A word of a group of synonyms, which is stored as a word of its own as well.
+
+    The group (the "set") keeps the translations; its words are only looked up.
+    """
+
+    set_id = Column(
+        String(32),
+        ForeignKey("word.id", ondelete="CASCADE"),
+        nullable=False,
+        info={"key": True},
+    )
+    word_id = Column(
+        String(32),
+        ForeignKey("word.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        info={"key": True},
+    )
+
+    __tablename__ = "word_synonym"
+    __table_args__ = (PrimaryKeyConstraint("set_id", "word_id"),)
+
+
+class LookupEntry(Model):
+    """A translation as it is looked up in one direction, with all its data in one row.
+
+    The lookup entries are derived from the words and translations by the importer,
+    so that a lookup is a single range scan over the search key index. The texts are
+    not part of any index: long entries would exceed the size limit of index rows.
+    The id of the word which was looked up is kept to filter the entries by domain.
+    """
+
+    id = Column(new_integer_key_type(), primary_key=True, autoincrement=True)
+    word_id = Column(String(32), nullable=False, info={"key": True})
+    source_code = Column(String(3), nullable=False)
+    target_code = Column(String(3), nullable=False)
+    search_key = Column(new_search_key_type(), nullable=False)
+    word = Column(UnicodeText, nullable=False)
+    translation = Column(UnicodeText, nullable=False)
+
+    __tablename__ = "lookup_entry"
+    __table_args__ = (
+        Index(
+            "ix_lookup_entry_source_code_target_code_search_key",
+            "source_code",
+            "target_code",
+            "search_key",
+        ),
+    )
+
+
+class KeyCounter(Model):
+    """Named counters in the database.
+
+    They hold the last integer key handed out for each table (see `reserve_keys`) and
+    the generation of the dictionary (see `bump_generation`).
+    """
+
+    name = Column(String(32), primary_key=True)
+    value = Column(BigInteger, nullable=False)
+
+    __tablename__ = "key_counter"
+
+
+RESERVE_KEYS_QUERY_POSTGRESQL = """
+insert into key_counter (name, value) values (:name, :count)
+on conflict (name) do update set value = key_counter.value + excluded.value
+returning value
+"""
+
+
+def reserve_keys(engine, name, count):
+    """Reserve a block of consecutive integer keys and return the first one.
+
+    The reservation is committed in its own, short transaction (like a sequence), so
+    concurrent imports never have to wait for each other to hand out keys.
+    """
+    with engine.begin() as connection:
+        last_key = connection.execute(
+            text(RESERVE_KEYS_QUERY_POSTGRESQL), name=name, count=count
+        ).scalar()
+    return last_key - count + 1
+
+
+#: The name of the counter which is incremented by every import.
+GENERATION_COUNTER = "generation"
+
+BUMP_GENERATION_QUERY = """
+insert into key_counter (name, value) values (:name, 1)
+on conflict (name) do update set value = key_counter.value + 1
+"""
+
+
+def bump_generation(session):
+    """Increment the generation of the dictionary as part of the session's transaction.
+
+    A connection (in a transaction) may be passed instead of a session.
+
+    The API uses the generation to notice that its cached lookup results are outdated.
+    """
+    session.execute(text(BUMP_GENERATION_QUERY), {"name": GENERATION_COUNTER})
@@ -32,23 +32,99 @@ following two tuples::
   ("Chiasma {n} [biol.]", "chiasma; chiasm")
   ("Chiasmata {pl}", "chiasmata")
 
-**Note**: annotations like the number (`{n}`, `{pl}`) or category (`[biol.]`, etc.) of a
-word are not currently parsed – they are just included as part of the entry string.
+The words are yielded as they appear in the file, including their annotations and
+their synonyms. A group of synonyms can be split into its words using
+`split_synonyms`; the importer does so if asked to (see `EntryRowBuilder`).
+
+The annotations can be extracted from a word using `parse_word`: the grammatical
+information (like the gender or number, e.g. `{f}` or `{pl}`), the domains (like
+`[biol.]` or `[Am.]`) and the abbreviation (like `/fl./`). For example::
+
+  >>> parse_word("Chiasma {n} [biol.]")
+  ParsedWord(headword='Chiasma', grammar='n', domains=('biol.',), abbreviation=None)
+
+Large files can be parsed by multiple processes in parallel (see
+`load_entries_parallel`). The entries are still yielded in the order in which they
+appear in the file, and the same messages are logged for malformed lines.
 
 .. _`Ding dictionary lookup program`: https://www-user.tu-chemnitz.de/~fri/ding/
 """
+import io
 import logging
+import multiprocessing
+import os
+import re
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from more_itertools import chunked
+
+from dictionarydb.compression import detect_file_compression
+from dictionarydb.search import remove_annotations
 
 logger = logging.getLogger(__name__)
 
 TRANSLATION_SEPARATOR = "::"
 WORD_SEPARATOR = "|"
+SYNONYM_SEPARATOR = ";"
 
 
 def split_and_strip(string, separator=None):
     return [value.strip() for value in string.split(separator)]
 
 
+GRAMMAR_PATTERN = re.compile(r"\{([^}]*)\}")
+DOMAIN_PATTERN = re.compile(r"\[([^\]]*)\]")
+ABBREVIATION_PATTERN = re.compile(r"(?:^|\s)/([^/]+)/(?=\s|$)")
+DOMAIN_SEPARATOR_PATTERN = re.compile(r"[;,]")
+# A semicolon separates synonyms unless it is part of an annotation (like "[ugs.; Am.]")
+SYNONYM_SEPARATOR_PATTERN = re.compile(SYNONYM_SEPARATOR + r"(?![^[{<]*[\]}>])")
+
+#: A word of an entry, split into the word itself and the annotations of the word.
+ParsedWord = namedtuple(
+    "ParsedWord", ["headword", "grammar", "domains", "abbreviation"]
+)
+
+
+def join_annotations(values):
+    values = [value.strip() for value in values if value.strip()]
+    return "; ".join(values) if values else None
+
+
+def get_domains(text):
+    domains = []
+    for annotation in DOMAIN_PATTERN.findall(text):
+        for domain in DOMAIN_SEPARATOR_PATTERN.split(annotation):
+            domain = domain.strip()
+            if domain and domain not in domains:
+                domains.append(domain)
+    return tuple(domains)
+
+
+def parse_word(text):
+    """Split the annotations of a word (or a group of synonyms) off its text.
+
+    If a group of synonyms has more than one grammar annotation (or abbreviation),
+    they are joined by semicolons. Duplicate domains are only returned once.
+    """
+    # Most words have few annotations or none, so skip the patterns which cannot match
+    return ParsedWord(
+        remove_annotations(text),
+        join_annotations(GRAMMAR_PATTERN.findall(text)) if "{" in text else None,
+        get_domains(text) if "[" in text else (),
+        join_annotations(ABBREVIATION_PATTERN.findall(text)) if "/" in text else None,
+    )
+
+
+def split_synonyms(text):
+    """Split a group of synonyms (like "Etage {f}; Stock {m}") into its words."""
+    return [
+        synonym.strip()
+        for synonym in SYNONYM_SEPARATOR_PATTERN.split(text)
+        if synonym.strip()
+    ]
+
+
 def parse_entry_line(line):
     """Parse a line from the dictionary file and return its entries."""
     line = line.strip()
@@ -76,8 +152,8 @@ def is_entry_line(line):
     return TRANSLATION_SEPARATOR in line and not is_comment(line)
 
 
-def load_entries(file):
-    entry_lines = filter(is_entry_line, file)
+def parse_lines(lines):
+    entry_lines = filter(is_entry_line, lines)
     for entry_line in entry_lines:
         try:
             entries = parse_entry_line(entry_line)
@@ -85,3 +161,155 @@ def load_entries(file):
         except ValueError as exc:
             logger.warning(f"Failed to parse entry line: {exc}")
             logger.debug(f"Malformed entry line: {entry_line.strip()}")
+
+
+def load_entries(file, num_workers=1, stats=None, executor=None):
+    """Parse the entries in a file, using multiple processes if `num_workers` > 1.
+
+    The time spent waiting for the entries is recorded in `stats` (see `ImportStats`)
+    as the "parse" stage, if given. See `load_entries_parallel` for `executor`.
+    """
+    if num_workers > 1:
+        entries = load_entries_parallel(file, num_workers, executor=executor)
+    else:
+        entries = parse_lines(file)
+    if stats is not None:
+        entries = stats.iter_stage("parse", entries)
+    return entries
+
+
+#: Approximate size of the parts of a file that are handed to the worker processes.
+PARSE_CHUNK_BYTES = 1024 * 1024
+
+#: Number of lines to hand to a worker at once when the file cannot be split up
+#: (e.g. standard input).
+PARSE_CHUNK_LINES = 10_000
+
+
+class RecordCollector(logging.Handler):
+    """A log handler which keeps the log records (to send them to another process)."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def pop_records(self):
+        records, self.records = self.records, []
+        return records
+
+
+record_collector = RecordCollector()
+
+
+def init_worker(log_level):
+    # Collect the log records instead of emitting them; the main process will
+    # emit them in the right order.
+    logger.handlers = [record_collector]
+    logger.propagate = False
+    logger.setLevel(log_level)
+
+
+def create_worker_pool(num_workers):
+    """Create a pool of `num_workers` processes for parsing.
+
+    The workers are started as new processes ("spawn") rather than forked. The pool
+    is often created in a background thread (see `iter_in_background`) while the
+    import holds a database connection; forked workers would inherit that connection
+    and close it when they exit, and forking a process with threads can deadlock.
+    """
+    return ProcessPoolExecutor(
+        num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(logger.getEffectiveLevel(),),
+    )
+
+
+def parse_lines_in_worker(lines):
+    entries = list(parse_lines(lines))
+    return entries, record_collector.pop_records()
+
+
+def parse_byte_range(path, start, end, encoding):
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    # Decode the lines the same way as they would be read from the file itself
+    return parse_lines_in_worker(io.TextIOWrapper(io.BytesIO(data), encoding))
+
+
+def get_byte_ranges(path, chunk_bytes=PARSE_CHUNK_BYTES):
+    """Split a file into ranges of roughly `chunk_bytes` which end at a line break."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        start = 0
+        while start < size:
+            file.seek(min(start + chunk_bytes, size))
+            file.readline()
+            end = min(file.tell(), size)
+            yield start, end
+            start = end
+
+
+def is_uncompressed_file(path):
+    return (
+        isinstance(path, str)
+        and os.path.isfile(path)
+        and detect_file_compression(path) is None
+    )
+
+
+def get_parse_tasks(file, chunk_bytes):
+    # A decompressed file has the name of the compressed file it reads from, which
+    # cannot be split into byte ranges
+    path = getattr(file, "name", None)
+    if is_uncompressed_file(path):
+        encoding = getattr(file, "encoding", None) or "utf-8"
+        for start, end in get_byte_ranges(path, chunk_bytes):
+            yield parse_byte_range, (path, start, end, encoding)
+    else:
+        for lines in chunked(file, PARSE_CHUNK_LINES):
+            yield parse_lines_in_worker, (lines,)
+
+
+def load_entries_parallel(
+    file, num_workers, chunk_bytes=PARSE_CHUNK_BYTES, executor=None
+):
+    """Parse the entries in a file using a pool of `num_workers` processes.
+
+    Regular files are split into line-aligned byte ranges which the workers read
+    themselves; other files (e.g. standard input) are read in batches of lines. At
+    most two tasks per worker are in flight at any time to keep memory usage bounded.
+
+    The workers of an existing pool (see `create_worker_pool`) are used if `executor`
+    is given, e.g. to parse several files with the same pool; it is left running.
+    """
+    if executor is None:
+        with create_worker_pool(num_workers) as executor:
+            yield from iter_parse_results(file, num_workers, chunk_bytes, executor)
+    else:
+        yield from iter_parse_results(file, num_workers, chunk_bytes, executor)
+
+
+def iter_parse_results(file, num_workers, chunk_bytes, executor):
+    pending = deque()
+    try:
+        for function, args in get_parse_tasks(file, chunk_bytes):
+            pending.append(executor.submit(function, *args))
+            if len(pending) >= 2 * num_workers:
+                yield from get_parse_result(pending.popleft())
+        while pending:
+            yield from get_parse_result(pending.popleft())
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def get_parse_result(future):
+    entries, records = future.result()
+    for record in records:
+        logger.handle(record)
+    return entries
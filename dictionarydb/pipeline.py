@@ -0,0 +1,68 @@
+"""Utilities for overlapping the production and consumption of data in threads."""
+import threading
+from queue import Full, Queue
+
+#: How often (in seconds) the blocked producer checks whether it should give up.
+POLL_INTERVAL = 0.1
+
+
+class ProducerError(object):
+    """Wraps an exception raised in the producer thread to re-raise it elsewhere."""
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+DONE = object()
+
+
+def iter_in_background(iterable, queue_depth):
+    """Iterate over an iterable in a background thread, yielding its items here.
+
+    Up to `queue_depth` items are produced ahead of time and held in a bounded queue.
+    An exception raised while producing an item is re-raised in the consuming thread
+    when that item would have been yielded. If the consumer stops early (or fails),
+    the producer is stopped as well.
+    """
+    queue = Queue(maxsize=queue_depth)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                queue.put(item, timeout=POLL_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as exc:
+            put(ProducerError(exc))
+        else:
+            put(DONE)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    thread = threading.Thread(target=produce, name="dictionarydb-producer")
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            # The producer always finishes with DONE or an error (unless stopped)
+            item = queue.get()
+            if item is DONE:
+                break
+            if isinstance(item, ProducerError):
+                raise item.exception
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
@@ -0,0 +1,243 @@
+"""
+The SQL queries of lookups, as they are sent by the API (and explained by the CLI).
+
+Each lookup mode (see `LOOKUP_MODES`) has a query for each database which supports
+it; `get_lookup_query` picks one and `get_lookup_values` prepares its parameters from
+a search string. Batch lookups look up many search keys of a language pair at once.
+"""
+import json
+
+from dictionarydb.search import get_fulltext_query, get_prefix_range, get_search_key
+
+#: The number of results of a lookup unless another one is requested.
+DEFAULT_NUM_RESULTS = 20
+#: The largest number of results which a lookup may request.
+MAX_NUM_RESULTS = 50
+
+# The lookup entries are precomputed by the importer (see `LookupEntry`), so a lookup
+# only has to scan a range of the search key index of the "lookup_entry" table: all
+# search keys starting with the (normalized) search string (see `get_prefix_range`).
+# The lookup queries are templates: `get_lookup_query` fills in the domain condition.
+LOOKUP_QUERY = """
+select word,
+       source_code as language,
+       translation,
+       target_code as translation_language
+from lookup_entry
+where source_code = :source_language
+  and target_code = :target_language{domain_condition}
+  and search_key >= :search_key
+  and search_key < :search_key_upper_bound
+limit :max_results
+"""
+
+LOOKUP_QUERY_POSTGRESQL = """
+select word,
+       source_code as language,
+       translation,
+       target_code as translation_language,
+       similarity(search_key, :search_key) as relevance
+from lookup_entry
+where source_code = :source_language
+  and target_code = :target_language{domain_condition}
+  and search_key >= :search_key
+  and search_key < :search_key_upper_bound
+order by relevance desc
+limit :max_results
+"""
+
+
+# A fuzzy lookup finds the search keys which are similar to the search string (i.e.
+# share enough trigrams with it), most similar first. Both the similarity operator (%)
+# and the distance operator (<->) are answered by the trigram index on "search_key"
+# (see `TRIGRAM_INDEXED_COLUMNS`).
+LOOKUP_QUERY_FUZZY = """
+select word,
+       source_code as language,
+       translation,
+       target_code as translation_language,
+       similarity(search_key, :search_key) as relevance
+from lookup_entry
+where source_code = :source_language
+  and target_code = :target_language{domain_condition}
+  and search_key % :search_key
+order by search_key <-> :search_key
+limit :max_results
+"""
+
+# A full-text lookup finds the words whose headwords (see `parse_word`) contain all
+# tokens of the search string (in any position), using the FTS5 index of the words (see
+# `FULLTEXT_TABLE_NAME`). The words are ranked by bm25, which is lower for better
+# matches. Their translations are read from the lookup entries of each word (found by
+# its search key), so the words of a split group of synonyms are found as well.
+LOOKUP_QUERY_FULLTEXT = """
+with matches as (
+    select rowid, bm25(word_fts) as rank
+    from word_fts
+    where word_fts match :search_key
+)
+select lookup_entry.word,
+       lookup_entry.source_code as language,
+       lookup_entry.translation,
+       lookup_entry.target_code as translation_language,
+       -matches.rank as relevance
+from matches
+join word on word.rowid = matches.rowid
+join lookup_entry on lookup_entry.word_id = word.id
+where lookup_entry.source_code = :source_language
+  and lookup_entry.target_code = :target_language
+  and lookup_entry.search_key = word.search_key{domain_condition}
+order by relevance desc
+limit :max_results
+"""
+
+#: The ways in which the search string can be matched against the search keys.
+#:
+#: - "prefix": all search keys starting with the search string.
+#: - "fuzzy": the search keys most similar to the search string (PostgreSQL only).
+#: - "fulltext": the words containing all tokens of the search string (SQLite only).
+LOOKUP_MODES = ("prefix", "fuzzy", "fulltext")
+
+# Restricts a lookup to the words annotated with a domain (see `WordDomain`). Each
+# candidate entry is checked by the primary key of "word_domain", using the id of the
+# word which the entry was derived from.
+DOMAIN_CONDITION = """
+  and exists (
+    select 1
+    from word_domain
+    where word_domain.word_id = lookup_entry.word_id
+      and word_domain.domain = :domain
+  )"""
+
+
+def get_lookup_query(database_name="", mode="prefix", domain=False):
+    if mode == "fuzzy":
+        if not database_name.startswith("postgres"):
+            raise ValueError("fuzzy lookups require a PostgreSQL database")
+        query = LOOKUP_QUERY_FUZZY
+    elif mode == "fulltext":
+        if not database_name.startswith("sqlite"):
+            raise ValueError("fulltext lookups require a SQLite database")
+        query = LOOKUP_QUERY_FULLTEXT
+    elif database_name.startswith("postgres"):
+        query = LOOKUP_QUERY_POSTGRESQL
+    else:
+        query = LOOKUP_QUERY
+    return query.format(domain_condition=DOMAIN_CONDITION if domain else "")
+
+
+def get_lookup_values(
+    source_language,
+    target_language,
+    search_string,
+    max_results,
+    mode="prefix",
+    domain=None,
+):
+    values = {
+        "source_language": source_language,
+        "target_language": target_language,
+        "search_key": get_search_key(search_string),
+        "max_results": max_results,
+    }
+    if domain:
+        values["domain"] = domain
+    if mode == "prefix":
+        search_key, search_key_upper_bound = get_prefix_range(values["search_key"])
+        values["search_key"] = search_key
+        values["search_key_upper_bound"] = search_key_upper_bound
+    elif mode == "fulltext":
+        values["search_key"] = get_fulltext_query(values["search_key"])
+    return values
+
+
+# A batch lookup joins the lookup entries against the list of search key ranges, which
+# is passed as a JSON array of [search key, upper bound] pairs. The results of each
+# search key are numbered by the "position" column (its index in the list).
+BATCH_SEARCH_KEYS = """
+with batch as (
+    select cast(key as integer) as position,
+           json_extract(value, '$[0]') as search_key,
+           json_extract(value, '$[1]') as search_key_upper_bound
+    from json_each(:search_keys)
+)
+"""
+
+BATCH_SEARCH_KEYS_POSTGRESQL = """
+with batch as (
+    select cast(ordinality - 1 as integer) as position,
+           value ->> 0 as search_key,
+           value ->> 1 as search_key_upper_bound
+    from json_array_elements(cast(:search_keys as json)) with ordinality
+)
+"""
+
+# For each search key, the subquery finds the ids of the first matching entries in the
+# search key index, in the same order as the lookup query.
+BATCH_LOOKUP_QUERY = (
+    BATCH_SEARCH_KEYS
+    + """
+select batch.position,
+       lookup_entry.word,
+       lookup_entry.source_code as language,
+       lookup_entry.translation,
+       lookup_entry.target_code as translation_language
+from batch
+join lookup_entry on lookup_entry.id in (
+    select candidate.id
+    from lookup_entry as candidate
+    where candidate.source_code = :source_language
+      and candidate.target_code = :target_language
+      and candidate.search_key >= batch.search_key
+      and candidate.search_key < batch.search_key_upper_bound
+    limit :max_results
+)
+order by batch.position, lookup_entry.search_key, lookup_entry.id
+"""
+)
+
+BATCH_LOOKUP_QUERY_POSTGRESQL = (
+    BATCH_SEARCH_KEYS_POSTGRESQL
+    + """
+select batch.position, results.*
+from batch
+cross join lateral (
+    select lookup_entry.word,
+           lookup_entry.source_code as language,
+           lookup_entry.translation,
+           lookup_entry.target_code as translation_language,
+           similarity(lookup_entry.search_key, batch.search_key) as relevance
+    from lookup_entry
+    where lookup_entry.source_code = :source_language
+      and lookup_entry.target_code = :target_language
+      and lookup_entry.search_key >= batch.search_key
+      and lookup_entry.search_key < batch.search_key_upper_bound
+    order by relevance desc
+    limit :max_results
+) as results
+order by batch.position, results.relevance desc
+"""
+)
+
+
+def get_batch_lookup_query(database_name=""):
+    """Return a query which looks up several search keys (of one language pair) at once.
+
+    The results of each search key are numbered by the "position" column.
+    """
+    if database_name.startswith("postgres"):
+        return BATCH_LOOKUP_QUERY_POSTGRESQL
+    return BATCH_LOOKUP_QUERY
+
+
+def get_batch_lookup_values(values_list):
+    search_keys = [
+        [values["search_key"], values["search_key_upper_bound"]]
+        for values in values_list
+    ]
+    return {
+        "source_language": values_list[0]["source_language"],
+        "target_language": values_list[0]["target_language"],
+        "max_results": values_list[0]["max_results"],
+        "search_keys": json.dumps(search_keys),
+    }
@@ -0,0 +1,176 @@
+"""
+Routing of the API's read queries to read replicas of the database.
+
+Queries are spread over the replicas in turn. A replica which fails is taken out of the
+rotation for a while and the query is sent to the primary database instead. So is a
+query for which no connection to the replica becomes free in time, but the replica
+stays in the rotation. Without any (healthy) replicas, all queries go to the primary.
+"""
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+
+from dictionarydb.metrics import (
+    DATABASE_CONNECTIONS_IN_USE,
+    DATABASE_POOL_WAIT,
+    DATABASE_QUERIES_IN_FLIGHT,
+    DATABASE_QUERY_DURATION,
+    DATABASE_ROWS,
+)
+
+logger = logging.getLogger(__name__)
+
+#: How long (in seconds) to leave out a replica after it has failed.
+REPLICA_RETRY_INTERVAL = 30.0
+
+
+class AcquireTimeout(asyncio.TimeoutError):
+    """No connection from the pool of a database became free in time."""
+
+
+class ReplicaRouter(object):
+    """Send read queries to a primary `Database` and its replicas.
+
+    The router offers the (reading) methods of a `databases.Database`, so it can be
+    used in its place. Each query may wait up to `acquire_timeout` seconds for a
+    connection from the pool, or as long as it takes if it is None; the query itself
+    is not limited.
+    """
+
+    def __init__(
+        self,
+        primary,
+        replicas=(),
+        acquire_timeout=None,
+        retry_interval=REPLICA_RETRY_INTERVAL,
+        clock=time.monotonic,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.acquire_timeout = acquire_timeout
+        self.retry_interval = retry_interval
+        self.clock = clock
+        # Maps the position of a failed replica to the time when to try it again
+        self.unhealthy_until = {}
+        self.next_position = 0
+        self.fallbacks = 0
+
+    @property
+    def url(self):
+        return self.primary.url
+
+    async def connect(self):
+        await self.primary.connect()
+        for position in range(len(self.replicas)):
+            await self.connect_replica(position)
+
+    async def connect_replica(self, position):
+        replica = self.replicas[position]
+        try:
+            await replica.connect()
+        except Exception as exc:
+            logger.warning(f"Failed to connect to replica #{position}: {exc!r}")
+            self.mark_unhealthy(position)
+            return False
+        return True
+
+    async def disconnect(self):
+        for replica in self.replicas:
+            if replica.is_connected:
+                await replica.disconnect()
+        await self.primary.disconnect()
+
+    def is_healthy(self, position):
+        return self.clock() >= self.unhealthy_until.get(position, 0)
+
+    def mark_unhealthy(self, position):
+        self.unhealthy_until[position] = self.clock() + self.retry_interval
+
+    def get_replica_position(self):
+        """Return the position of the next healthy replica (None if there is none)."""
+        for _ in range(len(self.replicas)):
+            position = self.next_position
+            self.next_position = (position + 1) % len(self.replicas)
+            if self.is_healthy(position):
+                return position
+        return None
+
+    async def acquire(self, stack, database):
+        """Enter the connection context of a database, waiting for a free connection."""
+        try:
+            return await asyncio.wait_for(
+                stack.enter_async_context(database.connection()),
+                timeout=self.acquire_timeout,
+            )
+        except asyncio.TimeoutError:
+            raise AcquireTimeout(
+                f"no connection became free within {self.acquire_timeout} seconds"
+            )
+
+    def get_database_name(self, database):
+        """Return the name of a database in the metrics ("primary" or "replica0"...)."""
+        if database is self.primary:
+            return "primary"
+        return f"replica{self.replicas.index(database)}"
+
+    async def run(self, database, method_name, query, values):
+        """Run a query, recording how long it waited for a connection and ran."""
+        name = self.get_database_name(database)
+        DATABASE_QUERIES_IN_FLIGHT.inc()
+        try:
+            start_time = time.perf_counter()
+            async with AsyncExitStack() as stack:
+                connection = await self.acquire(stack, database)
+                DATABASE_CONNECTIONS_IN_USE.inc(name)
+                stack.callback(DATABASE_CONNECTIONS_IN_USE.dec, name)
+                query_start_time = time.perf_counter()
+                DATABASE_POOL_WAIT.observe(query_start_time - start_time)
+                method = getattr(connection, method_name)
+                result = await method(query=query, values=values)
+            DATABASE_QUERY_DURATION.observe(
+                time.perf_counter() - query_start_time, method_name
+            )
+        finally:
+            DATABASE_QUERIES_IN_FLIGHT.dec()
+        if method_name == "fetch_all":
+            DATABASE_ROWS.observe(len(result))
+        return result
+
+    async def run_on_replica(self, method_name, query, values):
+        position = self.get_replica_position()
+        if position is not None:
+            replica = self.replicas[position]
+            if replica.is_connected or await self.connect_replica(position):
+                try:
+                    return await self.run(replica, method_name, query, values)
+                except AcquireTimeout as exc:
+                    # The replica is busy, not broken
+                    logger.warning(
+                        f"No connection to replica #{position} became free, using "
+                        f"the primary database instead: {exc}"
+                    )
+                except Exception as exc:
+                    logger.warning(
+                        f"Query on replica #{position} failed, using the primary "
+                        f"database instead: {exc!r}"
+                    )
+                    self.mark_unhealthy(position)
+        if self.replicas:
+            self.fallbacks += 1
+        return await self.run(self.primary, method_name, query, values)
+
+    async def fetch_all(self, query, values=None):
+        return await self.run_on_replica("fetch_all", query, values)
+
+    async def fetch_val(self, query, values=None):
+        return await self.run_on_replica("fetch_val", query, values)
+
+    def get_stats(self):
+        return {
+            "replicas": len(self.replicas),
+            "healthy_replicas": sum(
+                self.is_healthy(position) for position in range(len(self.replicas))
+            ),
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,74 @@
+"""
+Normalized search keys for looking up words by prefix.
+
+Both the stored words and the search strings are reduced to a search key: annotations
+such as ``{f}``, ``[biol.]``, ``<Fotografie>`` or ``/fl./`` are removed, whitespace is
+collapsed and the text is case-folded. A prefix search is then a range query over the
+search keys, which both SQLite and PostgreSQL answer with an index seek.
+"""
+import re
+import unicodedata
+
+ANNOTATION_PATTERN = re.compile(r"\{[^}]*\}|\[[^\]]*\]|<[^>]*>|(?:^|\s)/[^/]+/(?=\s|$)")
+
+SPACE_BEFORE_PUNCTUATION_PATTERN = re.compile(r"\s+(?=[;,])")
+
+MAX_CODE_POINT = 0x10FFFF
+SURROGATES = range(0xD800, 0xE000)
+
+
+def remove_annotations(text):
+    """Return a text without its annotations and with its whitespace collapsed."""
+    text = unicodedata.normalize("NFC", text)
+    text = ANNOTATION_PATTERN.sub(" ", text)
+    text = SPACE_BEFORE_PUNCTUATION_PATTERN.sub("", text)
+    return " ".join(text.split())
+
+
+def get_search_key(text):
+    """Return the normalized form of a text which is used to search for it."""
+    return remove_annotations(text).casefold()
+
+
+def get_next_character(character):
+    code_point = ord(character) + 1
+    if code_point in SURROGATES:
+        # Surrogates cannot be encoded, so they never occur in stored text
+        code_point = SURROGATES.stop
+    return chr(code_point)
+
+
+def get_prefix_upper_bound(prefix):
+    """Return the smallest text which is greater than every text with the prefix.
+
+    Texts are compared by code point, which is how SQLite compares text by default
+    (and how PostgreSQL compares text using the "C" collation). If there is no such
+    text (i.e. the prefix only consists of the largest code point), None is returned.
+    """
+    prefix = prefix.rstrip(chr(MAX_CODE_POINT))
+    if not prefix:
+        return None
+    return prefix[:-1] + get_next_character(prefix[-1])
+
+
+def get_prefix_range(prefix):
+    """Return the bounds of the range of texts which start with the prefix.
+
+    The range includes the lower bound and excludes the upper bound.
+    """
+    upper_bound = get_prefix_upper_bound(prefix)
+    if upper_bound is None:
+        # Only texts containing the largest code point (a noncharacter) are missed
+        upper_bound = prefix + chr(MAX_CODE_POINT)
+    return prefix, upper_bound
+
+
+def get_fulltext_query(search_key):
+    """Return an FTS5 query for the texts containing all tokens of a search key.
+
+    Every token is quoted, so that it is never taken for an operator. The last token
+    may still be incomplete, so it is matched as a prefix.
+    """
+    phrases = ['"' + token.replace('"', '""') + '"' for token in search_key.split()]
+    phrases[-1] += "*"
+    return " ".join(phrases)
@@ -0,0 +1,158 @@
+"""
+Staging ("shadow") copies of database tables which can be swapped in for the originals.
+
+A shadow import writes all rows into new, empty staging tables and builds their indexes
+afterwards. Only then, at the very end of the import transaction, the live tables are
+renamed out of the way and the staging tables are renamed to take their place. Until
+that transaction is committed, readers keep using the live tables, which are never
+modified row by row.
+"""
+from uuid import uuid4
+
+from sqlalchemy import (
+    Column,
+    ForeignKeyConstraint,
+    Index,
+    MetaData,
+    Table,
+    UniqueConstraint,
+)
+
+from dictionarydb.models import (
+    TRIGRAM_INDEXED_COLUMNS,
+    copy_table,
+    create_trigram_index,
+    get_trigram_index_name,
+)
+
+
+def new_staging_token():
+    return uuid4().hex[:8]
+
+
+def check_references(metadata, table_names):
+    """Make sure that no table outside of the staged tables references one of them.
+
+    Such a reference would still point to the old table after the swap (on SQLite, it
+    would even be renamed along with it), which is then dropped.
+    """
+    for table in metadata.sorted_tables:
+        if table.name in table_names:
+            continue
+        for foreign_key in table.foreign_keys:
+            if foreign_key.column.table.name in table_names:
+                raise ValueError(
+                    f'table "{table.name}" references staged table '
+                    f'"{foreign_key.column.table.name}" but is not staged itself'
+                )
+
+
+class StagingTables(object):
+    """Empty copies of some tables of a schema, to be swapped in for the originals.
+
+    Every staging table (and each of its indexes) gets a name which is unique to this
+    set of staging tables, so that it never collides with the live tables, with their
+    indexes, or with any constraint names that are left over from an earlier swap.
+    """
+
+    def __init__(self, metadata, table_names, token=None):
+        check_references(metadata, table_names)
+        self.token = token or new_staging_token()
+        self.metadata = MetaData()
+        self.live_tables = {name: metadata.tables[name] for name in table_names}
+        self.tables = {
+            name: self.copy_table(table) for name, table in self.live_tables.items()
+        }
+
+    def get_staging_name(self, name):
+        return f"{name}__staging_{self.token}"
+
+    def get_old_name(self, name):
+        return f"{name}__old_{self.token}"
+
+    def get_referred_column(self, column):
+        table = column.table
+        if table.name in self.live_tables:
+            return f"{self.get_staging_name(table.name)}.{column.name}"
+        # Tables that are not staged are referenced as they are; they only have to be
+        # known to the metadata so that the foreign key can be resolved.
+        if table.name not in self.metadata.tables:
+            copy_table(table, self.metadata)
+        return f"{table.name}.{column.name}"
+
+    def copy_table(self, table):
+        # Only columns and foreign keys are created along with the table; the indexes
+        # (and unique constraints) are added after the rows have been loaded.
+        columns = [
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.primary_key,
+                nullable=column.nullable,
+                autoincrement=column.autoincrement,
+            )
+            for column in table.columns
+        ]
+        foreign_keys = [
+            ForeignKeyConstraint(
+                [element.parent.name for element in constraint.elements],
+                [
+                    self.get_referred_column(element.column)
+                    for element in constraint.elements
+                ],
+                ondelete=constraint.ondelete,
+            )
+            for constraint in table.foreign_key_constraints
+        ]
+        return Table(
+            self.get_staging_name(table.name), self.metadata, *columns, *foreign_keys
+        )
+
+    def get_indexes(self, name):
+        """Return the indexes to build for a staging table, matching the live table."""
+        live_table = self.live_tables[name]
+        table = self.tables[name]
+        for index in sorted(live_table.indexes, key=lambda index: index.name):
+            columns = [table.c[column.name] for column in index.columns]
+            yield Index(f"{index.name}_{self.token}", *columns, unique=index.unique)
+        for constraint in live_table.constraints:
+            if not isinstance(constraint, UniqueConstraint):
+                continue
+            column_names = [column.name for column in constraint.columns]
+            index_name = f"uq_{name}_{'_'.join(column_names)}_{self.token}"
+            columns = [table.c[column_name] for column_name in column_names]
+            yield Index(index_name, *columns, unique=True)
+
+    def create(self, connection):
+        self.metadata.create_all(connection, tables=list(self.tables.values()))
+
+    def create_indexes(self, connection):
+        for name, table in self.tables.items():
+            for index in self.get_indexes(name):
+                index.create(connection)
+            if connection.dialect.name != "postgresql":
+                continue
+            for column_name in TRIGRAM_INDEXED_COLUMNS.get(name, ()):
+                index_name = get_trigram_index_name(name, column_name)
+                create_trigram_index(
+                    connection, table.name, column_name, f"{index_name}_{self.token}"
+                )
+
+    def rename_table(self, connection, name, new_name):
+        quote = connection.dialect.identifier_preparer.quote
+        connection.execute(f"alter table {quote(name)} rename to {quote(new_name)}")
+
+    def swap(self, connection):
+        """Replace the live tables with the staging tables and drop the live tables.
+
+        This should be the last thing done in a transaction: on PostgreSQL, the live
+        tables stay locked against readers from here until the transaction ends.
+        """
+        for name in self.live_tables:
+            self.rename_table(connection, name, self.get_old_name(name))
+        for name, table in self.tables.items():
+            self.rename_table(connection, table.name, name)
+        quote = connection.dialect.identifier_preparer.quote
+        # Drop the tables holding references first
+        for name in reversed(list(self.live_tables)):
+            connection.execute(f"drop table {quote(self.get_old_name(name))}")
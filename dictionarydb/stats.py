@@ -0,0 +1,166 @@
+"""
+Instrumentation of the importer: where the time (and memory) of an import goes.
+
+An import is divided into stages (parsing the file, building the rows, writing them to
+the database, storing the lookup entries, committing, …). For each stage, the wall time
+and the CPU time of the thread running it are recorded. Stages may run at the same time
+in different threads (see `iter_in_background`), so their wall times can add up to more
+than the total. For every chunk of entries written, the number of rows and the rows per
+second are recorded as well.
+"""
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from humanfriendly import format_size
+
+from dictionarydb import __version__
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+#: Number of items to produce at once when timing an iterator (timing each item on
+#: its own would take longer than producing it).
+ITER_BATCH_SIZE = 1000
+
+
+def get_peak_rss(who="self"):
+    """Return the peak resident set size (in bytes) of the process or its children.
+
+    The children are the processes that have ended (e.g. parse workers). None is
+    returned if the platform does not report it.
+    """
+    if resource is None:
+        return None
+    usage = resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    peak_rss = resource.getrusage(usage).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+class StageStats(object):
+    def __init__(self):
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.calls = 0
+
+    def add(self, wall_time, cpu_time):
+        self.wall_time += wall_time
+        self.cpu_time += cpu_time
+        self.calls += 1
+
+    def as_dict(self):
+        return {
+            "wall_time": round(self.wall_time, 6),
+            "cpu_time": round(self.cpu_time, 6),
+            "calls": self.calls,
+        }
+
+
+class ImportStats(object):
+    """Record the time spent in each stage of an import and the rate of each chunk.
+
+    A progress line is logged every `progress_interval` chunks (never if it is 0).
+    """
+
+    def __init__(self, progress_interval=0, clock=time.perf_counter):
+        self.progress_interval = progress_interval
+        self.clock = clock
+        self.started_at = time.time()
+        self.start_time = clock()
+        self.stages = {}
+        self.chunks = []
+        self.num_entries = 0
+        self.num_rows = 0
+
+    def get_stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageStats()
+        return stage
+
+    @contextmanager
+    def stage(self, name):
+        """Record the time spent in the block as time spent in a stage."""
+        start_time = self.clock()
+        start_cpu_time = time.thread_time()
+        try:
+            yield
+        finally:
+            self.get_stage(name).add(
+                self.clock() - start_time, time.thread_time() - start_cpu_time
+            )
+
+    def iter_stage(self, name, iterable, batch_size=ITER_BATCH_SIZE):
+        """Iterate over an iterable, recording the time spent producing its items."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                items = list(islice(iterator, batch_size))
+            if not items:
+                return
+            yield from items
+
+    def add_chunk(self, num_entries, num_rows, seconds):
+        self.chunks.append(
+            {
+                "entries": num_entries,
+                "rows": num_rows,
+                "seconds": round(seconds, 6),
+                "rows_per_second": round(num_rows / seconds, 1) if seconds else None,
+            }
+        )
+        self.num_entries += num_entries
+        self.num_rows += num_rows
+        if self.progress_interval and len(self.chunks) % self.progress_interval == 0:
+            logger.info(self.format_progress())
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.start_time
+
+    def format_progress(self):
+        elapsed = self.elapsed
+        rate = self.num_entries / elapsed if elapsed else 0
+        message = (
+            f"Stored {self.num_entries} entries in {len(self.chunks)} chunks "
+            f"({rate:.0f} entries/s"
+        )
+        peak_rss = get_peak_rss()
+        if peak_rss is not None:
+            message += f", peak memory {format_size(peak_rss, binary=True)}"
+        return message + ")."
+
+    def log_summary(self):
+        for name, stage in self.stages.items():
+            logger.info(
+                f"Stage {name}: {stage.wall_time:.2f} s wall time, "
+                f"{stage.cpu_time:.2f} s CPU time ({stage.calls} calls)."
+            )
+
+    def get_report(self, **info):
+        """Return the statistics as a JSON-serializable dictionary."""
+        return {
+            "version": __version__,
+            "started_at": self.started_at,
+            "elapsed": round(self.elapsed, 6),
+            **info,
+            "entries": self.num_entries,
+            "rows": self.num_rows,
+            "peak_rss": get_peak_rss(),
+            "peak_rss_children": get_peak_rss("children"),
+            "stages": {name: stage.as_dict() for name, stage in self.stages.items()},
+            "chunks": self.chunks,
+        }
+
+    def write_report(self, path, **info):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.get_report(**info), file, indent=2)
+            file.write("\n")
@@ -1,10 +1,16 @@
+import asyncio
 import json
+import logging
+from contextlib import asynccontextmanager
 from unittest.mock import Mock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
+from dictionarydb import api
 from dictionarydb.api import app
+from dictionarydb.compiled import write_compiled_file
+from dictionarydb.index import LookupIndexBuilder, build_lookup_index
 
 
 def test_health():
@@ -15,9 +21,15 @@ def test_health():
 
 
 class AsyncMockDatabase(object):
-    def __init__(self, dialect, fetch_all_result=None):
+    def __init__(self, dialect, fetch_all_result=None, generation=1, acquire_delay=0):
         self.dialect = dialect
+        self.acquire_delay = acquire_delay
+        self.is_connected = True
         self.fetch_all_result = fetch_all_result
+        self.generation = generation
+        # Answers the query for the full-text table (if None, with the generation)
+        self.num_fulltext_tables = None
+        self.num_queries = 0
 
     @property
     def url(self):
@@ -29,12 +41,26 @@ class AsyncMockDatabase(object):
     async def disconnect(self):
         pass
 
+    @asynccontextmanager
+    async def connection(self):
+        if self.acquire_delay:
+            await asyncio.sleep(self.acquire_delay)
+        yield self
+
     async def execute(self, query):
         pass
 
     async def fetch_all(self, query, values):
+        self.num_queries += 1
+        if callable(self.fetch_all_result):
+            return self.fetch_all_result(query, values)
         return self.fetch_all_result
 
+    async def fetch_val(self, query, values):
+        if self.num_fulltext_tables is not None and "sqlite_master" in query:
+            return self.num_fulltext_tables
+        return self.generation
+
 
 lookup_results = [
     {
@@ -80,3 +106,390 @@ def test_lookup_missing_parameters(params):
     with TestClient(app) as client:
         response = client.get("/lookup", params=params)
         assert response.status_code == 422
+
+
+LOOKUP_PARAMS = {
+    "source_language": "deu",
+    "target_language": "eng",
+    "search_string": "Test",
+}
+
+
+def test_lookup_cache():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            client.get("/lookup", params=LOOKUP_PARAMS)
+            # The search string is normalized before the cache is consulted
+            response = client.get(
+                "/lookup", params={**LOOKUP_PARAMS, "search_string": "TEST"}
+            )
+            stats = client.get("/stats").json()
+
+    assert json.loads(response.text) == {"results": lookup_results}
+    assert database_mock.num_queries == 1
+    assert stats["cache"]["hits"] == 1
+    assert stats["cache"]["misses"] == 1
+    assert stats["cache"]["generation"] == 1
+
+
+def test_lookup_cache_invalidated_by_new_generation():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            api.cache.generation_check_interval = 0
+            client.get("/lookup", params=LOOKUP_PARAMS)
+            database_mock.generation = 2
+            client.get("/lookup", params=LOOKUP_PARAMS)
+            stats = client.get("/stats").json()
+
+    assert database_mock.num_queries == 2
+    assert stats["cache"]["invalidations"] == 1
+    assert stats["cache"]["generation"] == 2
+
+
+def test_metrics():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            for _ in range(2):
+                client.get("/lookup", params=LOOKUP_PARAMS)
+            response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    metrics = response.text
+    assert (
+        'dictionarydb_http_request_duration_seconds_count{method="GET",'
+        'route="/lookup",status="200"}' in metrics
+    )
+    assert 'dictionarydb_database_query_duration_seconds_count{method="fetch_all"}' in (
+        metrics
+    )
+    assert "dictionarydb_database_pool_wait_seconds_count" in metrics
+    assert 'dictionarydb_database_connections_in_use{database="primary"} 0' in metrics
+    assert 'dictionarydb_database_rows_returned_bucket{le="1"}' in metrics
+    assert "dictionarydb_http_response_render_seconds_count" in metrics
+    assert "dictionarydb_cache_hit_ratio 0.5\n" in metrics
+    assert "dictionarydb_http_requests_in_flight 1\n" in metrics
+
+
+@patch("dictionarydb.api.settings.API_CACHE_SIZE", 0)
+def test_lookup_cache_disabled():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            for _ in range(2):
+                client.get("/lookup", params=LOOKUP_PARAMS)
+
+    assert database_mock.num_queries == 2
+
+
+@patch("dictionarydb.api.settings.DATABASE_URL", "postgresql://primary/dictionary")
+@patch("dictionarydb.api.settings.API_DATABASE_POOL_MAX_SIZE", 50)
+@patch(
+    "dictionarydb.api.settings.API_DATABASE_REPLICA_URLS",
+    ["postgresql://replica/dictionary"],
+)
+def test_lookup_replicas():
+    primary_mock = AsyncMockDatabase("postgresql", lookup_results)
+    replica_mock = AsyncMockDatabase("postgresql", lookup_results)
+
+    with patch(
+        "dictionarydb.api.Database", side_effect=[primary_mock, replica_mock]
+    ) as database_cls:
+        with TestClient(app) as client:
+            response = client.get("/lookup", params=LOOKUP_PARAMS)
+            stats = client.get("/stats").json()
+
+    assert json.loads(response.text) == {"results": lookup_results}
+    database_cls.assert_any_call(
+        "postgresql://replica/dictionary",
+        min_size=10,
+        max_size=50,
+        server_settings={"pg_trgm.similarity_threshold": "0.3"},
+    )
+    assert replica_mock.num_queries == 1
+    assert primary_mock.num_queries == 0
+    assert stats["database"] == {"replicas": 1, "healthy_replicas": 1, "fallbacks": 0}
+
+
+def test_lookup_fuzzy():
+    database_mock = AsyncMockDatabase("postgresql", lookup_results)
+    database_mock.fetch_all_result = Mock(return_value=lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            response = client.get(
+                "/lookup",
+                params={**LOOKUP_PARAMS, "search_string": "Tets", "mode": "fuzzy"},
+            )
+
+    assert json.loads(response.text) == {"results": lookup_results}
+    query, values = database_mock.fetch_all_result.call_args[0]
+    assert "search_key % :search_key" in query
+    assert values["search_key"] == "tets"
+    assert "search_key_upper_bound" not in values
+
+
+@pytest.mark.parametrize(
+    "backend, dialect", [("database", "sqlite"), ("memory", "postgresql")]
+)
+def test_lookup_fuzzy_unsupported(backend, dialect):
+    database_mock = AsyncMockDatabase(dialect, lookup_results)
+
+    with patch("dictionarydb.api.settings.LOOKUP_BACKEND", backend):
+        with patch(
+            "dictionarydb.api.load_lookup_index",
+            return_value=LookupIndexBuilder().build(),
+        ):
+            with patch("dictionarydb.api.Database", return_value=database_mock):
+                with TestClient(app) as client:
+                    response = client.get(
+                        "/lookup", params={**LOOKUP_PARAMS, "mode": "fuzzy"}
+                    )
+
+    assert response.status_code == 400
+
+
+def test_lookup_fulltext():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results)
+    database_mock.fetch_all_result = Mock(return_value=lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            response = client.get(
+                "/lookup",
+                params={
+                    **LOOKUP_PARAMS,
+                    "search_string": "aufs Gerat",
+                    "mode": "fulltext",
+                },
+            )
+
+    assert json.loads(response.text) == {"results": lookup_results}
+    query, values = database_mock.fetch_all_result.call_args[0]
+    assert "word_fts match :search_key" in query
+    assert values["search_key"] == '"aufs" "gerat"*'
+
+
+def test_lookup_fulltext_without_index():
+    # The mock database answers the query for the full-text table with 0
+    database_mock = AsyncMockDatabase("sqlite", lookup_results, generation=0)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            response = client.get(
+                "/lookup", params={**LOOKUP_PARAMS, "mode": "fulltext"}
+            )
+
+    assert response.status_code == 400
+    assert "full-text index" in response.json()["detail"]
+
+
+def test_lookup_fulltext_index_created_later():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results, generation=1)
+    database_mock.num_fulltext_tables = 0
+    params = {**LOOKUP_PARAMS, "mode": "fulltext"}
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            api.cache.generation_check_interval = 0
+            assert client.get("/lookup", params=params).status_code == 400
+            # Creating the full-text index increments the generation
+            database_mock.num_fulltext_tables = 1
+            database_mock.generation = 2
+            assert client.get("/lookup", params=params).status_code == 200
+
+
+@pytest.mark.parametrize("mode", ["prefix", "fulltext"])
+def test_lookup_domain(mode):
+    database_mock = AsyncMockDatabase("sqlite", lookup_results, generation=1)
+    database_mock.fetch_all_result = Mock(return_value=lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            response = client.get(
+                "/lookup", params={**LOOKUP_PARAMS, "mode": mode, "domain": "biol."}
+            )
+
+    assert json.loads(response.text) == {"results": lookup_results}
+    query, values = database_mock.fetch_all_result.call_args[0]
+    assert "word_domain.word_id = lookup_entry.word_id" in query
+    assert "word_domain.domain = :domain" in query
+    assert values["domain"] == "biol."
+
+
+def test_lookup_domain_cache():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            client.get("/lookup", params=LOOKUP_PARAMS)
+            client.get("/lookup", params={**LOOKUP_PARAMS, "domain": "biol."})
+            client.get("/lookup", params={**LOOKUP_PARAMS, "domain": "biol."})
+
+    # The results with and without the domain filter are cached separately
+    assert database_mock.num_queries == 2
+
+
+@patch("dictionarydb.api.settings.LOOKUP_BACKEND", "memory")
+def test_lookup_domain_memory_backend():
+    with patch(
+        "dictionarydb.api.load_lookup_index", return_value=LookupIndexBuilder().build()
+    ):
+        with TestClient(app) as client:
+            response = client.get(
+                "/lookup", params={**LOOKUP_PARAMS, "domain": "biol."}
+            )
+
+    assert response.status_code == 400
+    assert "domain filters require a database" in response.json()["detail"]
+
+
+def test_lookup_invalid_mode():
+    with TestClient(app) as client:
+        response = client.get("/lookup", params={**LOOKUP_PARAMS, "mode": "exact"})
+        assert response.status_code == 422
+
+
+@patch("dictionarydb.api.settings.API_DATABASE_ACQUIRE_TIMEOUT", 0.01)
+def test_lookup_timeout():
+    database_mock = AsyncMockDatabase("sqlite", lookup_results, acquire_delay=1)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            response = client.get("/lookup", params=LOOKUP_PARAMS)
+
+    assert response.status_code == 503
+
+
+@patch("dictionarydb.api.settings.LOOKUP_BACKEND", "memory")
+def test_lookup_memory_backend(caplog):
+    caplog.set_level(logging.INFO)
+    builder = LookupIndexBuilder()
+    builder.add("deu", "eng", "test", "Test {m}", "test")
+
+    with patch("dictionarydb.api.load_lookup_index", return_value=builder.build()):
+        with patch("dictionarydb.api.Database") as database_cls:
+            with TestClient(app) as client:
+                response = client.get("/lookup", params=LOOKUP_PARAMS)
+
+    assert json.loads(response.text) == {"results": lookup_results}
+    assert not database_cls.called
+    assert "Loaded 1 lookup entries into memory" in caplog.text
+
+
+@patch("dictionarydb.api.settings.LOOKUP_BACKEND", "file")
+def test_lookup_file_backend(tmpdir, caplog):
+    caplog.set_level(logging.INFO)
+    path = str(tmpdir.join("dictionary.lookup"))
+    write_compiled_file(build_lookup_index([("Test {m}", "test")], "deu", "eng"), path)
+
+    with patch("dictionarydb.api.settings.LOOKUP_FILE", path):
+        with patch("dictionarydb.api.Database") as database_cls:
+            with TestClient(app) as client:
+                response = client.get("/lookup", params=LOOKUP_PARAMS)
+
+    assert json.loads(response.text) == {"results": lookup_results}
+    assert not database_cls.called
+    assert "Mapped 2 lookup entries from file" in caplog.text
+
+
+@patch("dictionarydb.api.settings.LOOKUP_BACKEND", "unknown")
+def test_unknown_lookup_backend():
+    with pytest.raises(ValueError, match="unknown lookup backend"):
+        with TestClient(app):
+            pass
+
+
+def get_batch_index():
+    builder = LookupIndexBuilder()
+    builder.add_translation("deu", "eng", "Test {m}", "test")
+    builder.add_translation("deu", "eng", "Tester {m}", "tester")
+    builder.add_translation("deu", "eng", "Wort {n}", "word")
+    return builder.build()
+
+
+BATCH_PARAMS = {
+    "source_language": "deu",
+    "target_language": "eng",
+    "search_strings": ["Test", "wort", "nichts", "TEST"],
+}
+
+
+@patch("dictionarydb.api.settings.LOOKUP_BACKEND", "memory")
+def test_batch_lookup():
+    with patch("dictionarydb.api.load_lookup_index", return_value=get_batch_index()):
+        with TestClient(app) as client:
+            response = client.post("/lookup/batch", json=BATCH_PARAMS)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert not data["truncated"]
+    assert [group["search_string"] for group in data["results"]] == [
+        "Test",
+        "wort",
+        "nichts",
+        "TEST",
+    ]
+    words = [[r["word"] for r in group["results"]] for group in data["results"]]
+    assert words == [["Test {m}", "Tester {m}"], ["Wort {n}"], [], words[0]]
+
+
+@patch("dictionarydb.api.settings.LOOKUP_BACKEND", "memory")
+@patch("dictionarydb.api.settings.API_BATCH_MAX_RESULTS", 3)
+def test_batch_lookup_truncated():
+    with patch("dictionarydb.api.load_lookup_index", return_value=get_batch_index()):
+        with TestClient(app) as client:
+            response = client.post("/lookup/batch", json=BATCH_PARAMS)
+
+    data = response.json()
+    assert data["truncated"]
+    num_results = [len(group["results"]) for group in data["results"]]
+    assert num_results == [2, 1, 0, 0]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {**BATCH_PARAMS, "search_strings": []},
+        {**BATCH_PARAMS, "search_strings": ["x"]},
+        {**BATCH_PARAMS, "search_strings": ["test"] * 101},
+        {**BATCH_PARAMS, "source_language": "de"},
+    ],
+)
+def test_batch_lookup_invalid_params(params):
+    with TestClient(app) as client:
+        response = client.post("/lookup/batch", json=params)
+        assert response.status_code == 422
+
+
+def get_batch_rows(query, values):
+    if "position" not in query:
+        return lookup_results
+    # One row for each search key of the batch, numbered like in the query
+    num_search_keys = len(json.loads(values["search_keys"]))
+    return [
+        {"position": position, **lookup_results[0]}
+        for position in range(num_search_keys)
+    ]
+
+
+def test_batch_lookup_database():
+    database_mock = AsyncMockDatabase("sqlite", get_batch_rows)
+
+    with patch("dictionarydb.api.Database", return_value=database_mock):
+        with TestClient(app) as client:
+            client.get("/lookup", params=LOOKUP_PARAMS)
+            response = client.post("/lookup/batch", json=BATCH_PARAMS)
+
+    data = response.json()
+    assert [group["results"] for group in data["results"]] == [lookup_results] * 4
+    # The cached result of "test" is reused, "wort" and "nichts" are fetched at once
+    assert database_mock.num_queries == 2
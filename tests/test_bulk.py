@@ -0,0 +1,91 @@
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine
+
+from dictionarydb.bulk import (
+    CopyStream,
+    format_copy_row,
+    get_insert_statement,
+    insert_rows,
+)
+
+
+def test_format_copy_row():
+    row = ("1", "tab\there", "new\nline", "back\\slash", None, 42)
+    assert format_copy_row(row) == "1\ttab\\there\tnew\\nline\tback\\\\slash\t\\N\t42\n"
+
+
+def test_copy_stream():
+    rows = [("1", "Wörterbuch"), ("2", "dictionary")]
+    stream = CopyStream(iter(rows))
+
+    chunks = []
+    while True:
+        chunk = stream.read(5)
+        if not chunk:
+            break
+        assert len(chunk) <= 5
+        chunks.append(chunk)
+
+    assert "".join(chunks) == "1\tWörterbuch\n2\tdictionary\n"
+
+
+def test_copy_stream_reads_no_more_rows_than_needed():
+    rows = iter([("1", "a"), ("2", "b"), ("3", "c")])
+    stream = CopyStream(rows)
+
+    assert stream.read(2) == "1\t"
+    assert stream.read(2) == "a\n"
+    # The leftover data was consumed, but the remaining rows were not formatted yet
+    assert next(rows) == ("2", "b")
+    assert stream.read() == "3\tc\n"
+
+
+def test_copy_stream_read_all():
+    stream = CopyStream([("1", "a"), ("2", "b")])
+    assert stream.read() == "1\ta\n2\tb\n"
+    assert stream.read() == ""
+
+
+@pytest.mark.parametrize(
+    "paramstyle,placeholders",
+    [
+        ("qmark", "?, ?"),
+        ("format", "%s, %s"),
+        ("pyformat", "%s, %s"),
+        ("numeric", ":1, :2"),
+    ],
+)
+def test_get_insert_statement(paramstyle, placeholders):
+    statement = get_insert_statement("word", ("id", "text"), paramstyle)
+    assert statement == f"insert into word (id, text) values ({placeholders})"
+
+
+def test_get_insert_statement_unsupported_paramstyle():
+    with pytest.raises(ValueError, match="unsupported DBAPI parameter style"):
+        get_insert_statement("word", ("id", "text"), "named")
+
+
+def test_insert_rows_sqlite():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute("create table word (id text, text text)")
+        insert_rows(connection, "word", ("id", "text"), iter([("1", "a"), ("2", "b")]))
+        rows = connection.execute("select id, text from word order by id").fetchall()
+
+    assert [tuple(row) for row in rows] == [("1", "a"), ("2", "b")]
+
+
+def test_insert_rows_postgresql():
+    cursor = Mock()
+    connection = Mock()
+    connection.dialect.name = "postgresql"
+    connection.connection.cursor.return_value = cursor
+
+    insert_rows(connection, "word", ("id", "text"), [("1", "a")])
+
+    statement, stream, _ = cursor.copy_expert.call_args[0]
+    assert statement == "copy word (id, text) from stdin"
+    assert stream.read() == "1\ta\n"
+    assert cursor.close.called
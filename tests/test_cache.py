@@ -0,0 +1,66 @@
+from dictionarydb.cache import LookupCache
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lookup_cache_hit_and_miss():
+    cache = LookupCache(max_size=10, ttl=60)
+
+    assert cache.get("a") is None
+    cache.put("a", [1])
+
+    assert cache.get("a") == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lookup_cache_evicts_least_recently_used():
+    cache = LookupCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_lookup_cache_expires_entries():
+    clock = Clock()
+    cache = LookupCache(max_size=10, ttl=60, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 59.9
+    assert cache.get("a") == 1
+    clock.now = 60.0
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_lookup_cache_generation():
+    clock = Clock()
+    cache = LookupCache(max_size=10, ttl=60, generation_check_interval=1, clock=clock)
+    assert cache.should_check_generation()
+    cache.set_generation(1)
+    cache.put("a", 1)
+
+    assert not cache.should_check_generation()
+    clock.now = 1.0
+    assert cache.should_check_generation()
+    cache.set_generation(1)
+    assert cache.get("a") == 1
+    cache.set_generation(2)
+    assert cache.get("a") is None
+    assert cache.invalidations == 1
+
+
+def test_lookup_cache_disabled():
+    assert not LookupCache(max_size=0, ttl=60).enabled
@@ -0,0 +1,80 @@
+import pytest
+
+from dictionarydb.compiled import CompiledFile, write_compiled_file
+from dictionarydb.index import build_lookup_index
+from dictionarydb.query import get_lookup_values
+
+ENTRIES = [
+    ("Wörterbuch {n}", "dictionary"),
+    ("Wort {n}", "word"),
+    ("Wort {n}", "term"),
+    ("Straße {f}", "street"),
+]
+
+
+@pytest.fixture
+def lookup_index():
+    return build_lookup_index(ENTRIES, "deu", "eng")
+
+
+@pytest.fixture
+def compiled_file(tmpdir, lookup_index):
+    path = str(tmpdir.join("dictionary.lookup"))
+    write_compiled_file(lookup_index, path)
+    compiled_file = CompiledFile(path)
+    yield compiled_file
+    compiled_file.close()
+
+
+@pytest.mark.parametrize(
+    "source_language,target_language,search_string",
+    [
+        ("deu", "eng", "wo"),
+        ("deu", "eng", "STRASSE"),
+        ("eng", "deu", "d"),
+        ("eng", "deu", "x"),
+        ("fra", "deu", "wo"),
+    ],
+)
+def test_compiled_file_lookup(
+    lookup_index, compiled_file, source_language, target_language, search_string
+):
+    values = get_lookup_values(source_language, target_language, search_string, 20)
+
+    assert compiled_file.index.lookup(**values) == lookup_index.lookup(**values)
+
+
+def test_compiled_file_size(lookup_index, compiled_file):
+    assert len(compiled_file.index) == len(lookup_index) == 8
+    assert compiled_file.index.pairs == lookup_index.pairs
+    assert compiled_file.size > lookup_index.nbytes
+
+
+def test_compiled_file_replaces_existing_file(tmpdir, lookup_index, compiled_file):
+    write_compiled_file(
+        build_lookup_index(ENTRIES[:1], "deu", "eng"), compiled_file.path
+    )
+
+    # The file that is already mapped can still be used
+    assert len(compiled_file.index) == 8
+    new_compiled_file = CompiledFile(compiled_file.path)
+    assert len(new_compiled_file.index) == 2
+    new_compiled_file.close()
+    assert [path.basename for path in tmpdir.listdir()] == ["dictionary.lookup"]
+
+
+def test_compiled_file_invalid(tmpdir):
+    path = tmpdir.join("invalid.lookup")
+    path.write_binary(b"not a compiled dictionary file at all, really not")
+
+    with pytest.raises(ValueError, match="is not a compiled dictionary file"):
+        CompiledFile(str(path))
+
+
+def test_compiled_file_truncated(tmpdir, compiled_file):
+    path = tmpdir.join("truncated.lookup")
+    with open(compiled_file.path, "rb") as file:
+        path.write_binary(file.read()[:-1])
+
+    with pytest.raises(ValueError, match="truncated or corrupt"):
+        CompiledFile(str(path))
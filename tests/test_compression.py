@@ -0,0 +1,142 @@
+import bz2
+import gzip
+import io
+import lzma
+from unittest.mock import patch
+
+import pytest
+
+from dictionarydb.compression import (
+    decompress,
+    detect_compression,
+    detect_file_compression,
+    open_input,
+)
+
+TEXT = "Wörterbuch :: dictionary\nEtage {f}; Stock {m} :: floor /fl./\n" * 1000
+
+COMPRESSORS = {
+    None: lambda data: data,
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+
+
+@pytest.mark.parametrize(
+    "header, compression",
+    [
+        (b"\x1f\x8b\x08\x00", "gzip"),
+        (b"BZh91AY", "bz2"),
+        (b"\xfd7zXZ\x00\x00", "xz"),
+        (b"\x28\xb5\x2f\xfd\x04", "zstd"),
+        (b"W\xc3\xb6rterbuch", None),
+        (b"", None),
+    ],
+)
+def test_detect_compression(header, compression):
+    assert detect_compression(header) == compression
+
+
+@pytest.mark.parametrize("compression", COMPRESSORS)
+def test_open_input(tmpdir, compression):
+    path = tmpdir.join("input")
+    path.write_binary(COMPRESSORS[compression](TEXT.encode("utf-8")))
+
+    assert detect_file_compression(str(path)) == compression
+    with open_input(str(path), buffer_size=1024) as file:
+        assert file.read() == TEXT
+
+
+@pytest.mark.parametrize("compression", COMPRESSORS)
+def test_open_input_stdin(compression):
+    # Standard input cannot be rewound after reading the magic number
+    stdin = io.TextIOWrapper(
+        io.BufferedReader(io.BytesIO(COMPRESSORS[compression](TEXT.encode("utf-8"))))
+    )
+    with patch("sys.stdin", stdin):
+        with open_input("-") as file:
+            assert list(file) == TEXT.splitlines(keepends=True)
+
+    assert not stdin.closed
+
+
+def test_decompress_without_peek():
+    binary_file, compression = decompress(io.BytesIO(gzip.compress(b"text")))
+
+    assert compression == "gzip"
+    assert binary_file.read() == b"text"
+
+
+class Pipe(io.RawIOBase):
+    """A pipe which returns one byte per read."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.data or not len(buffer):
+            return 0
+        buffer[0] = self.data[0]
+        self.data = self.data[1:]
+        return 1
+
+
+@pytest.mark.parametrize("compression", COMPRESSORS)
+def test_decompress_short_reads(compression):
+    data = TEXT.encode("utf-8")
+    pipe = io.BufferedReader(Pipe(COMPRESSORS[compression](data)))
+
+    binary_file, detected_compression = decompress(pipe)
+
+    assert detected_compression == compression
+    assert binary_file.read() == data
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+def test_decompress_close(compression):
+    source = io.BufferedReader(io.BytesIO(COMPRESSORS[compression](b"text")))
+    binary_file, _ = decompress(source)
+
+    binary_file.close()
+
+    assert binary_file.raw.closed
+    assert not source.closed
+
+
+def test_open_input_closes_decompressor(tmpdir):
+    path = tmpdir.join("input.gz")
+    path.write_binary(gzip.compress(TEXT.encode("utf-8")))
+    decompressors = []
+
+    def open_gzip(file, buffer_size):
+        decompressors.append(gzip.GzipFile(fileobj=file, mode="rb"))
+        return decompressors[-1]
+
+    with patch.dict("dictionarydb.compression.DECOMPRESSORS", {"gzip": open_gzip}):
+        with open_input(str(path)) as file:
+            assert file.read() == TEXT
+
+    assert decompressors[0].closed
+
+
+def test_open_input_zstd(tmpdir):
+    zstandard = pytest.importorskip("zstandard")
+    path = tmpdir.join("input.zst")
+    path.write_binary(zstandard.ZstdCompressor().compress(TEXT.encode("utf-8")))
+
+    with open_input(str(path)) as file:
+        assert file.read() == TEXT
+
+
+@patch("dictionarydb.compression.zstandard", None)
+def test_open_input_zstd_missing(tmpdir):
+    path = tmpdir.join("input.zst")
+    path.write_binary(b"\x28\xb5\x2f\xfd\x04\x00")
+
+    with pytest.raises(ValueError, match='requires the "zstandard" package'):
+        with open_input(str(path)):
+            pass
@@ -1,3 +1,7 @@
+import importlib
+
+import pytest
+
 from dictionarydb.config import settings
 
 
@@ -5,7 +9,69 @@ def test_settings():
     assert settings.LOG_LEVEL == "INFO"
     assert settings.LOG_COLORS is True
     assert settings.DATABASE_URL.startswith("sqlite:///")
+    assert settings.DATABASE_KEY_TYPE == "uuid"
+    assert settings.DATABASE_FULLTEXT_INDEX is False
     assert settings.IMPORT_CHUNK_SIZE == 10_000
+    assert settings.IMPORT_QUEUE_DEPTH == 2
+    assert settings.IMPORT_PARSE_WORKERS == 1
+    assert settings.IMPORT_READ_BUFFER_SIZE == 1024 * 1024
+    assert settings.IMPORT_LOADER == "core"
+    assert settings.IMPORT_PROGRESS_INTERVAL == 10
+    assert settings.IMPORT_SPLIT_SYNONYMS is False
+    assert settings.EXPORT_FETCH_SIZE == 1000
     assert settings.API_HOST == "localhost"
     assert settings.API_PORT == 8080
     assert settings.API_TRUST_PROXY_IPS == "127.0.0.1"
+    assert settings.API_CACHE_SIZE == 10_000
+    assert settings.API_CACHE_TTL == 300
+    assert settings.API_BATCH_MAX_SIZE == 100
+    assert settings.API_BATCH_MAX_RESULTS == 1000
+    assert settings.API_DATABASE_POOL_MIN_SIZE == 10
+    assert settings.API_DATABASE_POOL_MAX_SIZE == 10
+    assert settings.API_DATABASE_ACQUIRE_TIMEOUT == 10
+    assert settings.API_DATABASE_REPLICA_URLS == []
+    assert settings.API_DATABASE_REPLICA_RETRY_INTERVAL == 30
+    assert settings.API_FUZZY_THRESHOLD == 0.3
+    assert settings.LOOKUP_BACKEND == "database"
+
+
+@pytest.fixture
+def reload_settings(monkeypatch):
+    """Reload the settings with environment variables, restoring them afterwards."""
+
+    def reload(**environ):
+        for name, value in environ.items():
+            monkeypatch.setenv(name, value)
+        importlib.reload(settings)
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(settings)
+
+
+def test_settings_from_environment(reload_settings):
+    reload_settings(
+        DICTIONARYDB_LOG_COLORS="false",
+        DICTIONARYDB_DATABASE_FULLTEXT_INDEX="true",
+        DICTIONARYDB_IMPORT_CHUNK_SIZE="500",
+        DICTIONARYDB_IMPORT_QUEUE_DEPTH="0",
+        DICTIONARYDB_IMPORT_PARSE_WORKERS="4",
+        DICTIONARYDB_IMPORT_READ_BUFFER_SIZE="65536",
+        DICTIONARYDB_IMPORT_DEDUPE_INDEX_SIZE="1000",
+        DICTIONARYDB_IMPORT_DEDUPE_SPILL="yes",
+        DICTIONARYDB_IMPORT_PROGRESS_INTERVAL="5",
+        DICTIONARYDB_IMPORT_SPLIT_SYNONYMS="false",
+        DICTIONARYDB_EXPORT_FETCH_SIZE="50",
+    )
+
+    assert settings.LOG_COLORS is False
+    assert settings.DATABASE_FULLTEXT_INDEX is True
+    assert settings.IMPORT_CHUNK_SIZE == 500
+    assert settings.IMPORT_QUEUE_DEPTH == 0
+    assert settings.IMPORT_PARSE_WORKERS == 4
+    assert settings.IMPORT_READ_BUFFER_SIZE == 65536
+    assert settings.IMPORT_DEDUPE_INDEX_SIZE == 1000
+    assert settings.IMPORT_DEDUPE_SPILL is True
+    assert settings.IMPORT_PROGRESS_INTERVAL == 5
+    assert settings.IMPORT_SPLIT_SYNONYMS is False
+    assert settings.EXPORT_FETCH_SIZE == 50
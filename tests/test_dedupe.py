@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from dictionarydb.dedupe import BoundedIndex, SpillFile
+
+
+def test_spill_file():
+    spill_file = SpillFile()
+    spill_file.put_many([("a", 1), ((1, 2), True)])
+
+    assert spill_file.get("a") == 1
+    assert spill_file.get((1, 2)) == 1
+    assert spill_file.get("b") is None
+
+    spill_file.close()
+    assert not os.path.exists(spill_file.path)
+
+
+def test_bounded_index():
+    index = BoundedIndex(max_size=10)
+    index.add("a", 1)
+
+    assert index.get("a") == 1
+    assert index.get("b") is None
+    assert index.complete
+
+
+def test_bounded_index_evicts_least_recently_used():
+    index = BoundedIndex(max_size=2)
+    index.add("a", 1)
+    index.add("b", 2)
+    index.get("a")
+    index.add("c", 3)
+
+    assert index.get("a") == 1
+    assert index.get("b") is None
+    assert index.get("c") == 3
+    assert not index.complete
+
+
+@pytest.mark.parametrize("max_size", [1, 10])
+def test_bounded_index_spills_to_disk(max_size):
+    index = BoundedIndex(max_size=max_size, spill=True)
+    for value in range(100):
+        index.add(f"key{value}", value)
+
+    assert len(index.entries) <= max_size
+    assert all(index.get(f"key{value}") == value for value in range(100))
+    assert index.complete
+    index.close()
@@ -0,0 +1,87 @@
+import pytest
+
+from dictionarydb.explain import (
+    analyze_plan,
+    explain_lookup,
+    find_problems,
+    get_plan_lines,
+    resolve_table_name,
+)
+from dictionarydb.importer import import_entries
+from dictionarydb.models import prepare_engine, setup_database
+from dictionarydb.parser import load_entries
+
+
+@pytest.fixture
+def engine(tmpdir, test_file_contents):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url)
+    engine = prepare_engine(database_url)
+    entries = load_entries(test_file_contents.splitlines())
+    import_entries(engine, entries, "deu", "eng")
+    return engine
+
+
+def test_find_problems_sqlite():
+    lines = [
+        "SCAN word",
+        "SEARCH lookup_entry USING INDEX "
+        "ix_lookup_entry_source_code_target_code_search_key (source_code=?)",
+        "SCAN word_fts VIRTUAL TABLE INDEX 0:M1",
+        "USE TEMP B-TREE FOR ORDER BY",
+    ]
+
+    assert find_problems("sqlite", lines) == (
+        ["word"],
+        ["sorts in a temporary b-tree (ORDER BY)"],
+    )
+
+
+def test_find_problems_postgresql():
+    lines = [
+        "Limit  (cost=0.42..8.44 rows=1 width=64)",
+        "  ->  Seq Scan on word domain_word  (cost=0.00..1.05 rows=1 width=32)",
+        "  ->  Index Scan using ix_lookup_entry_source_code_target_code_search_key on "
+        "lookup_entry",
+        "        Sort Method: external merge  Disk: 1024kB",
+    ]
+
+    assert find_problems("postgresql", lines) == (
+        ["word"],
+        ["sort spills to disk (external merge)"],
+    )
+
+
+def test_resolve_table_name():
+    query = "select * from word as domain_word join word_domain on true"
+
+    assert resolve_table_name(query, "domain_word") == "word"
+    assert resolve_table_name(query, "word_domain") == "word_domain"
+
+
+@pytest.mark.parametrize("domain", [None, "biol."])
+def test_explain_lookup(engine, domain):
+    with engine.connect() as connection:
+        plan = explain_lookup(connection, "deu", "eng", "Chiasma", 20, domain=domain)
+
+    assert plan.lines[0].startswith("SEARCH lookup_entry")
+    assert plan.full_scans == []
+    assert plan.unused_indexes == {}
+
+
+def test_explain_lookup_unsupported_mode(engine):
+    with engine.connect() as connection:
+        with pytest.raises(ValueError, match="require a PostgreSQL database"):
+            explain_lookup(connection, "deu", "eng", "Chiasma", 20, mode="fuzzy")
+        with pytest.raises(ValueError, match="require the full-text index"):
+            explain_lookup(connection, "deu", "eng", "Chiasma", 20, mode="fulltext")
+
+
+def test_analyze_plan_full_scan(engine):
+    query = "select * from word as unindexed where unindexed.headword = :headword"
+    with engine.connect() as connection:
+        lines = get_plan_lines(connection, query, {"headword": "Chiasma"})
+        full_scans, unused_indexes, _ = analyze_plan(connection, query, lines)
+
+    assert full_scans == ["word"]
+    assert "ix_word_search_key" in unused_indexes["word"]
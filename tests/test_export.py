@@ -0,0 +1,112 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from dictionarydb.export import (
+    format_ding_entry,
+    format_tsv_entry,
+    get_compression,
+    iter_entries,
+    open_output,
+    write_entries,
+)
+from dictionarydb.importer import import_entries
+from dictionarydb.models import prepare_engine, setup_database
+from dictionarydb.parser import parse_lines
+
+TEST_ENTRIES = [
+    ("Wörterbuch", "dictionary"),
+    ("Etage {f}; Stock {m}; Stockwerk {n}", "floor /fl./"),
+    ("Chiasma {n} [biol.]", "chiasma; chiasm"),
+    ("Chiasmata {pl}", "chiasmata"),
+]
+
+
+@pytest.fixture
+def sqlite_engine(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type="integer")
+    engine = prepare_engine(database_url)
+    import_entries(engine, (entry for entry in TEST_ENTRIES), "deu", "eng")
+    return engine
+
+
+@pytest.mark.parametrize("fetch_size", [1, 3, 1000])
+def test_iter_entries(sqlite_engine, fetch_size):
+    entries = iter_entries(sqlite_engine, "deu", "eng", fetch_size)
+    assert sorted(entries) == sorted(TEST_ENTRIES)
+
+
+def test_iter_entries_order(sqlite_engine):
+    # The entries are not sorted by text, but streamed in the order of their keys
+    # (integer keys are handed out in the order of the imported entries)
+    assert list(iter_entries(sqlite_engine, "deu", "eng", 2)) == TEST_ENTRIES
+
+
+def test_iter_entries_reverse_direction(sqlite_engine):
+    entries = iter_entries(sqlite_engine, "eng", "deu", 1000)
+    assert sorted(entries) == sorted(
+        (target, source) for source, target in TEST_ENTRIES
+    )
+
+
+def test_iter_entries_unknown_language(sqlite_engine):
+    with pytest.raises(ValueError, match='language "fra" is not in the database'):
+        list(iter_entries(sqlite_engine, "deu", "fra", 1000))
+
+
+def test_write_entries_ding_round_trip():
+    file = io.StringIO()
+    num_written = write_entries(file, TEST_ENTRIES, "deu", "eng", "ding")
+
+    assert num_written == 4
+    file.seek(0)
+    assert list(parse_lines(file)) == TEST_ENTRIES
+
+
+def test_write_entries_ding_invalid_entry(caplog):
+    file = io.StringIO()
+    entries = [("a | b", "c"), ("Wörterbuch", "dictionary")]
+    num_written = write_entries(file, entries, "deu", "eng", "ding")
+
+    assert num_written == 1
+    assert "cannot be written in the Ding format" in caplog.text
+
+
+def test_write_entries_jsonl():
+    file = io.StringIO()
+    write_entries(file, TEST_ENTRIES[:1], "deu", "eng", "jsonl")
+
+    assert json.loads(file.getvalue()) == {
+        "word": "Wörterbuch",
+        "language": "deu",
+        "translation": "dictionary",
+        "translation_language": "eng",
+    }
+
+
+def test_format_tsv_entry():
+    assert format_tsv_entry("a\tb", "c\\d\n", "deu", "eng") == "a\\tb\tc\\\\d\\n\n"
+
+
+def test_format_ding_entry():
+    assert format_ding_entry("Test {m}", "test", "deu", "eng") == "Test {m} :: test\n"
+
+
+@pytest.mark.parametrize(
+    "path, compression",
+    [("dump.txt", None), ("dump.txt.gz", "gzip"), ("a.bz2", "bz2"), ("a.xz", "xz")],
+)
+def test_get_compression(path, compression):
+    assert get_compression(path) == compression
+
+
+def test_open_output_compressed(tmpdir):
+    path = str(tmpdir.join("dump.txt.gz"))
+    with open_output(path, "gzip") as file:
+        file.write("Wörterbuch :: dictionary\n")
+
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        assert file.read() == "Wörterbuch :: dictionary\n"
@@ -3,8 +3,22 @@ from contextlib import contextmanager
 from unittest.mock import Mock, patch
 
 import pytest
+from sqlalchemy import inspect
 
-from dictionarydb.importer import import_entries
+from dictionarydb.dedupe import BoundedIndex
+from dictionarydb.importer import (
+    EntryRowBuilder,
+    KeyAllocator,
+    get_fingerprint,
+    import_entries,
+)
+from dictionarydb.models import prepare_engine, setup_database
+from dictionarydb.query import (
+    get_batch_lookup_query,
+    get_batch_lookup_values,
+    get_lookup_query,
+    get_lookup_values,
+)
 
 
 class MockQuery(object):
@@ -31,6 +45,17 @@ class MockSession(object):
     def query(self, model_cls):
         return MockQuery()
 
+    def execute(self, statement, params=None):
+        return Mock(rowcount=0)
+
+    def commit(self):
+        pass
+
+    def connection(self):
+        connection = Mock()
+        connection.dialect.name = "mock"
+        return connection
+
 
 saved_objects = []
 
@@ -40,6 +65,10 @@ def mock_managed_session(engine):
     yield MockSession(saved_objects)
 
 
+def mock_check_key_type(connection, key_type=None):
+    return key_type or "uuid"
+
+
 TEST_ENTRIES = [
     # Single word
     ("Wörterbuch", "dictionary"),
@@ -58,6 +87,7 @@ target_language_code = "eng"
 
 
 @patch("dictionarydb.importer.managed_session", new=mock_managed_session)
+@patch("dictionarydb.importer.check_key_type", new=mock_check_key_type)
 def test_import_entries():
     num_added, _ = import_entries(
         engine,
@@ -70,10 +100,13 @@ def test_import_entries():
 
 
 @patch("dictionarydb.importer.managed_session", new=mock_managed_session)
-@patch("dictionarydb.importer.get_words_in_languages")
-def test_import_entries_deletes_existing(get_words_in_languages):
-    num_existing_words = 100
-    get_words_in_languages.return_value = Mock(count=lambda: num_existing_words)
+@patch("dictionarydb.importer.check_key_type", new=mock_check_key_type)
+@patch("dictionarydb.importer.get_translations_in_languages")
+def test_import_entries_deletes_existing(get_translations_in_languages):
+    num_existing_translations = 50
+    get_translations_in_languages.return_value = Mock(
+        count=lambda: num_existing_translations
+    )
 
     _, num_deleted = import_entries(
         engine,
@@ -82,10 +115,11 @@ def test_import_entries_deletes_existing(get_words_in_languages):
         target_language_code,
     )
 
-    assert num_deleted == num_existing_words / 2
+    assert num_deleted == num_existing_translations
 
 
 @patch("dictionarydb.importer.managed_session", new=mock_managed_session)
+@patch("dictionarydb.importer.check_key_type", new=mock_check_key_type)
 def test_import_entries_enforces_min_entries():
     with pytest.raises(EOFError, match=r"Not enough entries"):
         import_entries(
@@ -95,3 +129,744 @@ def test_import_entries_enforces_min_entries():
             target_language_code,
             min_entries=sys.maxsize,
         )
+
+
+@pytest.fixture(params=["integer", "uuid"])
+def key_type(request):
+    return request.param
+
+
+@pytest.fixture
+def sqlite_engine(tmpdir, key_type):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type=key_type)
+    return prepare_engine(database_url)
+
+
+@pytest.mark.parametrize("loader", ["core", "orm"])
+def test_import_entries_loaders(sqlite_engine, key_type, loader):
+    num_added, _ = import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        chunk_size=2,
+        loader=loader,
+        key_type=key_type,
+    )
+
+    assert num_added == 4
+    with sqlite_engine.connect() as connection:
+        words = connection.execute("select text from word order by text").fetchall()
+        num_translations = connection.execute(
+            "select count(*) from word_translates_to_word"
+        ).scalar()
+    assert len(words) == 8
+    assert ("Wörterbuch",) in [tuple(word) for word in words]
+    assert num_translations == 4
+
+
+def test_import_entries_unknown_loader():
+    with pytest.raises(ValueError, match="unknown loader"):
+        import_entries(
+            engine, [], source_language_code, target_language_code, loader="x"
+        )
+
+
+@pytest.mark.parametrize("key_type", ["integer"])
+def test_import_entries_integer_keys(sqlite_engine, key_type):
+    for _ in range(2):
+        import_entries(
+            sqlite_engine,
+            (entry for entry in TEST_ENTRIES),
+            source_language_code,
+            target_language_code,
+            key_type=key_type,
+        )
+
+    with sqlite_engine.connect() as connection:
+        word_ids = [row[0] for row in connection.execute("select id from word")]
+    assert all(isinstance(word_id, int) for word_id in word_ids)
+    assert len(set(word_ids)) == 8
+
+
+def test_import_entries_detects_key_type(sqlite_engine, key_type):
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+    )
+
+    with sqlite_engine.connect() as connection:
+        word_id = connection.execute("select id from word").scalar()
+    assert isinstance(word_id, int) == (key_type == "integer")
+
+
+@pytest.mark.parametrize("key_type", ["integer"])
+def test_import_entries_other_key_type(sqlite_engine, key_type):
+    with pytest.raises(ValueError, match='created with "integer" keys, not "uuid"'):
+        import_entries(
+            sqlite_engine,
+            (entry for entry in TEST_ENTRIES),
+            source_language_code,
+            target_language_code,
+            key_type="uuid",
+        )
+
+    with sqlite_engine.connect() as connection:
+        assert connection.execute("select count(*) from language").scalar() == 0
+
+
+def test_key_allocator():
+    reserved = []
+
+    def reserve(count):
+        reserved.append(count)
+        return 100 * len(reserved)
+
+    new_key = KeyAllocator(reserve, block_size=2)
+
+    assert [new_key() for _ in range(5)] == [100, 101, 200, 201, 300]
+    assert reserved == [2, 2, 2]
+
+
+DUPLICATE_ENTRIES = [
+    ("Stock {m}", "stick"),
+    ("Stock {m}", "floor"),
+    ("Etage {f}", "floor"),
+    # Duplicate entry
+    ("Stock {m}", "stick"),
+]
+
+
+@pytest.mark.parametrize("key_type", ["integer"])
+def test_import_entries_dedupes_words(sqlite_engine, key_type, caplog):
+    num_added, _ = import_entries(
+        sqlite_engine,
+        (entry for entry in DUPLICATE_ENTRIES),
+        source_language_code,
+        target_language_code,
+        loader="core",
+        key_type=key_type,
+    )
+
+    assert num_added == 3
+    with sqlite_engine.connect() as connection:
+        words = connection.execute("select text from word order by text").fetchall()
+    assert [word[0] for word in words] == ["Etage {f}", "Stock {m}", "floor", "stick"]
+    assert "Stored 4 distinct words for 8 word occurrences (dedupe ratio 2.00)" in (
+        caplog.text
+    )
+
+
+language1 = Mock(id=1)
+language2 = Mock(id=2)
+
+
+def get_texts(word_rows):
+    return [row[2] for row in word_rows]
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_entry_row_builder(spill):
+    row_builder = EntryRowBuilder(language1, language2, index_size=100, spill=spill)
+    word_rows, translation_rows, _, _ = row_builder.build_rows(DUPLICATE_ENTRIES)
+    row_builder.close()
+
+    assert get_texts(word_rows) == ["Stock {m}", "stick", "floor", "Etage {f}"]
+    assert len(translation_rows) == 3
+    assert row_builder.dedupe_ratio == 2
+
+
+def test_entry_row_builder_full_index():
+    row_builder = EntryRowBuilder(language1, language2, index_size=1)
+    word_rows, translation_rows, _, _ = row_builder.build_rows(DUPLICATE_ENTRIES)
+    row_builder.close()
+
+    # Forgotten words are stored again, but no translation is stored twice
+    assert get_texts(word_rows) == [
+        "Stock {m}",
+        "stick",
+        "floor",
+        "Etage {f}",
+        "Stock {m}",
+        "stick",
+    ]
+    assert len(set(translation_rows)) == len(translation_rows) == 4
+
+
+def test_entry_row_builder_full_index_with_spill():
+    row_builder = EntryRowBuilder(language1, language2, index_size=1, spill=True)
+    word_rows, translation_rows, _, _ = row_builder.build_rows(DUPLICATE_ENTRIES)
+    row_builder.close()
+
+    assert get_texts(word_rows) == ["Stock {m}", "stick", "floor", "Etage {f}"]
+    assert len(translation_rows) == 3
+
+
+def test_entry_row_builder_full_translation_index():
+    row_builder = EntryRowBuilder(language1, language2, index_size=100)
+    row_builder.translation_index = BoundedIndex(max_size=1)
+    entries = [("A", "x"), ("B", "y"), ("A", "x")]
+    word_rows, translation_rows, _, _ = row_builder.build_rows(entries)
+
+    # The translation A -> x may have been forgotten, so a new copy of A is stored
+    assert get_texts(word_rows) == ["A", "x", "B", "y", "A"]
+    assert len(set(translation_rows)) == len(translation_rows) == 3
+
+
+@pytest.mark.parametrize("key_type", ["integer"])
+def test_import_entries_queue_depth(sqlite_engine, key_type):
+    num_added, _ = import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        loader="core",
+        key_type=key_type,
+        queue_depth=2,
+    )
+
+    assert num_added == 4
+
+
+def count_words(engine):
+    with engine.connect() as connection:
+        return connection.execute("select count(*) from word").scalar()
+
+
+@pytest.mark.parametrize("key_type", ["integer"])
+def test_import_entries_queue_depth_rolls_back_on_parse_error(sqlite_engine, key_type):
+    def broken_entries():
+        yield from TEST_ENTRIES
+        raise ValueError("cannot parse")
+
+    with pytest.raises(ValueError, match="cannot parse"):
+        import_entries(
+            sqlite_engine,
+            broken_entries(),
+            source_language_code,
+            target_language_code,
+            chunk_size=1,
+            loader="core",
+            key_type=key_type,
+            queue_depth=2,
+        )
+
+    assert count_words(sqlite_engine) == 0
+
+
+@pytest.mark.parametrize("key_type", ["integer"])
+@patch("dictionarydb.importer.insert_rows", side_effect=IOError("cannot write"))
+def test_import_entries_queue_depth_rolls_back_on_write_error(
+    _, sqlite_engine, key_type
+):
+    with pytest.raises(IOError, match="cannot write"):
+        import_entries(
+            sqlite_engine,
+            (entry for entry in TEST_ENTRIES),
+            source_language_code,
+            target_language_code,
+            chunk_size=1,
+            loader="core",
+            key_type=key_type,
+            queue_depth=2,
+        )
+
+    assert count_words(sqlite_engine) == 0
+
+
+def get_stored_entries(engine):
+    with engine.connect() as connection:
+        rows = connection.execute(
+            """
+            select word1.text, word2.text, translation.fingerprint
+            from word_translates_to_word translation
+            join word word1 on word1.id = translation.word1_id
+            join word word2 on word2.id = translation.word2_id
+            """
+        ).fetchall()
+    return {(text1, text2): fingerprint for text1, text2, fingerprint in rows}
+
+
+@pytest.mark.parametrize("loader", ["core", "orm"])
+def test_import_entries_incremental(sqlite_engine, key_type, loader, caplog):
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+    )
+    new_entries = [
+        ("Wörterbuch", "dictionary"),
+        ("Chiasmata {pl}", "chiasmata"),
+        ("Chiasma {n} [biol.]", "chiasma"),
+        ("Wörterbuch", "lexicon"),
+    ]
+
+    num_added, num_deleted = import_entries(
+        sqlite_engine,
+        (entry for entry in new_entries),
+        source_language_code,
+        target_language_code,
+        loader=loader,
+        key_type=key_type,
+        incremental=True,
+    )
+
+    assert (num_added, num_deleted) == (2, 2)
+    assert "Added 2, removed 2 and left 2 entries unchanged." in caplog.text
+    stored_entries = get_stored_entries(sqlite_engine)
+    assert set(stored_entries) == set(new_entries)
+    assert all(
+        stored_entries[entry] == get_fingerprint(*entry) for entry in new_entries
+    )
+    # Words which are no longer used are removed; others are not stored twice
+    with sqlite_engine.connect() as connection:
+        words = [row[0] for row in connection.execute("select text from word")]
+    assert sorted(words) == sorted(
+        {"Wörterbuch", "dictionary", "Chiasmata {pl}", "chiasmata"}
+        | {"Chiasma {n} [biol.]", "chiasma", "lexicon"}
+    )
+
+
+def test_import_entries_incremental_into_empty_database(sqlite_engine, key_type):
+    num_added, num_deleted = import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+        incremental=True,
+    )
+
+    assert (num_added, num_deleted) == (4, 0)
+
+
+def test_import_entries_incremental_enforces_min_entries(sqlite_engine, key_type):
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+    )
+
+    with pytest.raises(EOFError, match="got only 1"):
+        import_entries(
+            sqlite_engine,
+            [("Wörterbuch", "dictionary")],
+            source_language_code,
+            target_language_code,
+            key_type=key_type,
+            incremental=True,
+            min_entries=2,
+        )
+    assert len(get_stored_entries(sqlite_engine)) == 4
+
+
+def test_get_fingerprint():
+    fingerprint = get_fingerprint("Wörterbuch", "dictionary")
+
+    assert -(1 << 63) <= fingerprint < 1 << 63
+    assert fingerprint == get_fingerprint("Wörterbuch", "dictionary")
+    assert fingerprint != get_fingerprint("dictionary", "Wörterbuch")
+    assert fingerprint != get_fingerprint("Wörterbuch", "dictionary", True)
+
+
+@pytest.mark.parametrize("split_synonyms", [False, True])
+def test_import_entries_incremental_other_split_synonyms(
+    sqlite_engine, key_type, split_synonyms
+):
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+        split_synonyms=split_synonyms,
+    )
+
+    setting = "with" if split_synonyms else "without"
+    with pytest.raises(ValueError, match=f"imported {setting} split synonyms"):
+        import_entries(
+            sqlite_engine,
+            (entry for entry in TEST_ENTRIES),
+            source_language_code,
+            target_language_code,
+            key_type=key_type,
+            incremental=True,
+            split_synonyms=not split_synonyms,
+        )
+    assert len(get_stored_entries(sqlite_engine)) == 4
+
+
+def get_table_names(engine):
+    return sorted(inspect(engine).get_table_names())
+
+
+def test_import_entries_shadow(sqlite_engine, key_type, caplog):
+    other_entries = [("dictionnaire", "dizionario")]
+    import_entries(sqlite_engine, other_entries, "fra", "ita", key_type=key_type)
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+    )
+    table_names = get_table_names(sqlite_engine)
+    new_entries = [("Wörterbuch", "dictionary"), ("Wörterbuch", "lexicon")]
+
+    for _ in range(2):
+        num_added, num_deleted = import_entries(
+            sqlite_engine,
+            (entry for entry in new_entries),
+            source_language_code,
+            target_language_code,
+            loader="core",
+            key_type=key_type,
+            shadow=True,
+        )
+
+    assert (num_added, num_deleted) == (2, 2)
+    assert "Swapping staging tables for live tables…" in caplog.text
+    assert set(get_stored_entries(sqlite_engine)) == set(new_entries + other_entries)
+    assert get_table_names(sqlite_engine) == table_names
+    index_names = [
+        index["name"] for index in inspect(sqlite_engine).get_indexes("word")
+    ]
+    assert len(index_names) == 1 and index_names[0].startswith("ix_word_search_key_")
+    with sqlite_engine.connect() as connection:
+        assert not connection.execute("pragma foreign_key_check").fetchall()
+
+
+def test_import_entries_shadow_enforces_min_entries(sqlite_engine, key_type):
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+    )
+    table_names = get_table_names(sqlite_engine)
+
+    with pytest.raises(EOFError, match="got only 1"):
+        import_entries(
+            sqlite_engine,
+            [("Wörterbuch", "dictionary")],
+            source_language_code,
+            target_language_code,
+            loader="core",
+            key_type=key_type,
+            shadow=True,
+            min_entries=2,
+        )
+    assert len(get_stored_entries(sqlite_engine)) == 4
+    assert get_table_names(sqlite_engine) == table_names
+
+
+@pytest.mark.parametrize(
+    "kwargs,message",
+    [
+        ({"loader": "core", "incremental": True}, "cannot be incremental"),
+        ({"loader": "orm"}, 'require the "core" loader'),
+    ],
+)
+def test_import_entries_shadow_invalid_options(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        import_entries(
+            engine,
+            [],
+            source_language_code,
+            target_language_code,
+            shadow=True,
+            **kwargs,
+        )
+
+
+def lookup(engine, source_language, target_language, search_string):
+    values = get_lookup_values(source_language, target_language, search_string, 20)
+    with engine.connect() as connection:
+        rows = connection.execute(get_lookup_query(), values).fetchall()
+    return sorted((row.word, row.translation) for row in rows)
+
+
+@pytest.mark.parametrize("mode", ["replace", "incremental", "shadow"])
+def test_import_entries_lookup_entries(sqlite_engine, key_type, mode):
+    import_entries(sqlite_engine, [("chat", "gatto")], "fra", "ita", key_type=key_type)
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+    )
+    new_entries = [("Wörterbuch", "dictionary"), ("Wörterbücher", "dictionaries")]
+
+    num_added, _ = import_entries(
+        sqlite_engine,
+        (entry for entry in new_entries),
+        source_language_code,
+        target_language_code,
+        loader="core",
+        key_type=key_type,
+        incremental=mode == "incremental",
+        shadow=mode == "shadow",
+    )
+
+    assert lookup(sqlite_engine, "deu", "eng", "Wört") == new_entries
+    assert lookup(sqlite_engine, "eng", "deu", "dict") == [
+        ("dictionaries", "Wörterbücher"),
+        ("dictionary", "Wörterbuch"),
+    ]
+    assert lookup(sqlite_engine, "deu", "eng", "Chiasma") == []
+    assert lookup(sqlite_engine, "fra", "ita", "ch") == [("chat", "gatto")]
+
+
+def domain_lookup(engine, source_language, target_language, search_string, domain):
+    values = get_lookup_values(
+        source_language, target_language, search_string, 20, domain=domain
+    )
+    with engine.connect() as connection:
+        rows = connection.execute(get_lookup_query(domain=True), values).fetchall()
+    return sorted((row.word, row.translation) for row in rows)
+
+
+@pytest.mark.parametrize("mode", ["replace", "incremental", "shadow"])
+def test_import_entries_word_domains(sqlite_engine, key_type, mode):
+    other_entries = [("chat {m} [zool.]", "gatto {m} [zool.]")]
+    import_entries(sqlite_engine, other_entries, "fra", "ita", key_type=key_type)
+    for _ in range(2):
+        import_entries(
+            sqlite_engine,
+            (entry for entry in TEST_ENTRIES),
+            source_language_code,
+            target_language_code,
+            loader="core",
+            key_type=key_type,
+            incremental=mode == "incremental",
+            shadow=mode == "shadow",
+        )
+
+    assert domain_lookup(sqlite_engine, "deu", "eng", "Chi", "biol.") == [
+        ("Chiasma {n} [biol.]", "chiasma; chiasm")
+    ]
+    assert domain_lookup(sqlite_engine, "eng", "deu", "chi", "biol.") == []
+    assert domain_lookup(sqlite_engine, "fra", "ita", "ch", "zool.") == other_entries
+    with sqlite_engine.connect() as connection:
+        words = connection.execute(
+            "select headword, grammar, abbreviation from word "
+            "where text = 'floor /fl./'"
+        ).fetchall()
+        num_domains = connection.execute("select count(*) from word_domain").scalar()
+    assert words == [("floor", None, "fl.")]
+    assert num_domains == 3
+
+
+def test_entry_row_builder_split_synonyms():
+    row_builder = EntryRowBuilder(language1, language2, split_synonyms=True)
+    entries = [("Stock {m}", "stick"), ("Etage {f}; Stock {m}; Etage {f}", "floor")]
+    rows = row_builder.build_rows(entries)
+
+    assert get_texts(rows.word_rows) == [
+        "Stock {m}",
+        "stick",
+        "Etage {f}; Stock {m}; Etage {f}",
+        "Etage {f}",
+        "floor",
+    ]
+    # The synonyms are linked to the group, which keeps the only translation
+    keys = {row[2]: row[0] for row in rows.word_rows}
+    assert rows.synonym_rows == [
+        (keys["Etage {f}; Stock {m}; Etage {f}"], keys["Etage {f}"]),
+        (keys["Etage {f}; Stock {m}; Etage {f}"], keys["Stock {m}"]),
+    ]
+    assert len(rows.translation_rows) == 2
+
+
+@pytest.mark.parametrize("mode", ["replace", "incremental", "shadow"])
+def test_import_entries_split_synonyms(sqlite_engine, key_type, mode):
+    import_entries(
+        sqlite_engine,
+        [("chat; minou", "gatto")],
+        "fra",
+        "ita",
+        key_type=key_type,
+        split_synonyms=True,
+    )
+    for entries in (TEST_ENTRIES, TEST_ENTRIES[:2]):
+        import_entries(
+            sqlite_engine,
+            (entry for entry in entries),
+            source_language_code,
+            target_language_code,
+            loader="core",
+            key_type=key_type,
+            incremental=mode == "incremental",
+            shadow=mode == "shadow",
+            split_synonyms=True,
+        )
+
+    assert lookup(sqlite_engine, "deu", "eng", "Stock") == [
+        ("Stock {m}", "floor /fl./"),
+        ("Stockwerk {n}", "floor /fl./"),
+    ]
+    assert lookup(sqlite_engine, "deu", "eng", "Etage") == [
+        ("Etage {f}", "floor /fl./")
+    ]
+    assert lookup(sqlite_engine, "eng", "deu", "floor") == [
+        ("floor /fl./", "Etage {f}; Stock {m}; Stockwerk {n}")
+    ]
+    assert lookup(sqlite_engine, "ita", "fra", "gatto") == [("gatto", "chat; minou")]
+    assert lookup(sqlite_engine, "fra", "ita", "min") == [("minou", "gatto")]
+    assert set(get_stored_entries(sqlite_engine)) == set(TEST_ENTRIES[:2]) | {
+        ("chat; minou", "gatto")
+    }
+    # The synonyms of entries which were removed are removed along with them
+    with sqlite_engine.connect() as connection:
+        num_synonyms = connection.execute("select count(*) from word_synonym").scalar()
+        num_words = connection.execute("select count(*) from word").scalar()
+    assert num_synonyms == 5
+    assert num_words == 11
+
+
+def test_batch_lookup_query(sqlite_engine, key_type):
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+    )
+    search_strings = ["Wört", "nichts", "Chiasma"]
+    values_list = [
+        get_lookup_values("deu", "eng", search_string, 1)
+        for search_string in search_strings
+    ]
+
+    with sqlite_engine.connect() as connection:
+        rows = connection.execute(
+            get_batch_lookup_query(),
+            get_batch_lookup_values(values_list),
+        ).fetchall()
+
+    words = sorted((row.position, row.word) for row in rows)
+    assert [position for position, _ in words] == [0, 2]
+    assert words[0][1].startswith("Wörterbuch")
+    assert words[1][1].startswith("Chiasma")
+
+
+def test_batch_lookup_query_many_search_keys(sqlite_engine, key_type):
+    import_entries(
+        sqlite_engine,
+        (entry for entry in TEST_ENTRIES),
+        source_language_code,
+        target_language_code,
+        key_type=key_type,
+    )
+    # More search keys than SQLite allows terms in a compound select (500)
+    search_strings = [f"nichts{i}" for i in range(599)] + ["Etage"]
+    values_list = [
+        get_lookup_values("deu", "eng", search_string, 2)
+        for search_string in search_strings
+    ]
+
+    with sqlite_engine.connect() as connection:
+        rows = connection.execute(
+            get_batch_lookup_query(), get_batch_lookup_values(values_list)
+        ).fetchall()
+
+    assert [(row.position, row.word) for row in rows] == [
+        (599, "Etage {f}; Stock {m}; Stockwerk {n}")
+    ]
+
+
+def fulltext_lookup(engine, source_language, target_language, search_string):
+    values = get_lookup_values(
+        source_language, target_language, search_string, 20, mode="fulltext"
+    )
+    with engine.connect() as connection:
+        rows = connection.execute(
+            get_lookup_query("sqlite", mode="fulltext"), values
+        ).fetchall()
+    return [(row.word, row.translation) for row in rows]
+
+
+@pytest.mark.parametrize("mode", ["replace", "incremental", "shadow"])
+def test_import_entries_fulltext_index(tmpdir, key_type, mode):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type=key_type, fulltext=True)
+    engine = prepare_engine(database_url)
+    for entries in (TEST_ENTRIES, TEST_ENTRIES + [("aufs Geratewohl", "at random")]):
+        import_entries(
+            engine,
+            (entry for entry in entries),
+            source_language_code,
+            target_language_code,
+            loader="core",
+            key_type=key_type,
+            incremental=mode == "incremental",
+            shadow=mode == "shadow",
+        )
+
+    assert fulltext_lookup(engine, "deu", "eng", "gerat") == [
+        ("aufs Geratewohl", "at random")
+    ]
+    assert fulltext_lookup(engine, "deu", "eng", "Stock") == [
+        ("Etage {f}; Stock {m}; Stockwerk {n}", "floor /fl./")
+    ]
+    assert fulltext_lookup(engine, "eng", "deu", "rand") == [
+        ("at random", "aufs Geratewohl")
+    ]
+    assert fulltext_lookup(engine, "eng", "deu", "aufs") == []
+
+
+def test_import_entries_fulltext_index_headwords(tmpdir, key_type):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type=key_type, fulltext=True)
+    engine = prepare_engine(database_url)
+    entries = [
+        ("Etage {f}; Stock {m}; Stockwerk {n}", "floor /fl./"),
+        ("Chiasma {n} [biol.]", "chiasma"),
+        ("Kohle {f} [ugs.]", "dough"),
+    ]
+    import_entries(
+        engine, entries, "deu", "eng", key_type=key_type, split_synonyms=True
+    )
+
+    # The annotations are not indexed
+    assert fulltext_lookup(engine, "deu", "eng", "biol") == []
+    assert fulltext_lookup(engine, "deu", "eng", "ugs") == []
+    # The words of a split group of synonyms are found by themselves
+    assert sorted(fulltext_lookup(engine, "deu", "eng", "stock")) == [
+        ("Stock {m}", "floor /fl./"),
+        ("Stockwerk {n}", "floor /fl./"),
+    ]
+    assert fulltext_lookup(engine, "eng", "deu", "floor") == [
+        ("floor /fl./", "Etage {f}; Stock {m}; Stockwerk {n}")
+    ]
+
+
+def get_generation(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            "select value from key_counter where name = 'generation'"
+        ).scalar()
+
+
+def test_import_entries_bumps_generation(sqlite_engine, key_type):
+    generations = []
+    for _ in range(2):
+        import_entries(
+            sqlite_engine,
+            (entry for entry in TEST_ENTRIES),
+            source_language_code,
+            target_language_code,
+            key_type=key_type,
+        )
+        generations.append(get_generation(sqlite_engine))
+
+    assert generations == [1, 2]
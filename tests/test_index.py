@@ -0,0 +1,125 @@
+import pytest
+
+from dictionarydb.importer import import_entries
+from dictionarydb.index import LookupIndexBuilder, build_lookup_index, load_lookup_index
+from dictionarydb.models import prepare_engine, setup_database
+from dictionarydb.query import get_lookup_query, get_lookup_values
+
+LOOKUP_ENTRIES = [
+    ("deu", "eng", "wörterbuch", "Wörterbuch", "dictionary"),
+    ("deu", "eng", "wörter", "Wörter {pl}", "words"),
+    ("deu", "eng", "wort", "Wort {n}", "word"),
+    ("deu", "eng", "wort", "Wort {n}", "term"),
+    ("deu", "eng", "zeit", "Zeit {f}", "time"),
+    ("eng", "deu", "word", "word", "Wort {n}"),
+]
+
+
+@pytest.fixture
+def lookup_index():
+    builder = LookupIndexBuilder()
+    for entry in LOOKUP_ENTRIES:
+        builder.add(*entry)
+    return builder.build()
+
+
+def lookup(lookup_index, source_language, target_language, search_string, max_results):
+    values = get_lookup_values(
+        source_language, target_language, search_string, max_results
+    )
+    results = lookup_index.lookup(**values)
+    return [(result["word"], result["translation"]) for result in results]
+
+
+def test_lookup_index(lookup_index):
+    assert len(lookup_index) == len(LOOKUP_ENTRIES)
+    # Entries with the same search key keep the order in which they were added
+    assert lookup(lookup_index, "deu", "eng", "Wort", 10) == [
+        ("Wort {n}", "word"),
+        ("Wort {n}", "term"),
+    ]
+    assert lookup(lookup_index, "deu", "eng", "wö", 10) == [
+        ("Wörter {pl}", "words"),
+        ("Wörterbuch", "dictionary"),
+    ]
+    assert lookup(lookup_index, "deu", "eng", "wo", 1) == [("Wort {n}", "word")]
+    assert lookup(lookup_index, "eng", "deu", "wo", 10) == [("word", "Wort {n}")]
+    assert lookup(lookup_index, "deu", "eng", "x", 10) == []
+    assert lookup(lookup_index, "fra", "eng", "wo", 10) == []
+
+
+def test_lookup_index_result_shape(lookup_index):
+    values = get_lookup_values("deu", "eng", "zeit", 10)
+
+    assert lookup_index.lookup(**values) == [
+        {
+            "word": "Zeit {f}",
+            "language": "deu",
+            "translation": "time",
+            "translation_language": "eng",
+        }
+    ]
+
+
+def test_lookup_index_stores_strings_once(lookup_index):
+    num_strings = len(lookup_index.offsets) - 1
+
+    # Strings used more than once (e.g. "word") are only stored once
+    assert num_strings == 13
+    assert lookup_index.nbytes > len(lookup_index.pool)
+
+
+def test_load_lookup_index_matches_lookup_query(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type="integer")
+    engine = prepare_engine(database_url)
+    entries = [
+        ("Wörterbuch {n}", "dictionary"),
+        ("Wörter {pl}", "words"),
+        ("Wort {n}", "word"),
+        ("Wort {n}", "term"),
+        ("Straße {f}", "street"),
+    ]
+    import_entries(engine, entries, "deu", "eng", key_type="integer")
+
+    lookup_index = load_lookup_index(engine)
+
+    with engine.connect() as connection:
+        for source_language, target_language, search_string in [
+            ("deu", "eng", "wö"),
+            ("deu", "eng", "Wort"),
+            ("deu", "eng", "STRASSE"),
+            ("eng", "deu", "wo"),
+        ]:
+            values = get_lookup_values(
+                source_language, target_language, search_string, 20
+            )
+            rows = connection.execute(get_lookup_query(), values).fetchall()
+            assert lookup_index.lookup(**values) == [dict(row) for row in rows]
+
+
+def test_build_lookup_index_split_synonyms_matches_database(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type="integer")
+    engine = prepare_engine(database_url)
+    entries = [
+        ("Etage {f}; Stock {m}; Stockwerk {n}", "floor /fl./"),
+        ("Stock {m}", "stick"),
+        ("Geld {n} [ugs.; Am.]", "dough; bread"),
+    ]
+    import_entries(
+        engine, entries, "deu", "eng", key_type="integer", split_synonyms=True
+    )
+
+    built_index = build_lookup_index(entries, "deu", "eng", split_synonyms=True)
+
+    loaded_index = load_lookup_index(engine)
+    for source_language, target_language, search_string in [
+        ("deu", "eng", "Stock"),
+        ("deu", "eng", "e"),
+        ("deu", "eng", "geld"),
+        ("eng", "deu", "bread"),
+    ]:
+        values = get_lookup_values(source_language, target_language, search_string, 20)
+        assert built_index.lookup(**values) == loaded_index.lookup(**values)
+    assert len(built_index) == len(loaded_index) == 9
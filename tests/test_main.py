@@ -1,19 +1,36 @@
-import os
 import errno
+import gzip
+import json
+import lzma
+import os
 import shlex
+import subprocess
+import sys
 from unittest.mock import patch
 
 import pytest
 
 from dictionarydb import __version__
 from dictionarydb.__main__ import (
+    api,
+    compile_,
     dictionarydb,
+    explain,
+    export,
     import_,
+    import_manifest_,
     init,
     validate_language_code,
-    api,
 )
-from dictionarydb.models import setup_database
+from dictionarydb.compiled import CompiledFile
+from dictionarydb.importer import import_entries
+from dictionarydb.models import (
+    get_key_type,
+    has_fulltext_index,
+    prepare_engine,
+    setup_database,
+)
+from dictionarydb.parser import load_entries
 
 
 def test_dictionarydb_command(cli_runner):
@@ -57,6 +74,28 @@ def test_init_command(_, test_database_url, cli_runner, caplog):
     assert "Successfully initialized database" in caplog.text
 
 
+@pytest.mark.parametrize("key_type", ["integer", "uuid"])
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_init_command_key_type(_, tmpdir, cli_runner, key_type):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    args_str = f'--database-url="{database_url}" --key-type={key_type}'
+    result = cli_runner.invoke(init, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert get_key_type(prepare_engine(database_url)) == key_type
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_init_command_fulltext(_, tmpdir, cli_runner):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    args_str = f'--database-url="{database_url}" --fulltext'
+    result = cli_runner.invoke(init, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    with prepare_engine(database_url).connect() as connection:
+        assert has_fulltext_index(connection)
+
+
 @patch("dictionarydb.__main__.setup_database", side_effect=Exception())
 @patch("dictionarydb.__main__.confirm", return_value=True)
 def test_init_command_failure(_, __, cli_runner, caplog):
@@ -106,6 +145,117 @@ def test_import_success(_, test_database_url, test_input_file, cli_runner, caplo
     assert "0 deleted, 5 added" in caplog.text
 
 
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_compressed_file(
+    _, test_database_url, test_file_contents, cli_runner, tmpdir, caplog
+):
+    input_file = tmpdir.join("input.txt.gz")
+    input_file.write_binary(gzip.compress(test_file_contents.encode("utf-8")))
+    args_str = f"""
+        {input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+        --read-buffer-size=1024
+    """
+    result = cli_runner.invoke(import_, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert "Decompressing gzip input" in caplog.text
+    assert "0 deleted, 5 added" in caplog.text
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_compressed_stdin(
+    _, test_database_url, test_file_contents, cli_runner, caplog
+):
+    args_str = f"""
+        -
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+    """
+    input_data = lzma.compress(test_file_contents.encode("utf-8"))
+    result = cli_runner.invoke(import_, shlex.split(args_str), input=input_data)
+
+    assert result.exit_code == 0
+    assert 'Starting dictionary import from file "<stdin>"' in caplog.text
+    assert "Decompressing xz input" in caplog.text
+    assert "0 deleted, 5 added" in caplog.text
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_stats_file(_, test_database_url, test_input_file, cli_runner, tmpdir):
+    stats_file = tmpdir.join("stats.json")
+    args_str = f"""
+        {test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+        --stats-file="{stats_file}"
+    """
+    result = cli_runner.invoke(import_, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    report = json.loads(stats_file.read_text(encoding="utf-8"))
+    assert report["entries"] == 5
+    assert report["mode"] == "replace"
+    assert {"parse", "build", "write", "commit"} <= set(report["stages"])
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_parse_workers(_, test_database_url, test_input_file, cli_runner):
+    args_str = f"""
+        {test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+        --parse-workers=2
+    """
+    with patch("dictionarydb.__main__.load_entries", wraps=load_entries) as mock:
+        result = cli_runner.invoke(import_, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert mock.call_args[1]["num_workers"] == 2
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_split_synonyms(_, test_database_url, test_input_file, cli_runner):
+    args_str = f"""
+        {test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+        --split-synonyms
+    """
+    with patch("dictionarydb.__main__.import_entries", wraps=import_entries) as mock:
+        result = cli_runner.invoke(import_, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert mock.call_args[1]["split_synonyms"] is True
+
+
+def test_import_parse_workers_with_queue_depth(test_database_url, tmpdir):
+    """Test that the parse workers do not inherit the connection of the import."""
+    input_file = tmpdir.join("input.txt")
+    input_file.write("".join(f"Wort{i} {{n}} :: word{i}\n" for i in range(30_000)))
+    args_str = f"""
+        {sys.executable} -m dictionarydb import {input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+        --parse-workers=2
+        --queue-depth=2
+        --no-confirm
+    """
+    result = subprocess.run(shlex.split(args_str), capture_output=True, text=True)
+
+    assert result.returncode == 0
+    assert "0 deleted, 30000 added" in result.stderr
+    # Forked workers would log errors when closing the inherited connection
+    assert "Exception" not in result.stderr
+
+
 @patch("dictionarydb.__main__.import_entries", side_effect=Exception())
 @patch("dictionarydb.__main__.confirm", return_value=True)
 def test_import_failure(_, __, test_database_url, test_input_file, cli_runner, caplog):
@@ -123,11 +273,219 @@ def test_import_failure(_, __, test_database_url, test_input_file, cli_runner, c
     assert "Failed to import entries" in caplog.text
 
 
+@pytest.fixture
+def test_manifest_file(tmpdir, test_input_file):
+    tmpdir.join("sv-en.txt").write("hus :: house\nträd :: tree\n")
+    manifest_file = tmpdir.join("manifest.json")
+    manifest_file.write(
+        json.dumps(
+            {
+                "imports": [
+                    {
+                        "file": test_input_file.basename,
+                        "source_language": "deu",
+                        "target_language": "eng",
+                    },
+                    {
+                        "file": "sv-en.txt",
+                        "source_language": "swe",
+                        "target_language": "eng",
+                    },
+                ]
+            }
+        )
+    )
+    return manifest_file
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_manifest_success(
+    _, test_database_url, test_manifest_file, cli_runner, caplog
+):
+    args_str = f"""
+        {test_manifest_file}
+        --database-url="{test_database_url}"
+        --incremental
+        --queue-depth=1
+        --parse-workers=2
+    """
+    result = cli_runner.invoke(import_manifest_, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert "Imported deu-eng (0 deleted, 5 added)" in caplog.text
+    assert "Imported swe-eng (0 deleted, 2 added)" in caplog.text
+    assert "Successfully imported 2 language pairs" in caplog.text
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_manifest_pair_failure(
+    _, test_database_url, test_manifest_file, cli_runner, caplog
+):
+    args_str = f"""
+        {test_manifest_file}
+        --database-url="{test_database_url}"
+        --incremental
+        --rollback=pair
+        --min-entries=3
+    """
+    result = cli_runner.invoke(import_manifest_, shlex.split(args_str))
+
+    assert result.exit_code == errno.EIO
+    assert "Imported deu-eng (0 deleted, 5 added)" in caplog.text
+    assert "Import of swe-eng failed and was rolled back" in caplog.text
+    assert "Failed to import 1 of 2 language pairs" in caplog.text
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_import_manifest_all_failure(
+    _, test_database_url, test_manifest_file, cli_runner, caplog
+):
+    args_str = f"""
+        {test_manifest_file}
+        --database-url="{test_database_url}"
+        --incremental
+        --min-entries=3
+    """
+    result = cli_runner.invoke(import_manifest_, shlex.split(args_str))
+
+    assert result.exit_code == errno.EIO
+    assert "Failed to import entries" in caplog.text
+
+
+def test_import_manifest_shared_language(test_manifest_file, cli_runner):
+    args_str = f"""
+        {test_manifest_file}
+        --database-url="sqlite:///"
+        --replace
+    """
+    result = cli_runner.invoke(import_manifest_, shlex.split(args_str))
+
+    assert result.exit_code == 2
+    assert 'language "eng" is part of more than one language pair' in result.output
+
+
 def test_validate_language_code():
     with pytest.raises(Exception, match="is not a valid ISO-639-3 code"):
         validate_language_code(None, None, "invalid")
 
 
+def get_compiled_entries(path):
+    compiled_file = CompiledFile(str(path))
+    try:
+        return len(compiled_file.index), sorted(compiled_file.index.pairs)
+    finally:
+        compiled_file.close()
+
+
+def test_compile_command_input_file(tmpdir, test_input_file, cli_runner, caplog):
+    output_file = tmpdir.join("dictionary.lookup")
+    args_str = f"""
+        {output_file}
+        --input-file={test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+    """
+    result = cli_runner.invoke(compile_, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert "Successfully compiled dictionary (10 lookup entries" in caplog.text
+    assert get_compiled_entries(output_file) == (10, [("deu", "eng"), ("eng", "deu")])
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_compile_command_database(
+    _, tmpdir, test_database_url, test_input_file, cli_runner
+):
+    import_args_str = f"""
+        {test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+    """
+    cli_runner.invoke(import_, shlex.split(import_args_str))
+    output_file = tmpdir.join("dictionary.lookup")
+
+    args_str = f'{output_file} --database-url="{test_database_url}"'
+    result = cli_runner.invoke(compile_, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert get_compiled_entries(output_file) == (10, [("deu", "eng"), ("eng", "deu")])
+
+
+def test_compile_command_requires_languages(tmpdir, test_input_file, cli_runner):
+    args_str = f"{tmpdir.join('dictionary.lookup')} --input-file={test_input_file}"
+    result = cli_runner.invoke(compile_, shlex.split(args_str))
+
+    assert result.exit_code == 2
+    assert "--input-file requires --source-language" in result.output
+
+
+@patch("dictionarydb.__main__.confirm", return_value=True)
+def test_explain_command(_, test_database_url, test_input_file, cli_runner, caplog):
+    import_args_str = f"""
+        {test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+    """
+    cli_runner.invoke(import_, shlex.split(import_args_str))
+
+    args_str = (
+        f'Chiasma -s deu -t eng --domain=biol. --database-url="{test_database_url}"'
+    )
+    result = cli_runner.invoke(explain, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert 'Query plan of the prefix lookup of "Chiasma" in domain "biol."' in (
+        result.output
+    )
+    assert "SEARCH lookup_entry" in result.output
+    assert "No full scans found" in caplog.text
+
+
+def test_explain_command_probes(test_database_url, cli_runner, caplog):
+    args_str = f'-s deu -t eng --probes --database-url="{test_database_url}"'
+    result = cli_runner.invoke(explain, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert result.output.count("Query plan of the prefix lookup") == 3
+    assert "Skipping fuzzy lookup" in caplog.text
+
+
+@patch("dictionarydb.__main__.explain_lookup")
+def test_explain_command_full_scan(
+    explain_lookup, test_database_url, cli_runner, caplog
+):
+    explain_lookup.return_value.lines = ["SCAN lookup_entry"]
+    explain_lookup.return_value.full_scans = ["lookup_entry"]
+    explain_lookup.return_value.unused_indexes = {"lookup_entry": []}
+    explain_lookup.return_value.notes = []
+    args_str = f'haus -s deu -t eng --database-url="{test_database_url}"'
+    result = cli_runner.invoke(explain, shlex.split(args_str))
+
+    assert result.exit_code == 1
+    assert 'Full scan of table "lookup_entry" (unused indexes on it: none)' in (
+        caplog.text
+    )
+
+
+def test_explain_command_requires_search_string(cli_runner):
+    result = cli_runner.invoke(explain, ["-s", "deu", "-t", "eng"])
+
+    assert result.exit_code == 2
+    assert "Pass a search string or --probes" in result.output
+
+
+def test_cli_does_not_load_api():
+    """Test that the commands do not set up the API application on import."""
+    code = "import sys, dictionarydb.__main__; print('dictionarydb.api' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+
+    assert result.stdout.strip() == "False"
+
+
 @patch("dictionarydb.__main__.uvicorn")
 @patch.dict(os.environ, {"DICTIONARYDB_IS_DEV": "1"})
 def test_api_command(uvicorn, cli_runner, caplog):
@@ -143,3 +501,102 @@ def test_api_command(uvicorn, cli_runner, caplog):
         reload=True,
     )
     assert "Starting API server on http://myhost:4000" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "options,message",
+    [
+        ("--shadow --incremental", "cannot be combined with --incremental"),
+        ("--shadow --loader=orm", "requires --loader=core"),
+    ],
+)
+def test_import_shadow_invalid_options(test_input_file, cli_runner, options, message):
+    args_str = f"""
+        {test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+        {options}
+        --no-confirm
+    """
+    result = cli_runner.invoke(import_, shlex.split(args_str))
+
+    assert result.exit_code == 2
+    assert message in result.output
+
+
+@pytest.fixture
+def test_database_with_entries(test_database_url, test_input_file, cli_runner):
+    import_args_str = f"""
+        {test_input_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_url}"
+    """
+    with patch("dictionarydb.__main__.confirm", return_value=True):
+        cli_runner.invoke(import_, shlex.split(import_args_str))
+    return test_database_url
+
+
+@pytest.mark.parametrize(
+    "extension, open_file",
+    [("txt", open), ("txt.gz", gzip.open), ("txt.xz", lzma.open)],
+)
+def test_export_command(
+    extension,
+    open_file,
+    tmpdir,
+    test_database_with_entries,
+    test_input_file,
+    cli_runner,
+    caplog,
+):
+    output_file = tmpdir.join(f"export.{extension}")
+
+    args_str = f"""
+        {output_file}
+        --source-language="deu"
+        --target-language="eng"
+        --database-url="{test_database_with_entries}"
+    """
+    result = cli_runner.invoke(export, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    assert "Successfully exported dictionary (5 entries" in caplog.text
+    with open_file(str(output_file), "rt", encoding="utf-8") as file:
+        exported_entries = sorted(load_entries(file))
+    with open(str(test_input_file), encoding="utf-8") as file:
+        assert exported_entries == sorted(load_entries(file))
+
+
+def test_export_command_stdout(test_database_with_entries, cli_runner):
+    args_str = f"""
+        -
+        --source-language="eng"
+        --target-language="deu"
+        --database-url="{test_database_with_entries}"
+        --format=jsonl
+        --compression=none
+    """
+    result = cli_runner.invoke(export, shlex.split(args_str))
+
+    assert result.exit_code == 0
+    entries = [json.loads(line) for line in result.stdout_bytes.splitlines()]
+    assert len(entries) == 5
+    assert {
+        "word": "dictionary",
+        "language": "eng",
+        "translation": "Wörterbuch",
+        "translation_language": "deu",
+    } in entries
+
+
+def test_export_command_unknown_language(test_database_with_entries, cli_runner):
+    args_str = f"""
+        -
+        --source-language="deu"
+        --target-language="fra"
+        --database-url="{test_database_with_entries}"
+    """
+    result = cli_runner.invoke(export, shlex.split(args_str))
+
+    assert result.exit_code == errno.EIO
@@ -0,0 +1,250 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+
+from dictionarydb.importer import store_entries
+from dictionarydb.manifest import (
+    ManifestEntry,
+    check_language_pairs,
+    group_by_language,
+    import_manifest,
+    load_manifest,
+    tomllib,
+)
+from dictionarydb.models import prepare_engine, setup_database
+from dictionarydb.parser import load_entries
+
+requires_tomllib = pytest.mark.skipif(
+    tomllib is None, reason='reading TOML requires Python 3.11 or "tomli"'
+)
+
+OTHER_FILE_CONTENTS = """
+hus :: house
+träd :: tree
+bil :: car
+"""
+
+
+def write_manifest(tmpdir, imports):
+    manifest_file = tmpdir.join("manifest.json")
+    manifest_file.write(json.dumps({"imports": imports}))
+    return str(manifest_file)
+
+
+@requires_tomllib
+def test_load_manifest_toml(tmpdir):
+    manifest_file = tmpdir.join("manifest.toml")
+    manifest_file.write(
+        """
+        [[imports]]
+        file = "de-en.txt"
+        source_language = "deu"
+        target_language = "eng"
+
+        [[imports]]
+        file = "data/sv-en.txt.gz"
+        source_language = "swe"
+        target_language = "eng"
+        """
+    )
+
+    assert load_manifest(str(manifest_file)) == [
+        ManifestEntry(str(tmpdir.join("de-en.txt")), "deu", "eng"),
+        ManifestEntry(str(tmpdir.join("data", "sv-en.txt.gz")), "swe", "eng"),
+    ]
+
+
+def test_load_manifest_json(tmpdir):
+    manifest_file = write_manifest(
+        tmpdir,
+        [{"file": "de-en.txt", "source_language": "deu", "target_language": "eng"}],
+    )
+
+    assert load_manifest(manifest_file) == [
+        ManifestEntry(str(tmpdir.join("de-en.txt")), "deu", "eng")
+    ]
+
+
+@pytest.mark.parametrize(
+    "imports,message",
+    [
+        ([], "lists no imports"),
+        ([{"file": "de-en.txt", "source_language": "deu"}], "lacks 'target_language'"),
+        (
+            [{"file": "de-en.txt", "source_language": "de", "target_language": "eng"}],
+            '"de" \\(import #1\\) is not a valid ISO-639-3 code',
+        ),
+    ],
+)
+def test_load_manifest_invalid(tmpdir, imports, message):
+    with pytest.raises(ValueError, match=message):
+        load_manifest(write_manifest(tmpdir, imports))
+
+
+def test_check_language_pairs():
+    entries = [
+        ManifestEntry("de-en.txt", "deu", "eng"),
+        ManifestEntry("sv-en.txt", "swe", "eng"),
+    ]
+
+    with pytest.raises(ValueError, match='language "eng" is part of more than one'):
+        check_language_pairs(entries)
+    check_language_pairs(entries, incremental=True)
+
+
+def test_check_language_pairs_duplicate():
+    entries = [
+        ManifestEntry("de-en.txt", "deu", "eng"),
+        ManifestEntry("en-de.txt", "eng", "deu"),
+    ]
+
+    with pytest.raises(ValueError, match="is listed more than once"):
+        check_language_pairs(entries, incremental=True)
+
+
+def test_group_by_language():
+    entries = [
+        ManifestEntry("de-en.txt", "deu", "eng"),
+        ManifestEntry("fr-it.txt", "fra", "ita"),
+        ManifestEntry("sv-es.txt", "swe", "spa"),
+        ManifestEntry("es-it.txt", "spa", "ita"),
+        ManifestEntry("sv-en.txt", "swe", "eng"),
+    ]
+
+    # "deu-eng" and "fra-ita" share no language, but are joined by the other pairs
+    assert group_by_language(entries) == [entries]
+    assert group_by_language(entries[:3]) == [[entry] for entry in entries[:3]]
+    assert group_by_language(entries[1:4]) == [[entries[1], entries[2], entries[3]]]
+
+
+@pytest.fixture
+def test_engine(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url)
+    engine = prepare_engine(database_url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def test_entries(tmpdir, test_file_contents):
+    tmpdir.join("de-en.txt").write(test_file_contents)
+    tmpdir.join("sv-fr.txt").write(OTHER_FILE_CONTENTS)
+    return [
+        ManifestEntry(str(tmpdir.join("de-en.txt")), "deu", "eng"),
+        ManifestEntry(str(tmpdir.join("sv-fr.txt")), "swe", "fra"),
+    ]
+
+
+def count_entries(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            text("select count(*) from word_translates_to_word")
+        ).scalar()
+
+
+@pytest.mark.parametrize("rollback", ["all", "pair"])
+def test_import_manifest(test_engine, test_entries, rollback):
+    results = import_manifest(test_engine, test_entries, rollback=rollback)
+
+    assert [result.entry for result in results] == test_entries
+    assert [result.num_added for result in results] == [5, 3]
+    assert [result.error for result in results] == [None, None]
+    assert count_entries(test_engine) == 8
+
+
+@pytest.mark.parametrize("queue_depth", [0, 2])
+def test_import_manifest_queue_depth(test_engine, test_entries, queue_depth):
+    with patch("dictionarydb.manifest.store_entries", wraps=store_entries) as mock:
+        results = import_manifest(test_engine, test_entries, queue_depth=queue_depth)
+
+    assert [result.num_added for result in results] == [5, 3]
+    assert [call[1]["queue_depth"] for call in mock.call_args_list] == [
+        queue_depth,
+        queue_depth,
+    ]
+
+
+def test_import_manifest_parse_workers(test_engine, test_entries):
+    results = import_manifest(test_engine, test_entries, parse_workers=2)
+
+    assert [result.num_added for result in results] == [5, 3]
+
+
+@pytest.mark.parametrize("rollback", ["all", "pair"])
+def test_import_manifest_streams_files(test_engine, test_entries, rollback):
+    with patch("dictionarydb.manifest.load_entries", wraps=load_entries) as mock:
+        import_manifest(test_engine, test_entries, rollback=rollback)
+
+    # The files are parsed while they are read, not into lists
+    assert [type(call[0][0]).__name__ for call in mock.call_args_list] == [
+        "TextIOWrapper",
+        "TextIOWrapper",
+    ]
+
+
+def test_import_manifest_shares_worker_pool(test_engine, test_entries):
+    with patch.object(test_engine.dialect, "name", "postgresql"):
+        with patch("dictionarydb.manifest.create_worker_pool") as create_worker_pool:
+            with patch("dictionarydb.manifest.import_group", return_value=[]) as mock:
+                import_manifest(
+                    test_engine, test_entries, rollback="pair", parse_workers=2
+                )
+
+    # One pool, created before the groups are imported concurrently
+    create_worker_pool.assert_called_once_with(2)
+    executor = create_worker_pool.return_value.__enter__.return_value
+    assert [call[0][4] for call in mock.call_args_list] == [executor, executor]
+
+
+def test_import_manifest_rollback_all(test_engine, test_entries):
+    with pytest.raises(EOFError, match="Not enough entries found"):
+        import_manifest(test_engine, test_entries, rollback="all", min_entries=4)
+
+    assert count_entries(test_engine) == 0
+
+
+def test_import_manifest_rollback_pair(test_engine, test_entries):
+    results = import_manifest(test_engine, test_entries, rollback="pair", min_entries=4)
+
+    assert results[0].num_added == 5
+    assert results[0].error is None
+    assert isinstance(results[1].error, EOFError)
+    assert count_entries(test_engine) == 5
+
+
+def test_import_manifest_missing_file(test_engine, test_entries, tmpdir):
+    entries = test_entries + [
+        ManifestEntry(str(tmpdir.join("missing.txt")), "ita", "spa")
+    ]
+
+    results = import_manifest(test_engine, entries, rollback="pair")
+
+    assert [result.error is None for result in results] == [True, True, False]
+    assert count_entries(test_engine) == 8
+
+
+def test_import_manifest_concurrently(test_engine, test_entries):
+    with patch.object(test_engine.dialect, "name", "postgresql"):
+        with patch("dictionarydb.manifest.import_group", return_value=[]) as mock:
+            import_manifest(test_engine, test_entries, rollback="pair")
+
+    # The language pairs share no language, so each one gets a worker of its own
+    assert [call[0][1] for call in mock.call_args_list] == [
+        [test_entries[0]],
+        [test_entries[1]],
+    ]
+
+
+@pytest.mark.parametrize(
+    "options,message",
+    [
+        ({"rollback": "none"}, 'unknown rollback mode "none"'),
+        ({"shadow": True}, "cannot be shadow imports"),
+    ],
+)
+def test_import_manifest_invalid_options(test_engine, test_entries, options, message):
+    with pytest.raises(ValueError, match=message):
+        import_manifest(test_engine, test_entries, **options)
@@ -0,0 +1,122 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from dictionarydb.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    get_route_path,
+)
+
+
+def test_counter():
+    registry = Registry()
+    counter = Counter("test_total", "Test counter.", ["name"], registry=registry)
+    counter.inc("b")
+    counter.inc("a", amount=2)
+    counter.inc("b")
+
+    assert registry.render() == (
+        "# HELP test_total Test counter.\n"
+        "# TYPE test_total counter\n"
+        'test_total{name="a"} 2\n'
+        'test_total{name="b"} 2\n'
+    )
+
+
+def test_gauge():
+    registry = Registry()
+    gauge = Gauge("test", "Test gauge.", registry=registry)
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert registry.render().splitlines()[-1] == "test 1"
+    gauge.set(0.25)
+    assert registry.render().splitlines()[-1] == "test 0.25"
+
+
+def test_histogram():
+    registry = Registry()
+    histogram = Histogram("test", "Test histogram.", buckets=(1, 5), registry=registry)
+    for value in [0.5, 1, 3, 10]:
+        histogram.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'test_bucket{le="1"} 2',
+        'test_bucket{le="5"} 3',
+        'test_bucket{le="+Inf"} 4',
+        "test_sum 14.5",
+        "test_count 4",
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = Counter("test_total", "Test counter.", ["path"], registry=registry)
+    counter.inc('a"b\\c\nd')
+
+    assert 'test_total{path="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_collector():
+    registry = Registry()
+    registry.add_collector(lambda: [("test_size", "gauge", "Test size.", 3)])
+
+    assert registry.render() == (
+        "# HELP test_size Test size.\n# TYPE test_size gauge\ntest_size 3\n"
+    )
+
+
+def test_get_route_path():
+    route = type("Route", (), {"path": "/lookup"})()
+
+    assert get_route_path({"route": route}) == "/lookup"
+    assert get_route_path({}) == "unmatched"
+
+
+def test_get_route_path_template():
+    app = Starlette(routes=[Route("/words/{word}", lambda request: None)])
+
+    def get_scope(path):
+        return {"type": "http", "method": "GET", "path": path, "app": app}
+
+    assert get_route_path(get_scope("/words/Haus")) == "/words/{word}"
+    assert get_route_path(get_scope("/other")) == "unmatched"
+
+
+class Clock(object):
+    def __init__(self, times):
+        self.times = iter(times)
+
+    def __call__(self):
+        return next(self.times)
+
+
+def test_metrics_middleware(monkeypatch):
+    registry = Registry()
+    in_flight = Gauge("in_flight", "", registry=registry)
+    duration = Histogram(
+        "duration", "", ["method", "route", "status"], buckets=(1,), registry=registry
+    )
+    monkeypatch.setattr("dictionarydb.metrics.REQUESTS_IN_FLIGHT", in_flight)
+    monkeypatch.setattr("dictionarydb.metrics.REQUEST_DURATION", duration)
+    messages = []
+
+    async def app(scope, receive, send):
+        assert in_flight.values[()] == 1
+        await send({"type": "http.response.start", "status": 404})
+
+    async def send(message):
+        messages.append(message)
+
+    middleware = MetricsMiddleware(app, clock=Clock([1.0, 1.5]))
+    asyncio.run(middleware({"type": "http", "method": "GET"}, None, send))
+
+    assert messages == [{"type": "http.response.start", "status": 404}]
+    assert in_flight.values[()] == 0
+    assert duration.values[("GET", "unmatched", 404)] == [1, 0, 0.5]
@@ -1,20 +1,28 @@
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
+from sqlalchemy import inspect
 from sqlalchemy.orm import scoped_session
+from sqlalchemy.types import Integer, String
 
 from dictionarydb.models import (
+    CREATE_PG_TRIGRAM_EXTENSION_QUERY,
+    Language,
+    Translation,
+    Word,
+    create_trigram_indexes,
+    get_integer_key_metadata,
+    get_key_type,
     managed_session,
+    new_object_id,
     prepare_engine,
     prepare_session,
+    reserve_keys,
     setup_database,
-    new_object_id,
-    Language,
-    Word,
-    Translation,
-    CREATE_PG_TRIGRAM_EXTENSION_QUERY,
 )
 
+sqlite_dialect = prepare_engine("sqlite://").dialect
+
 
 def test_prepare_engine_sqlite():
     engine = prepare_engine("sqlite:////path/to/file.db")
@@ -64,26 +72,156 @@ def test_managed_session_rolls_back_on_commit_failure(prepare_session, caplog):
     assert "Rolling back session due to error during commit" in caplog.text
 
 
+@patch("dictionarydb.models.has_schema", return_value=False)
+@patch("dictionarydb.models.create_trigram_indexes")
 @patch("dictionarydb.models.prepare_engine")
 @patch("dictionarydb.models.Model")
-def test_setup_database_postgres(Model, prepare_engine):
-    mock_engine = Mock()
-    mock_engine.dialect = Mock()
+def test_setup_database_postgres(Model, prepare_engine, create_trigram_indexes, _):
+    mock_engine = MagicMock()
     mock_engine.dialect.name = "postgresql"
     prepare_engine.return_value = mock_engine
 
-    setup_database("postgresql://localhost:5432/dictionary")
+    setup_database("postgresql://localhost:5432/dictionary", key_type="uuid")
 
     Model.metadata.create_all.assert_called_once_with(mock_engine)
     mock_engine.execute.assert_called_once_with(CREATE_PG_TRIGRAM_EXTENSION_QUERY)
+    assert create_trigram_indexes.called
+
+
+@pytest.mark.parametrize("num_indexes, created", [(0, True), (1, False)])
+def test_create_trigram_indexes(num_indexes, created):
+    connection = MagicMock()
+    connection.dialect.identifier_preparer.quote = lambda name: name
+    connection.execute.return_value.scalar.return_value = num_indexes
+
+    create_trigram_indexes(connection)
+
+    statement = connection.execute.call_args[0][0]
+    assert (
+        statement == "create index ix_lookup_entry_search_key_trgm on lookup_entry "
+        "using gin (search_key gin_trgm_ops)"
+    ) == created
 
 
 @patch("dictionarydb.models.Model")
 def test_setup_database_sqlite(Model):
-    setup_database("sqlite:///")
+    setup_database("sqlite:///", key_type="uuid")
     assert Model.metadata.create_all.called
 
 
+@pytest.mark.parametrize("key_type", ["integer", "uuid"])
+def test_setup_database_default_key_type(tmpdir, key_type):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    with patch("dictionarydb.models.settings.DATABASE_KEY_TYPE", key_type):
+        setup_database(database_url)
+    assert get_key_type(prepare_engine(database_url)) == key_type
+
+
+def test_setup_database_existing_key_type(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type="integer")
+    setup_database(database_url)  # Keeps the existing key type
+    assert get_key_type(prepare_engine(database_url)) == "integer"
+
+
+def test_setup_database_other_key_type(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type="integer")
+    setup_database(database_url, key_type="integer")  # Can be run again
+
+    with pytest.raises(ValueError, match='created with "integer" keys, not "uuid"'):
+        setup_database(database_url, key_type="uuid")
+
+
+def test_setup_database_fulltext_requires_sqlite():
+    with pytest.raises(ValueError, match="requires a SQLite database"):
+        setup_database("postgresql://localhost:5432/dictionary", fulltext=True)
+
+
+def test_setup_database_invalid_key_type():
+    with pytest.raises(ValueError, match="unknown key type"):
+        setup_database("sqlite:///", key_type="invalid")
+
+
+def test_setup_database_drops_outdated_derived_tables(tmpdir, caplog):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url)
+    engine = prepare_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute("drop table lookup_entry")
+        connection.execute(
+            "create table lookup_entry (source_code, target_code, search_key, word, "
+            "translation, primary key (source_code, target_code, search_key, word, "
+            "translation))"
+        )
+
+    setup_database(database_url)
+
+    columns = inspect(engine).get_columns("lookup_entry")
+    assert [column["name"] for column in columns][:2] == ["id", "word_id"]
+    assert 'Dropping the outdated table "lookup_entry"' in caplog.text
+
+
+def test_setup_database_refuses_outdated_tables(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    engine = prepare_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute("create table language (id, code)")
+        connection.execute("create table word (id, text, language_id)")
+        connection.execute("create table word_translates_to_word (word1_id, word2_id)")
+
+    with pytest.raises(ValueError, match="tables: word, word_translates_to_word"):
+        setup_database(database_url)
+    # Nothing was changed
+    assert sorted(inspect(engine).get_table_names()) == [
+        "language",
+        "word",
+        "word_translates_to_word",
+    ]
+
+
+def test_setup_database_creates_missing_indexes(tmpdir):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url)
+    engine = prepare_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute("drop index ix_word_domain_domain_word_id")
+
+    setup_database(database_url)
+
+    indexes = inspect(engine).get_indexes("word_domain")
+    assert [index["column_names"] for index in indexes] == [["domain", "word_id"]]
+
+
+def test_get_integer_key_metadata():
+    metadata = get_integer_key_metadata()
+    word = metadata.tables["word"]
+    translation = metadata.tables["word_translates_to_word"]
+
+    for column in [word.c.id, word.c.language_id, translation.c.word1_id]:
+        assert isinstance(column.type.load_dialect_impl(sqlite_dialect), Integer)
+        assert column.default is None
+    assert isinstance(word.c.text.type, String)
+    # The original models are not modified
+    assert isinstance(Word.__table__.c.id.type, String)
+
+
+@pytest.mark.parametrize("key_type", ["integer", "uuid"])
+def test_get_key_type(tmpdir, key_type):
+    database_url = f"sqlite:///{tmpdir.join('test.sqlite')}"
+    setup_database(database_url, key_type=key_type)
+    assert get_key_type(prepare_engine(database_url)) == key_type
+
+
+def test_reserve_keys():
+    engine = MagicMock()
+    connection = engine.begin.return_value.__enter__.return_value
+    connection.execute.return_value.scalar.return_value = 1000
+
+    assert reserve_keys(engine, "word", count=100) == 901
+    assert connection.execute.call_args[1] == {"name": "word", "count": 100}
+
+
 def test_new_object_id():
     assert len(new_object_id()) == 32
 
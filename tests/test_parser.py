@@ -1,6 +1,20 @@
+import gzip
+import logging
 from io import StringIO
 
-from dictionarydb.parser import load_entries
+import pytest
+
+from dictionarydb.compression import open_input
+from dictionarydb.parser import (
+    ParsedWord,
+    create_worker_pool,
+    get_byte_ranges,
+    load_entries,
+    load_entries_parallel,
+    parse_word,
+    split_synonyms,
+)
+from dictionarydb.search import get_search_key
 
 
 def test_load_entries(test_file_contents):
@@ -18,3 +32,110 @@ def test_load_entries(test_file_contents):
         # Multiple words (missing translation) - the incomplete pair is skipped
         ("aufs Geratewohl", "at haphazard; by haphazard"),
     ]
+
+
+@pytest.mark.parametrize(
+    "text, parsed_word",
+    [
+        ("Wörterbuch", ParsedWord("Wörterbuch", None, (), None)),
+        ("Chiasma {n} [biol.]", ParsedWord("Chiasma", "n", ("biol.",), None)),
+        (
+            "Etage {f}; Stock {m}; Stockwerk {n}",
+            ParsedWord("Etage; Stock; Stockwerk", "f; m; n", (), None),
+        ),
+        ("floor /fl./", ParsedWord("floor", None, (), "fl.")),
+        (
+            "Geld {n} [fin.] [ugs.; Am.]; Kohle {f} [ugs.]",
+            ParsedWord("Geld; Kohle", "n; f", ("fin.", "ugs.", "Am."), None),
+        ),
+        ("and/or", ParsedWord("and/or", None, (), None)),
+    ],
+)
+def test_parse_word(text, parsed_word):
+    assert parse_word(text) == parsed_word
+
+
+@pytest.mark.parametrize(
+    "text, synonyms",
+    [
+        ("Wörterbuch", ["Wörterbuch"]),
+        (
+            "Etage {f}; Stock {m}; Stockwerk {n}",
+            ["Etage {f}", "Stock {m}", "Stockwerk {n}"],
+        ),
+        ("Geld {n} [ugs.; Am.]; Kohle {f}", ["Geld {n} [ugs.; Am.]", "Kohle {f}"]),
+        ("chiasma; ; chiasm;", ["chiasma", "chiasm"]),
+    ],
+)
+def test_split_synonyms(text, synonyms):
+    assert split_synonyms(text) == synonyms
+
+
+@pytest.fixture
+def test_file(tmpdir, test_file_contents):
+    file = tmpdir.join("input.txt")
+    file.write_text(test_file_contents, encoding="utf-8")
+    return file
+
+
+def test_get_byte_ranges(test_file):
+    ranges = list(get_byte_ranges(str(test_file), chunk_bytes=100))
+    contents = test_file.read_binary()
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(contents)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert contents[end - 1] == ord("\n")
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 100, 10_000])
+def test_load_entries_parallel(test_file, chunk_bytes, caplog):
+    caplog.set_level(logging.DEBUG, logger="dictionarydb.parser")
+    with open(test_file, encoding="utf-8") as file:
+        serial_entries = list(load_entries(file))
+    serial_messages = [record.getMessage() for record in caplog.records]
+    caplog.clear()
+
+    with open(test_file, encoding="utf-8") as file:
+        entries = list(load_entries_parallel(file, 2, chunk_bytes=chunk_bytes))
+    messages = [record.getMessage() for record in caplog.records]
+
+    assert entries == serial_entries
+    assert messages == serial_messages
+    assert "Failed to parse entry line: unbalanced entry" in messages
+
+
+def test_load_entries_parallel_stream(test_file_contents):
+    file = StringIO(test_file_contents)
+    entries = load_entries(file, num_workers=2)
+
+    assert list(entries) == list(load_entries(StringIO(test_file_contents)))
+
+
+def test_load_entries_parallel_shared_pool(test_file, test_file_contents):
+    expected_entries = list(load_entries(StringIO(test_file_contents)))
+
+    with create_worker_pool(2) as executor:
+        for _ in range(2):
+            with open(test_file, encoding="utf-8") as file:
+                entries = list(load_entries(file, num_workers=2, executor=executor))
+            # The pool is left running for the next file
+            assert entries == expected_entries
+
+
+def test_load_entries_parallel_compressed(tmpdir, test_file_contents):
+    # The compressed file must not be split into byte ranges
+    path = tmpdir.join("input.txt.gz")
+    path.write_binary(gzip.compress(test_file_contents.encode("utf-8")))
+    with open_input(str(path)) as file:
+        entries = list(load_entries(file, num_workers=2))
+
+    assert entries == list(load_entries(StringIO(test_file_contents)))
+
+
+@pytest.mark.parametrize("text", ["Etage {f}; Stock {m}", "floor /fl./", "[biol.] B"])
+def test_parse_word_search_key(text):
+    # The search key of a word is its case-folded headword
+    assert parse_word(text).headword.casefold() == get_search_key(text)
@@ -0,0 +1,46 @@
+import threading
+from itertools import count
+
+import pytest
+
+from dictionarydb.pipeline import iter_in_background
+
+
+def test_iter_in_background():
+    assert list(iter_in_background(range(100), queue_depth=2)) == list(range(100))
+
+
+def test_iter_in_background_produces_in_other_thread():
+    def produce():
+        for _ in range(3):
+            yield threading.current_thread()
+
+    threads = set(iter_in_background(produce(), queue_depth=1))
+    assert threads and threading.current_thread() not in threads
+
+
+def test_iter_in_background_reraises_producer_error():
+    def produce():
+        yield 1
+        raise KeyError("broken")
+
+    items = iter_in_background(produce(), queue_depth=1)
+    assert next(items) == 1
+    with pytest.raises(KeyError, match="broken"):
+        next(items)
+
+
+def test_iter_in_background_stops_producer():
+    closed = threading.Event()
+
+    def produce():
+        try:
+            yield from count()
+        finally:
+            closed.set()
+
+    items = iter_in_background(produce(), queue_depth=1)
+    assert next(items) == 0
+    items.close()
+
+    assert closed.is_set()
@@ -0,0 +1,49 @@
+import pytest
+
+from dictionarydb.query import get_lookup_query, get_lookup_values
+
+
+@pytest.mark.parametrize(
+    "database_name,mode,expected",
+    [
+        ("sqlite", "prefix", "search_key < :search_key_upper_bound"),
+        ("postgresql", "prefix", "order by relevance desc"),
+        ("postgresql", "fuzzy", "search_key % :search_key"),
+        ("sqlite", "fulltext", "word_fts match :search_key"),
+    ],
+)
+def test_get_lookup_query(database_name, mode, expected):
+    query = get_lookup_query(database_name, mode=mode)
+
+    assert expected in query
+    assert "{domain_condition}" not in query
+    assert ":domain" not in query
+
+
+@pytest.mark.parametrize(
+    "database_name,mode", [("sqlite", "fuzzy"), ("postgresql", "fulltext")]
+)
+def test_get_lookup_query_unsupported(database_name, mode):
+    with pytest.raises(ValueError, match="lookups require"):
+        get_lookup_query(database_name, mode=mode)
+
+
+@pytest.mark.parametrize("mode", ["prefix", "fulltext"])
+def test_get_lookup_query_domain(mode):
+    query = get_lookup_query("sqlite", mode=mode, domain=True)
+
+    # Every lookup is filtered by the word of the lookup entry
+    assert query.count("word_domain.word_id = lookup_entry.word_id") == 1
+
+
+def test_get_lookup_values():
+    values = get_lookup_values("deu", "eng", "Haus {n}", 20, domain="archit.")
+
+    assert values == {
+        "source_language": "deu",
+        "target_language": "eng",
+        "search_key": "haus",
+        "search_key_upper_bound": "haut",
+        "max_results": 20,
+        "domain": "archit.",
+    }
@@ -0,0 +1,150 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from dictionarydb.metrics import DATABASE_CONNECTIONS_IN_USE
+from dictionarydb.replicas import ReplicaRouter
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDatabase(object):
+    def __init__(self, name, fail=False, delay=0, acquire_delay=0):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.acquire_delay = acquire_delay
+        self.is_connected = False
+        self.num_queries = 0
+
+    async def connect(self):
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        self.is_connected = True
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    @asynccontextmanager
+    async def connection(self):
+        if self.acquire_delay:
+            await asyncio.sleep(self.acquire_delay)
+        yield self
+
+    async def fetch_all(self, query, values):
+        self.num_queries += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return [self.name]
+
+    async def fetch_val(self, query, values):
+        return self.name
+
+
+def fetch_names(router, num_queries):
+    return [asyncio.run(router.fetch_all("select 1"))[0] for _ in range(num_queries)]
+
+
+def test_router_without_replicas():
+    router = ReplicaRouter(FakeDatabase("primary"))
+    asyncio.run(router.connect())
+
+    assert fetch_names(router, 2) == ["primary", "primary"]
+    assert asyncio.run(router.fetch_val("select 1")) == "primary"
+    assert router.get_stats() == {"replicas": 0, "healthy_replicas": 0, "fallbacks": 0}
+
+
+def test_router_balances_replicas():
+    router = ReplicaRouter(
+        FakeDatabase("primary"), [FakeDatabase("replica1"), FakeDatabase("replica2")]
+    )
+    asyncio.run(router.connect())
+
+    assert fetch_names(router, 3) == ["replica1", "replica2", "replica1"]
+
+
+def test_router_falls_back_to_primary(caplog):
+    clock = FakeClock()
+    replica = FakeDatabase("replica")
+    router = ReplicaRouter(FakeDatabase("primary"), [replica], clock=clock)
+    asyncio.run(router.connect())
+
+    replica.fail = True
+    assert fetch_names(router, 2) == ["primary", "primary"]
+    # The failed replica is not asked again until the retry interval has passed
+    assert replica.num_queries == 1
+    assert "Query on replica #0 failed" in caplog.text
+    assert router.get_stats() == {"replicas": 1, "healthy_replicas": 0, "fallbacks": 2}
+
+    replica.fail = False
+    clock.now += router.retry_interval
+    assert fetch_names(router, 1) == ["replica"]
+
+
+def test_router_replica_down_on_startup(caplog):
+    clock = FakeClock()
+    replica = FakeDatabase("replica", fail=True)
+    router = ReplicaRouter(FakeDatabase("primary"), [replica], clock=clock)
+    asyncio.run(router.connect())
+
+    assert "Failed to connect to replica #0" in caplog.text
+    assert fetch_names(router, 1) == ["primary"]
+
+    replica.fail = False
+    clock.now += router.retry_interval
+    assert fetch_names(router, 1) == ["replica"]
+
+
+def test_router_acquire_timeout():
+    primary = FakeDatabase("primary", acquire_delay=1)
+    replica = FakeDatabase("replica", acquire_delay=1)
+    router = ReplicaRouter(primary, [replica], acquire_timeout=0.01)
+    asyncio.run(router.connect())
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(router.fetch_all("select 1"))
+    assert primary.num_queries == replica.num_queries == 0
+
+
+def test_router_acquire_timeout_on_replica(caplog):
+    replica = FakeDatabase("replica", acquire_delay=1)
+    router = ReplicaRouter(FakeDatabase("primary"), [replica], acquire_timeout=0.01)
+    asyncio.run(router.connect())
+
+    assert fetch_names(router, 1) == ["primary"]
+    assert "No connection to replica #0 became free" in caplog.text
+    assert router.get_stats() == {"replicas": 1, "healthy_replicas": 1, "fallbacks": 1}
+
+
+def test_router_slow_query():
+    replica = FakeDatabase("replica", delay=0.05)
+    router = ReplicaRouter(FakeDatabase("primary"), [replica], acquire_timeout=0.01)
+    asyncio.run(router.connect())
+
+    assert fetch_names(router, 1) == ["replica"]
+    assert router.get_stats()["fallbacks"] == 0
+
+
+def test_router_connections_in_use():
+    in_use = []
+
+    class ObservedDatabase(FakeDatabase):
+        async def fetch_all(self, query, values):
+            in_use.append(DATABASE_CONNECTIONS_IN_USE.values[("replica0",)])
+            return await super().fetch_all(query, values)
+
+    router = ReplicaRouter(FakeDatabase("primary"), [ObservedDatabase("replica")])
+    asyncio.run(router.connect())
+
+    assert fetch_names(router, 1) == ["replica"]
+    assert in_use == [1]
+    assert DATABASE_CONNECTIONS_IN_USE.values[("replica0",)] == 0
@@ -0,0 +1,62 @@
+import pytest
+
+from dictionarydb.search import (
+    get_fulltext_query,
+    get_prefix_range,
+    get_prefix_upper_bound,
+    get_search_key,
+)
+
+
+@pytest.mark.parametrize(
+    "text,search_key",
+    [
+        ("Wörterbuch", "wörterbuch"),
+        ("WÖRTER", "wörter"),
+        ("Straße", "strasse"),
+        ("Etage {f}; Stock {m}", "etage; stock"),
+        ("Chiasma {n} [biol.]", "chiasma"),
+        ("Photographie <Fotografie>", "photographie"),
+        ("floor /fl./", "floor"),
+        ("and/or", "and/or"),
+        ("  to  look   up ", "to look up"),
+        ("{f}", ""),
+    ],
+)
+def test_get_search_key(text, search_key):
+    assert get_search_key(text) == search_key
+
+
+def test_get_search_key_unicode_normalization():
+    assert get_search_key("W\u00f6rter") == get_search_key("Wo\u0308rter")
+
+
+@pytest.mark.parametrize(
+    "prefix,upper_bound",
+    [
+        ("wört", "wöru"),
+        ("a\U0010ffff", "b"),
+        ("a\ud7ff", "a\ue000"),
+        ("\U0010ffff", None),
+    ],
+)
+def test_get_prefix_upper_bound(prefix, upper_bound):
+    assert get_prefix_upper_bound(prefix) == upper_bound
+
+
+def test_get_prefix_range():
+    assert get_prefix_range("wört") == ("wört", "wöru")
+    assert get_prefix_range("\U0010ffff") == ("\U0010ffff", "\U0010ffff" * 2)
+
+
+@pytest.mark.parametrize(
+    "search_key,query",
+    [
+        ("gerat", '"gerat"*'),
+        ("aufs gerat", '"aufs" "gerat"*'),
+        ('say "hi"', '"say" """hi"""*'),
+        ("and or not", '"and" "or" "not"*'),
+    ],
+)
+def test_get_fulltext_query(search_key, query):
+    assert get_fulltext_query(search_key) == query
@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    inspect,
+)
+
+from dictionarydb.models import Model
+from dictionarydb.shadow import StagingTables
+
+
+def test_staging_tables_names():
+    staging_tables = StagingTables(
+        Model.metadata,
+        ["word", "word_translates_to_word", "word_domain", "word_synonym"],
+        token="abc",
+    )
+
+    word_table = staging_tables.tables["word"]
+    translation_table = staging_tables.tables["word_translates_to_word"]
+    assert word_table.name == "word__staging_abc"
+    assert not word_table.indexes
+    assert {key.target_fullname for key in translation_table.foreign_keys} == {
+        "word__staging_abc.id"
+    }
+    assert {key.target_fullname for key in word_table.foreign_keys} == {"language.id"}
+    index_names = [
+        index.name for index in staging_tables.get_indexes("word_translates_to_word")
+    ]
+    assert index_names == [
+        "ix_word_translates_to_word_fingerprint_abc",
+        "ix_word_translates_to_word_word1_id_abc",
+        "ix_word_translates_to_word_word2_id_abc",
+        "uq_word_translates_to_word_word1_id_word2_id_abc",
+    ]
+
+
+@patch("dictionarydb.shadow.create_trigram_index")
+def test_staging_tables_trigram_indexes(create_trigram_index):
+    staging_tables = StagingTables(Model.metadata, ["lookup_entry"], token="abc")
+    connection = MagicMock()
+    connection.dialect.name = "postgresql"
+
+    staging_tables.create_indexes(connection)
+
+    create_trigram_index.assert_called_once_with(
+        connection,
+        "lookup_entry__staging_abc",
+        "search_key",
+        "ix_lookup_entry_search_key_trgm_abc",
+    )
+
+
+def test_staging_tables_unstaged_reference():
+    with pytest.raises(ValueError, match='references staged table "word"'):
+        StagingTables(Model.metadata, ["word"])
+
+
+def test_staging_tables_swap():
+    metadata = MetaData()
+    Table("parent", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "child",
+        metadata,
+        Column("parent_id", Integer, ForeignKey("parent.id"), index=True),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    staging_tables = StagingTables(metadata, ["parent", "child"], token="abc")
+
+    with engine.begin() as connection:
+        connection.execute("insert into parent (id) values (1)")
+        staging_tables.create(connection)
+        connection.execute("insert into parent__staging_abc (id) values (2)")
+        connection.execute("insert into child__staging_abc (parent_id) values (2)")
+        staging_tables.create_indexes(connection)
+        staging_tables.swap(connection)
+
+    with engine.connect() as connection:
+        assert connection.execute("select id from parent").fetchall() == [(2,)]
+        assert connection.execute("select parent_id from child").fetchall() == [(2,)]
+    assert sorted(inspect(engine).get_table_names()) == ["child", "parent"]
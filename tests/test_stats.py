@@ -0,0 +1,68 @@
+import json
+import logging
+from itertools import count
+
+from dictionarydb.stats import ImportStats, get_peak_rss
+
+
+def new_clock():
+    # Every call of the clock advances it by one second
+    return count().__next__
+
+
+def test_import_stats_stage():
+    stats = ImportStats(clock=new_clock())
+
+    for _ in range(2):
+        with stats.stage("build"):
+            pass
+
+    stage = stats.stages["build"].as_dict()
+    assert stage["wall_time"] == 2.0
+    assert stage["calls"] == 2
+    assert stage["cpu_time"] >= 0
+
+
+def test_import_stats_iter_stage():
+    stats = ImportStats(clock=new_clock())
+
+    items = list(stats.iter_stage("parse", iter("abcde"), batch_size=2))
+
+    assert items == ["a", "b", "c", "d", "e"]
+    # Getting each batch of items (and finding out that there are no more) is timed
+    assert stats.stages["parse"].calls == 4
+
+
+def test_import_stats_chunks(caplog):
+    caplog.set_level(logging.INFO)
+    stats = ImportStats(progress_interval=2)
+
+    stats.add_chunk(100, 250, 0.5)
+    assert "Stored" not in caplog.text
+    stats.add_chunk(50, 120, 0.0)
+
+    assert stats.chunks == [
+        {"entries": 100, "rows": 250, "seconds": 0.5, "rows_per_second": 500.0},
+        {"entries": 50, "rows": 120, "seconds": 0.0, "rows_per_second": None},
+    ]
+    assert "Stored 150 entries in 2 chunks" in caplog.text
+
+
+def test_import_stats_report(tmpdir):
+    stats = ImportStats()
+    with stats.stage("write"):
+        stats.add_chunk(10, 20, 0.1)
+    path = str(tmpdir.join("stats.json"))
+
+    stats.write_report(path, loader="core")
+
+    with open(path) as file:
+        report = json.load(file)
+    assert report["loader"] == "core"
+    assert (report["entries"], report["rows"]) == (10, 20)
+    assert set(report["stages"]) == {"write"}
+    assert report["chunks"][0]["rows_per_second"] == 200.0
+
+
+def test_get_peak_rss():
+    assert get_peak_rss() > 0